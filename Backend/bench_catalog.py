@@ -0,0 +1,81 @@
+"""Catalog endpoints: rebuild + jsonify per request (old code) vs. precomputed responses.
+
+The "rebuilt" column registers throwaway routes that do what the handlers used
+to do on every call: build the curated list and jsonify it. The first table goes
+through the Flask test client, so routing and WSGI overhead are included; the
+second times just the handler body inside a request context.
+
+Run from the Backend folder:  python bench_catalog.py [requests]
+"""
+import sys
+import time
+
+from flask import jsonify, request
+
+import main_api
+from main_api import app, get_trending_music, get_fallback_shuffle_playlist, get_fallback_recommendations
+
+LEGACY = {
+    "trending": lambda: {"tracks": get_trending_music()},
+    "shuffle": get_fallback_shuffle_playlist,
+    "recommendations": get_fallback_recommendations,
+}
+ROUTES = {
+    "trending": ("get", "/trending_music"),
+    "shuffle": ("post", "/get_shuffle_songs"),
+    "recommendations": ("post", "/get_ai_recommendations"),
+}
+
+
+def register_legacy_routes():
+    for name, build in LEGACY.items():
+        app.add_url_rule(f"/bench/legacy/{name}", f"bench_legacy_{name}",
+                         lambda build=build: jsonify(build()), methods=["GET", "POST"])
+
+
+def requests_per_second(send, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        send()
+    return count / (time.perf_counter() - start)
+
+
+def handler_microseconds(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    register_legacy_routes()
+    client = app.test_client()
+    gzip_headers = {"Accept-Encoding": "gzip"}
+
+    print(f"{count} requests per column, requests/second (size in bytes)")
+    print(f"{'endpoint':<18}{'rebuilt':>10}{'precomputed':>13}{'gzip':>10}{'304':>10}{'speedup':>9}"
+          f"{'bytes':>8}{'gzip':>7}")
+    for name, (method, path) in ROUTES.items():
+        send = getattr(client, method)
+        legacy = requests_per_second(lambda: send(f"/bench/legacy/{name}"), count)
+        plain = requests_per_second(lambda: send(path), count)
+        packed = requests_per_second(lambda: send(path, headers=gzip_headers), count)
+        etag = client.get(path, headers=gzip_headers).headers["ETag"]
+        not_modified = requests_per_second(
+            lambda: client.get(path, headers={"Accept-Encoding": "gzip", "If-None-Match": etag}), count)
+        size = main_api.CATALOG_RESPONSES[name].stats()
+        print(f"{name:<18}{legacy:>10.0f}{plain:>13.0f}{packed:>10.0f}{not_modified:>10.0f}"
+              f"{plain / legacy:>8.1f}x{size['bytes']:>8}{size['gzip_bytes']:>7}")
+
+    print("\nhandler only, microseconds per request")
+    print(f"{'endpoint':<18}{'rebuilt':>10}{'precomputed':>13}{'speedup':>9}")
+    for name, build in LEGACY.items():
+        with app.test_request_context(headers=gzip_headers):
+            old = handler_microseconds(lambda: jsonify(build()), count)
+            new = handler_microseconds(lambda: main_api.CATALOG_RESPONSES[name].respond(request), count)
+        print(f"{name:<18}{old:>10.1f}{new:>13.1f}{old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Relevance ranking cost per search: the old 100/80/60/40/20 chain vs. Ranker.
+
+The old chain scored each result with a few `in` checks and sorted them; Ranker
+computes BM25, coverage and phrase features for the whole batch with NumPy.
+Candidates are the parsed titles from fixtures/titles.json, repeated to size.
+
+Run from the Backend folder:  python bench_ranking.py [repeat]
+"""
+import json
+import os
+import sys
+import time
+
+from ranking import Ranker
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "titles.json")
+
+
+def legacy_rank(query, candidates, limit):
+    scored = []
+    query_lower = query.lower()
+    for track in candidates:
+        song_lower = track["name"].lower()
+        artist_lower = track["artists"][0].lower()
+        if query_lower == song_lower:
+            score = 100
+        elif query_lower in song_lower:
+            score = 80
+        elif any(word in song_lower for word in query_lower.split()):
+            score = 60
+        elif query_lower in artist_lower:
+            score = 40
+        else:
+            score = 20
+        scored.append((score, track))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [track for _, track in scored[:limit]]
+
+
+def load_candidates():
+    with open(FIXTURE, encoding='utf-8') as f:
+        cases = json.load(f)
+    return [{"name": c["song"], "artists": [c["artist"]], "youtube_id": str(i)} for i, c in enumerate(cases)]
+
+
+def milliseconds(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pool = load_candidates()
+    ranker = Ranker()
+    query = "shape of you ed sheeran"
+
+    print(f"milliseconds per search (query {query!r})")
+    print(f"{'candidates':>10}{'legacy':>10}{'Ranker':>10}")
+    for size in (5, 30, 100, 300, 1000):
+        candidates = (pool * (size // len(pool) + 1))[:size]
+        old = milliseconds(lambda: legacy_rank(query, candidates, 5), repeat)
+        new = milliseconds(lambda: ranker.rank(query, candidates, 5), repeat)
+        print(f"{size:>10}{old:>10.3f}{new:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Title parsing over the fixture corpus: inline heuristics (old code) vs. title_parser.
+
+legacy_parse() is the per-result block search_youtube_music() used to run,
+minus its logging: re.search / re.match on uncompiled patterns, keyword
+scans, and one str.replace per suffix. "cold" clears the title caches before
+every pass; "warm" is a repeat search for titles already seen.
+
+Run from the Backend folder:  python bench_title_parser.py [passes]
+"""
+import json
+import os
+import re
+import sys
+import time
+
+import title_parser
+from title_parser import parse_title
+from youtube_parser import clean_channel_name
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "titles.json")
+
+
+def legacy_parse(clean_title, query, channel):
+    artist = "Unknown Artist"
+    song_name = clean_title
+    if ' - ' in clean_title:
+        parts = clean_title.split(' - ', 1)
+        if len(parts) == 2:
+            first_part = parts[0].strip()
+            second_part = parts[1].strip()
+            if query.lower() in first_part.lower():
+                song_name = first_part
+                artist = second_part
+            else:
+                artist = first_part
+                song_name = second_part
+    elif ' | ' in clean_title:
+        parts = clean_title.split(' | ')
+        if len(parts) >= 2:
+            song_name = parts[0].strip()
+            artist = parts[1].strip()
+    elif ' by ' in clean_title.lower():
+        by_index = clean_title.lower().find(' by ')
+        if by_index != -1:
+            song_name = clean_title[:by_index].strip()
+            artist = clean_title[by_index + 4:].strip()
+    elif '(' in clean_title and ')' in clean_title:
+        paren_match = re.search(r'\(([^)]+)\)', clean_title)
+        if paren_match:
+            potential_artist = paren_match.group(1).strip()
+            if not any(word in potential_artist.lower() for word in ['official', 'video', 'audio', 'lyrics', 'music', 'ft', 'feat']):
+                artist = potential_artist
+                song_name = clean_title.replace(f'({potential_artist})', '').strip()
+    if artist == "Unknown Artist":
+        title_patterns = [
+            r'^([^-]+)\s*-\s*([^(]+)',
+            r'^([^|]+)\s*\|\s*([^(]+)',
+            r'([^-]+)\s*-\s*(.+)',
+        ]
+        for pattern in title_patterns:
+            match = re.match(pattern, clean_title)
+            if match:
+                potential_artist = match.group(1).strip()
+                potential_song = match.group(2).strip()
+                if not any(word in potential_artist.lower() for word in ['official', 'video', 'audio', 'lyrics', 'hd', '4k']):
+                    artist = potential_artist
+                    song_name = potential_song
+                    break
+    if artist == "Unknown Artist" and channel:
+        artist = clean_channel_name(channel)
+    if artist == "Unknown Artist" and query:
+        song_name = query
+        remaining = clean_title.replace(query, '').strip()
+        if remaining and len(remaining) > 2:
+            remaining = re.sub(r'^[-|•·\s]+|[-|•·\s]+$', '', remaining)
+            if remaining and not any(word in remaining.lower() for word in ['official', 'video', 'audio', 'lyrics', 'music']):
+                artist = remaining
+    if not artist or artist.strip() == "":
+        artist = "Unknown Artist"
+    suffixes_to_remove = [
+        '(Official Video)', '(Official Audio)', '(Official Music Video)',
+        '(Lyrics)', '(Lyric Video)', '[Official Video]', '[Official Audio]',
+        '- Official Video', '- Official Audio', '| Official Video',
+        '(Full Video)', '(HD)', '[HD]', '(4K)', '[4K]', '(Official)'
+    ]
+    for suffix in suffixes_to_remove:
+        if suffix in song_name:
+            song_name = song_name.replace(suffix, '').strip()
+    return artist, song_name
+
+
+def load_cases():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def clear_caches():
+    title_parser.split_title.cache_clear()
+    title_parser.strip_suffixes.cache_clear()
+
+
+def microseconds_per_title(cases, parse, passes, before_pass=None):
+    elapsed = 0.0
+    for _ in range(passes):
+        if before_pass:
+            before_pass()
+        start = time.perf_counter()
+        for case in cases:
+            parse(case["title"], case["query"], case["channel"])
+        elapsed += time.perf_counter() - start
+    return elapsed / (passes * len(cases)) * 1e6
+
+
+def main():
+    passes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cases = load_cases()
+    for case in cases:
+        assert parse_title(case["title"], case["query"], case["channel"]) == legacy_parse(
+            case["title"], case["query"], case["channel"]), case["title"]
+
+    re.purge()  # the legacy code leaned on re's internal pattern cache; start it cold too
+    legacy = microseconds_per_title(cases, legacy_parse, passes)
+    cold = microseconds_per_title(cases, parse_title, passes, before_pass=clear_caches)
+    warm = microseconds_per_title(cases, parse_title, passes)
+
+    print(f"{len(cases)} titles x {passes} passes, microseconds per title")
+    print(f"{'legacy':>10}{'cold':>10}{'warm':>10}")
+    print(f"{legacy:>10.2f}{cold:>10.2f}{warm:>10.2f}")
+    print(f"cold {legacy / cold:.1f}x, warm {legacy / warm:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Playlist operations on a 10k-track playlist: plain list (old code) vs. TrackList.
+
+The "list" column repeats what the endpoints used to do: build a set of ids
+for every add, and rebuild the whole list for every remove.
+
+Run from the Backend folder:  python bench_track_list.py [tracks]
+"""
+import random
+import sys
+import time
+
+from track_list import TrackList
+
+
+def make_tracks(count):
+    return [{"youtube_id": f"vid{i:07d}", "title": f"Song {i}", "image": f"img{i}"} for i in range(count)]
+
+
+def list_add(tracks, track):
+    existing_ids = {t["youtube_id"] for t in tracks}
+    if track["youtube_id"] not in existing_ids:
+        tracks.append(track)
+
+
+def list_remove(tracks, youtube_id):
+    return [t for t in tracks if t["youtube_id"] != youtube_id]
+
+
+def list_move(tracks, youtube_id, index):
+    position = next(i for i, t in enumerate(tracks) if t["youtube_id"] == youtube_id)
+    tracks.insert(index, tracks.pop(position))
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(1)
+    base = make_tracks(count)
+    extra = make_tracks(count + 1000)[count:]
+    victims = [t["youtube_id"] for t in rng.sample(base, 200)]
+    moves = [(t["youtube_id"], rng.randrange(count)) for t in rng.sample(base, 200)]
+
+    plain = list(base)
+    indexed = TrackList(base)
+    results = []
+
+    results.append(("bulk import (per track)",
+                    timed(lambda i: list_add(plain, extra[i]), 200),
+                    timed(lambda i: indexed.append(extra[i]), 200)))
+    results.append(("contains",
+                    timed(lambda i: victims[i] in {t["youtube_id"] for t in plain}, 200),
+                    timed(lambda i: victims[i] in indexed, 200)))
+
+    def plain_remove(i):
+        nonlocal plain
+        plain = list_remove(plain, victims[i])
+
+    results.append(("remove", timed(plain_remove, 200), timed(lambda i: indexed.remove(victims[i]), 200)))
+    moves = [(youtube_id, index) for youtube_id, index in moves if youtube_id in indexed]
+    results.append(("move",
+                    timed(lambda i: list_move(plain, *moves[i]), len(moves)),
+                    timed(lambda i: indexed.move(*moves[i]), len(moves))))
+    assert [t["youtube_id"] for t in plain] == [t["youtube_id"] for t in indexed]
+
+    print(f"{count} tracks, microseconds per operation")
+    print(f"{'operation':<26}{'list':>12}{'TrackList':>12}{'speedup':>10}")
+    for name, old, new in results:
+        print(f"{name:<26}{old:>12.1f}{new:>12.2f}{old / new:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
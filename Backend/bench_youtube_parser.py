@@ -0,0 +1,79 @@
+"""CPU time per YouTube results page: legacy regex cascade vs. ytInitialData parser.
+
+The fixtures/youtube_search_*.html pages are synthetic, not captured pages.
+They follow the layout of a real results page (ytInitialData with
+videoRenderer, shorts and ad nodes) but are padded to about 570 KB with
+filler script ("xxxx..."), a fake INNERTUBE key and 50 decoy
+{"videoId":..., "title":"decoy"} objects. The padding makes them close to a
+worst case for the lazy DOTALL regex, so the speedup they show is an upper
+bound; a real page costs the regex less.
+
+"found" counts differ because the regex's matches are not tracks one to
+one: its lazy pattern pairs a decoy id with the next real title, picks up
+the same video twice, and can run past the last video. The breakdown below
+each row compares its ids with the parser's.
+
+Run from the Backend folder:  python bench_youtube_parser.py [iterations]
+"""
+import glob
+import os
+import re
+import sys
+import time
+
+from youtube_parser import parse_search_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# The patterns search_youtube_music() used to try one after another
+LEGACY_PATTERNS = [
+    r'"videoId":"([a-zA-Z0-9_-]{11})"[^}]*"title":\{"runs":\[\{"text":"([^"]+)"[^}]*\}[^}]*"lengthText":\{"simpleText":"([^"]+)"',
+    r'"videoId":"([a-zA-Z0-9_-]{11})"[^}]*"title":\{"simpleText":"([^"]+)"[^}]*"lengthText":\{"simpleText":"([^"]+)"',
+    r'"videoId":"([a-zA-Z0-9_-]{11})".*?"text":"([^"]+)".*?"lengthText".*?"simpleText":"([^"]+)"',
+    r'{"videoId":"([a-zA-Z0-9_-]{11})".*?"title":{"runs":\[{"text":"([^"]+)"}.*?"lengthText":{"simpleText":"([^"]+)"}',
+]
+
+
+def legacy_extract(content):
+    """Regex cascade: first pattern that matches anything wins"""
+    for pattern in LEGACY_PATTERNS:
+        matches = re.findall(pattern, content, re.DOTALL)
+        if matches:
+            return matches
+    return []
+
+
+def cpu_time(fn, content, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        result = fn(content)
+    return (time.process_time() - start) / iterations, result
+
+
+def compare(legacy, parsed):
+    """Why the regex and the parser found different numbers of tracks"""
+    parser_ids = [video["video_id"] for video in parsed]
+    regex_ids = [match[0] for match in legacy]
+    unique = set(regex_ids)
+    return (f"{'':<4}regex: {len(regex_ids)} matches = {len(unique & set(parser_ids))} real videos"
+            f" + {len(regex_ids) - len(unique)} repeats + {len(unique - set(parser_ids))} non-video ids;"
+            f" missed {len(set(parser_ids) - unique)} of the parser's {len(parser_ids)}")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    pages = sorted(glob.glob(os.path.join(FIXTURES, "youtube_search_*.html")))
+    print("Synthetic fixtures padded toward the regex's worst case; see the module docstring")
+    print(f"{'fixture':<36} {'KB':>6} {'regex ms':>10} {'found':>6} {'parser ms':>10} {'found':>6} {'speedup':>8}")
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        legacy_s, legacy = cpu_time(legacy_extract, content, iterations)
+        parser_s, parsed = cpu_time(parse_search_page, content, iterations)
+        print(f"{os.path.basename(path):<36} {len(content) // 1024:>6} {legacy_s * 1000:>10.2f} {len(legacy):>6} "
+              f"{parser_s * 1000:>10.2f} {len(parsed):>6} {legacy_s / parser_s:>7.1f}x")
+        print(compare(legacy, parsed))
+
+
+if __name__ == "__main__":
+    main()
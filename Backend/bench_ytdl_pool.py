@@ -0,0 +1,52 @@
+"""Per-request YoutubeDL overhead: new instance per request vs. checkout from YoutubeDLPool.
+
+Each "request" builds/borrows an instance and resolves the YouTube extractor,
+which is the setup every extract_info() call pays before touching the network.
+
+Run from the Backend folder:  python bench_ytdl_pool.py [requests]
+"""
+import sys
+import time
+
+import yt_dlp
+
+from ytdl_pool import YoutubeDLPool
+
+OPTS = {
+    'format': 'bestaudio/best',
+    'quiet': True,
+    'no_warnings': True,
+}
+
+
+def per_request(fn, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests
+
+
+def fresh_instance():
+    with yt_dlp.YoutubeDL(dict(OPTS)) as ydl:
+        ydl.get_info_extractor('Youtube')
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    pool = YoutubeDLPool(OPTS, size=2, max_uses=requests * 2, name="bench")
+    pool.warm()
+
+    def pooled_instance():
+        with pool.instance() as ydl:
+            ydl.get_info_extractor('Youtube')
+
+    fresh_s = per_request(fresh_instance, requests)
+    pooled_s = per_request(pooled_instance, requests)
+    print(f"new YoutubeDL per request : {fresh_s * 1000:8.2f} ms")
+    print(f"pooled YoutubeDL          : {pooled_s * 1000:8.3f} ms")
+    print(f"saved per request         : {(fresh_s - pooled_s) * 1000:8.2f} ms ({fresh_s / pooled_s:.0f}x)")
+    print(f"pool stats                : {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
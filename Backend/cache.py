@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so equivalent queries share a key"""
+    return " ".join(query.lower().split())
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache with a per-entry time-to-live.
+
+    Entries past their TTL can still be served for ``stale_ttl`` more seconds
+    while a background thread reloads them (stale-while-revalidate). With
+    ``refresh_ahead`` set, fresh entries that are that close to expiring are
+    reloaded in the background before they lapse.
+    """
+
+    def __init__(self, maxsize=256, ttl=300, stale_ttl=0, refresh_ahead=0, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self.name = name
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.refresh_aheads = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key, now):
+        """Return (value, state) where state is 'fresh', 'expiring', 'stale' or None. Caller holds the lock."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None, None
+        value, expires_at = entry
+        if now < expires_at:
+            self._data.move_to_end(key)
+            if now >= expires_at - self.refresh_ahead:
+                return value, "expiring"
+            return value, "fresh"
+        if now < expires_at + self.stale_ttl:
+            self._data.move_to_end(key)
+            return value, "stale"
+        del self._data[key]
+        return None, None
+
+    def get(self, key):
+        """Return a fresh cached value or None."""
+        with self._lock:
+            value, state = self._lookup(key, time.monotonic())
+            if state in ("fresh", "expiring"):
+                self.hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting least-recently-used entries past maxsize.
+
+        ``ttl`` may be a number of seconds or a callable computing it from the value.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if callable(ttl):
+            ttl = ttl(value)
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key, loader, ttl=None, cache_if=None):
+        """Return the cached value for key, calling loader() on a miss.
+
+        Stale and nearly-expired entries are returned immediately and refreshed
+        in the background. ``cache_if(value)`` can veto caching (e.g. empty results).
+        """
+        value, found = self.get_or_refresh(key, loader, ttl, cache_if)
+        if found:
+            return value
+        value = loader()
+        if cache_if is None or cache_if(value):
+            self.set(key, value, ttl)
+        return value
+
+    def get_or_refresh(self, key, loader, ttl=None, cache_if=None):
+        """Like get_or_load, but a miss returns (None, False) for the caller to load.
+
+        Returns (value, True) on a hit, stale hits and refresh-ahead included.
+        """
+        with self._lock:
+            value, state = self._lookup(key, time.monotonic())
+            if state == "fresh":
+                self.hits += 1
+                return value, True
+            if state in ("expiring", "stale"):
+                if state == "expiring":
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                refresh = key not in self._refreshing
+                if refresh:
+                    self._refreshing.add(key)
+                    if state == "expiring":
+                        self.refresh_aheads += 1
+            else:
+                self.misses += 1
+                return None, False
+
+        if refresh:
+            threading.Thread(
+                target=self._refresh, args=(key, loader, ttl, cache_if), daemon=True
+            ).start()
+        return value, True
+
+    def _refresh(self, key, loader, ttl, cache_if):
+        try:
+            value = loader()
+            if cache_if is None or cache_if(value):
+                self.set(key, value, ttl)
+            self.refreshes += 1
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error(f"{self.name} background refresh failed for {key!r}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "refresh_ahead": self.refresh_ahead,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refresh_aheads": self.refresh_aheads,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one in-flight execution.
+
+    The first caller runs fn(); callers arriving while it runs wait and
+    receive the same result (or exception). A caller that needs to work
+    incrementally (e.g. stream while it loads) can use join(), wait() and
+    complete() directly instead of do().
+    """
+
+    def __init__(self, name="single_flight"):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+
+    def join(self, key):
+        """Returns (call, leader): the leader must complete() the call, others wait() on it"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.collapsed += 1
+        return call, leader
+
+    def wait(self, call):
+        """The leader's result, or its exception re-raised"""
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def complete(self, key, call, result=None, error=None):
+        """Publish the leader's outcome and free the key for the next call"""
+        call.result, call.error = result, error
+        with self._lock:
+            del self._calls[key]
+        call.event.set()
+
+    def do(self, key, fn):
+        call, leader = self.join(key)
+        if not leader:
+            return self.wait(call)
+        try:
+            result = fn()
+        except BaseException as e:
+            self.complete(key, call, error=e)
+            raise
+        self.complete(key, call, result)
+        return result
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._calls),
+        }
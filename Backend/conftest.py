@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# main_api opens its playlist database (and imports hyde.json) on import; point
+# both at a throwaway directory before any test module is collected
+_playlists = tempfile.mkdtemp(prefix="playlists-")
+os.environ.setdefault("PLAYLIST_DB", os.path.join(_playlists, "playlists.db"))
+os.environ.setdefault("PLAYLIST_FILE", os.path.join(_playlists, "hyde.json"))
@@ -0,0 +1,337 @@
+import importlib
+import json
+import logging
+import os
+import queue
+import runpy
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from ytdl_pool import YoutubeDLPool
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "2"))
+JOB_RETENTION = int(os.getenv("DOWNLOAD_JOB_RETENTION", "3600"))
+
+# ========================
+# WORKER PROCESS SIDE
+# ========================
+# Workers are started as ``python -m download_worker`` and import only this
+# module (and ytdl_pool), never the script that owns the queue, so a worker
+# doesn't build a second Flask app or open the playlist database. Keep it
+# that way: nothing here may import main_api.
+#
+# Protocol: the parent writes one JSON job per line to the worker's stdin;
+# the worker answers on its original stdout with JSON lines carrying either
+# "progress", or "result"/"error" to end the job.
+
+_job_out = None
+_current_job = None
+_worker_pool = None
+
+
+def _send(message):
+    if _job_out is not None:
+        _job_out.write(json.dumps(message) + "\n")
+        _job_out.flush()
+
+
+def _report(progress):
+    _send({"job_id": _current_job, "progress": progress})
+
+
+def _progress_hook(d):
+    """yt-dlp progress hook: forward byte counts to the parent process"""
+    total = d.get("total_bytes") or d.get("total_bytes_estimate")
+    _report({
+        "stage": "downloading" if d.get("status") == "downloading" else "downloaded",
+        "downloaded_bytes": d.get("downloaded_bytes"),
+        "total_bytes": total,
+        "speed": d.get("speed"),
+        "eta": d.get("eta"),
+    })
+
+
+def _postprocessor_hook(d):
+    if d.get("status") == "started":
+        _report({"stage": "converting", "postprocessor": d.get("postprocessor")})
+
+
+def run_download(job_id, youtube_id, opts):
+    """Download and convert one track inside a worker process"""
+    global _current_job, _worker_pool
+    if _worker_pool is None:
+        # One long-lived YoutubeDL per worker process
+        _worker_pool = YoutubeDLPool(
+            dict(opts, progress_hooks=[_progress_hook], postprocessor_hooks=[_postprocessor_hook]),
+            size=1, name="download-worker",
+        )
+    _current_job = job_id
+    _report({"stage": "starting"})
+    url = f"https://www.youtube.com/watch?v={youtube_id}"
+    with _worker_pool.instance() as ydl:
+        info = ydl.extract_info(url, download=True)
+        downloads = info.get("requested_downloads") or []
+        if downloads and downloads[0].get("filepath"):
+            path = downloads[0]["filepath"]
+        else:
+            path = os.path.splitext(ydl.prepare_filename(info))[0] + ".mp3"
+    return {"path": path, "title": info.get("title")}
+
+
+def worker_ref(worker):
+    """How a worker process finds the job function: "module:name", or "path:name" for a script"""
+    if worker.__module__ == "__main__":
+        return f"{os.path.abspath(sys.modules['__main__'].__file__)}:{worker.__qualname__}"
+    return f"{worker.__module__}:{worker.__qualname__}"
+
+
+def _load_worker(ref):
+    where, name = ref.rsplit(":", 1)
+    if where.endswith(".py"):
+        # A job function defined in a script (a test file run directly)
+        return runpy.run_path(where, run_name="__mp_main__")[name]
+    return getattr(importlib.import_module(where), name)
+
+
+def serve(ref):
+    """Worker process loop: run each job read from stdin until stdin closes"""
+    global _job_out
+    # Keep the protocol on a private copy of stdout; yt-dlp and ffmpeg chatter goes to stderr
+    _job_out = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    worker = _load_worker(ref)
+    for line in sys.stdin:
+        job = json.loads(line)
+        try:
+            result = worker(job["job_id"], job["youtube_id"], job["opts"])
+        except Exception as e:
+            _send({"job_id": job["job_id"], "error": str(e)})
+        else:
+            _send({"job_id": job["job_id"], "result": result})
+
+
+# ========================
+# PARENT PROCESS SIDE
+# ========================
+
+class DownloadJobQueue:
+    """Runs downloads on a bounded set of worker processes and tracks their progress.
+
+    submit() returns immediately with a job. A youtube_id that is already
+    queued or running maps to that existing job instead of a new one. Each
+    worker slot is a thread driving one ``python -m download_worker``
+    process; a process that dies fails its job and is replaced for the next.
+    """
+
+    def __init__(self, opts, workers=DOWNLOAD_WORKERS, retention=JOB_RETENTION, on_complete=None,
+                 worker=run_download):
+        self.opts = dict(opts)
+        self.worker = worker
+        self.workers = workers
+        self.retention = retention
+        self.on_complete = on_complete
+        self._pending = queue.Queue()
+        self._started = False
+        self._closed = False
+        self._jobs = {}
+        self._active = {}  # youtube_id -> job_id while queued/running
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+    def _ensure_started(self):
+        """Start the worker slots on first use (caller holds the lock)"""
+        if self._started:
+            return
+        self._started = True
+        for index in range(self.workers):
+            threading.Thread(target=self._run_slot, daemon=True, name=f"download-worker-{index}").start()
+
+    def _spawn(self):
+        here = os.path.dirname(os.path.abspath(__file__))
+        # The worker sees the parent's import path, so a job function anywhere on it resolves
+        path = [here] + [os.path.abspath(p) for p in sys.path if p]
+        return subprocess.Popen(
+            [sys.executable, "-m", "download_worker", worker_ref(self.worker)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8", cwd=os.getcwd(),
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(path)),
+        )
+
+    def _run_slot(self):
+        """One worker slot: feed jobs to its process, restarting the process if it dies"""
+        process = None
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            job_id, youtube_id = item
+            if process is None:
+                try:
+                    process = self._spawn()
+                except OSError as e:
+                    self._finish(job_id, None, f"could not start download worker: {e}")
+                    continue
+            try:
+                process.stdin.write(json.dumps({"job_id": job_id, "youtube_id": youtube_id,
+                                                "opts": self.opts}) + "\n")
+                process.stdin.flush()
+                result, error = self._follow(process, job_id)
+            except OSError:
+                result, error = None, None  # the pipe broke: the process is gone
+            if error is None and result is None:
+                logger.error("Download worker process died; starting a new one for the next job")
+                process.kill()
+                process.wait()
+                process = None
+                with self._lock:
+                    self.restarts += 1
+                error = "download worker process died"
+            self._finish(job_id, result, error)
+        if process is not None:
+            process.stdin.close()  # the worker exits at end of input
+            process.wait()
+
+    def _follow(self, process, job_id):
+        """Relay progress until the job ends; (None, None) if the process died first"""
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                logger.warning(f"Unexpected download worker output: {line.strip()}")
+                continue
+            if "progress" in message:
+                self._record_progress(job_id, message["progress"])
+            elif "error" in message:
+                return None, message["error"]
+            else:
+                return message["result"], None
+        return None, None
+
+    def submit(self, youtube_id):
+        """Enqueue a download; returns (job, created)"""
+        with self._lock:
+            self._prune()
+            job_id = self._active.get(youtube_id)
+            if job_id is not None:
+                self.deduplicated += 1
+                return dict(self._jobs[job_id]), False
+            if self._closed:
+                raise RuntimeError("download queue is closed")
+
+            self._ensure_started()
+            job_id = uuid.uuid4().hex
+            job = {
+                "job_id": job_id,
+                "youtube_id": youtube_id,
+                "status": "queued",
+                "progress": {"stage": "queued", "percent": 0.0},
+                "file": None,
+                "path": None,
+                "title": None,
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._jobs[job_id] = job
+            self._active[youtube_id] = job_id
+            self.submitted += 1
+            self._pending.put((job_id, youtube_id))
+        logger.info(f"Queued download job {job_id} for {youtube_id}")
+        return dict(job), True
+
+    def close(self):
+        """Stop taking jobs; workers finish what is queued, then exit"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._started:
+                for _ in range(self.workers):
+                    self._pending.put(None)
+
+    def find(self, youtube_id):
+        """The queued or running job for a youtube_id, or None"""
+        with self._lock:
+            job_id = self._active.get(youtube_id)
+            return dict(self._jobs[job_id]) if job_id is not None else None
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _record_progress(self, job_id, progress):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in ("finished", "error"):
+                return
+            if job["status"] == "queued":
+                job["status"] = "running"
+                job["started_at"] = time.time()
+            downloaded, total = progress.get("downloaded_bytes"), progress.get("total_bytes")
+            if downloaded and total:
+                progress["percent"] = round(100.0 * downloaded / total, 1)
+            elif progress["stage"] in ("downloaded", "converting"):
+                progress["percent"] = 100.0
+            else:
+                progress["percent"] = job["progress"].get("percent", 0.0)
+            job["progress"] = progress
+
+    def _finish(self, job_id, result, error):
+        with self._lock:
+            job = self._jobs[job_id]
+            if error is None:
+                job.update(status="finished", path=result["path"], title=result["title"],
+                           file=os.path.basename(result["path"]))
+                job["progress"] = {"stage": "finished", "percent": 100.0}
+                self.completed += 1
+            else:
+                job.update(status="error", error=error)
+                job["progress"] = dict(job["progress"], stage="error")
+                self.failed += 1
+            job["finished_at"] = time.time()
+            snapshot = dict(job)
+        if error is None:
+            logger.info(f"Download job {job_id} finished: {snapshot['path']}")
+        else:
+            logger.error(f"Download job {job_id} failed: {error}")
+        # Run the hook before releasing the youtube_id so a new request for the
+        # same track sees either this job or the hook's result, never neither
+        if self.on_complete is not None:
+            try:
+                self.on_complete(snapshot)
+            except Exception as e:
+                logger.error(f"Download completion hook failed for {job_id}: {e}")
+        with self._lock:
+            self._active.pop(snapshot["youtube_id"], None)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window (caller holds the lock)"""
+        cutoff = time.time() - self.retention
+        stale = [job_id for job_id, job in self._jobs.items()
+                 if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in stale:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job["status"] for job in self._jobs.values()]
+            return {
+                "workers": self.workers,
+                "queued": statuses.count("queued"),
+                "running": statuses.count("running"),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+            }
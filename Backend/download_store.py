@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Byte budget for the store; 0 disables eviction
+MAX_BYTES = int(os.getenv("DOWNLOADS_MAX_BYTES", str(5 * 1024 ** 3)))
+# Access times are persisted at most this often (seconds)
+ACCESS_FLUSH_INTERVAL = int(os.getenv("DOWNLOADS_ACCESS_FLUSH_INTERVAL", "60"))
+
+YOUTUBE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+STORE_FILE_RE = re.compile(r'^([A-Za-z0-9_-]{11})_(\w+)\.mp3$')
+
+
+def is_valid_youtube_id(youtube_id):
+    return bool(YOUTUBE_ID_RE.match(youtube_id or ""))
+
+
+class DownloadStore:
+    """Content-addressed MP3 store: downloads/<youtube_id>_<quality>.mp3.
+
+    A small JSON index (downloads/index.json) maps each stored track to its
+    file, size, title and last access, so lookups never list the directory.
+    When the store grows past ``max_bytes`` the least recently served files
+    are deleted, except pinned ones (tracks with a job in flight).
+
+    Both the download jobs and the live audio proxy write into the store, so
+    a track is claimed by one producer at a time (see claim()).
+    """
+
+    def __init__(self, root="downloads", index_name="index.json", max_bytes=MAX_BYTES):
+        self.root = root
+        self.index_path = os.path.join(root, index_name)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pins = {}
+        self._producers = {}  # key -> owner currently producing that file
+        self._last_access_flush = time.monotonic()
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.bytes_served = 0
+        os.makedirs(root, exist_ok=True)
+        # Oldest access first, so eviction pops from the front
+        self._index = OrderedDict(sorted(
+            self._load_index().items(),
+            key=lambda item: item[1].get("last_access") or item[1].get("created_at") or 0,
+        ))
+        self.total_bytes = sum(entry["size"] for entry in self._index.values())
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def key(youtube_id, quality):
+        return f"{youtube_id}_{quality}"
+
+    def filename_for(self, youtube_id, quality):
+        return f"{self.key(youtube_id, quality)}.mp3"
+
+    def path_for(self, youtube_id, quality):
+        return os.path.join(self.root, self.filename_for(youtube_id, quality))
+
+    def outtmpl(self, quality):
+        """yt-dlp output template that lands files at path_for()"""
+        return os.path.join(self.root, f"%(id)s_{quality}.%(ext)s")
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading download index, rebuilding: {e}")
+        return self._rebuild_index()
+
+    def _rebuild_index(self):
+        """One-time scan for stores created before the index existed.
+
+        Title-named MP3s from the old download code are indexed too (without
+        a youtube_id) so they count against the budget and can be evicted.
+        """
+        index = {}
+        for name in os.listdir(self.root):
+            if not name.endswith('.mp3'):
+                continue
+            path = os.path.join(self.root, name)
+            stat = os.stat(path)
+            match = STORE_FILE_RE.match(name)
+            youtube_id, quality = match.groups() if match else (None, None)
+            index[os.path.splitext(name)[0]] = {
+                "youtube_id": youtube_id,
+                "quality": quality,
+                "file": name,
+                "size": stat.st_size,
+                "title": None,
+                "created_at": stat.st_mtime,
+                "last_access": stat.st_mtime,
+            }
+        self._save_index(index)
+        return index
+
+    def _save_index(self, index=None):
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._index if index is None else index, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+            self._last_access_flush = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error saving download index: {e}")
+
+    def get(self, youtube_id, quality):
+        """Return the index entry for a stored track, or None"""
+        key = self.key(youtube_id, quality)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            if not os.path.exists(os.path.join(self.root, entry["file"])):
+                # Removed behind our back
+                del self._index[key]
+                self.total_bytes -= entry["size"]
+                self._save_index()
+                return None
+            return dict(entry)
+
+    def add(self, youtube_id, quality, title=None):
+        """Record a finished download that was written to path_for()"""
+        path = self.path_for(youtube_id, quality)
+        now = time.time()
+        entry = {
+            "youtube_id": youtube_id,
+            "quality": quality,
+            "file": os.path.basename(path),
+            "size": os.path.getsize(path),
+            "title": title,
+            "created_at": now,
+            "last_access": now,
+        }
+        key = self.key(youtube_id, quality)
+        with self._lock:
+            previous = self._index.pop(key, None)
+            if previous:
+                self.total_bytes -= previous["size"]
+            self._index[key] = entry
+            self.total_bytes += entry["size"]
+            self._evict()
+            self._save_index()
+        return dict(entry)
+
+    def touch(self, filename, bytes_served=0):
+        """Mark a file as just served (moves it to the back of the eviction queue)"""
+        key = os.path.splitext(filename)[0]
+        with self._lock:
+            self.bytes_served += bytes_served
+            entry = self._index.get(key)
+            if entry is None:
+                return
+            entry["last_access"] = time.time()
+            entry["serves"] = entry.get("serves", 0) + 1
+            entry["bytes_served"] = entry.get("bytes_served", 0) + bytes_served
+            self._index.move_to_end(key)
+            if time.monotonic() - self._last_access_flush >= ACCESS_FLUSH_INTERVAL:
+                self._save_index()
+
+    def pin(self, youtube_id, quality):
+        """Protect a track from eviction while a job is working on it"""
+        key = self.key(youtube_id, quality)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, youtube_id, quality):
+        key = self.key(youtube_id, quality)
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+            self._evict()
+
+    def claim(self, youtube_id, quality, owner):
+        """Register owner (e.g. "download" or "stream") as the producer of a track.
+
+        Returns whoever holds the claim: ``owner`` if it was free or already
+        theirs, otherwise the other producer, which the caller should defer to.
+        """
+        key = self.key(youtube_id, quality)
+        with self._lock:
+            return self._producers.setdefault(key, owner)
+
+    def release(self, youtube_id, quality, owner):
+        key = self.key(youtube_id, quality)
+        with self._lock:
+            if self._producers.get(key) == owner:
+                del self._producers[key]
+
+    def _evict(self):
+        """Delete least-recently-served unpinned files until under budget (caller holds the lock)"""
+        if not self.max_bytes or self.total_bytes <= self.max_bytes:
+            return
+        evicted = False
+        for key in list(self._index):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            entry = self._index.pop(key)
+            self.total_bytes -= entry["size"]
+            self.evictions += 1
+            self.evicted_bytes += entry["size"]
+            evicted = True
+            try:
+                os.remove(os.path.join(self.root, entry["file"]))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Could not evict {entry['file']}: {e}")
+            logger.info(f"Evicted {entry['file']} ({entry['size']} bytes) from download store")
+        if evicted:
+            self._save_index()
+
+    def stats(self):
+        with self._lock:
+            disk = shutil.disk_usage(self.root)
+            return {
+                "files": len(self._index),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "usage_pct": round(100.0 * self.total_bytes / self.max_bytes, 1) if self.max_bytes else None,
+                "pinned": len(self._pins),
+                "producing": len(self._producers),
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+                "bytes_served": self.bytes_served,
+                "disk_free_bytes": disk.free,
+            }
@@ -0,0 +1,7 @@
+"""Entry point of a download worker process: python -m download_worker <module:function>"""
+import sys
+
+import download_jobs
+
+if __name__ == "__main__":
+    download_jobs.serve(sys.argv[1] if len(sys.argv) > 1 else "download_jobs:run_download")
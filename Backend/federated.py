@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class _BackendStats:
+    __slots__ = ("calls", "successes", "failures", "timeouts", "wins", "contributions",
+                 "latency_ms", "last_latency_ms")
+
+    def __init__(self):
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.wins = 0
+        self.contributions = 0
+        self.latency_ms = None  # exponentially weighted moving average
+        self.last_latency_ms = None
+
+    def win_rate(self):
+        return self.wins / self.calls if self.calls else 0.0
+
+
+def _fill(primary, secondary):
+    """primary's fields, with any it leaves empty taken from secondary"""
+    track = dict(secondary)
+    track.update((key, value) for key, value in primary.items() if value not in (None, "", []))
+    return track
+
+
+class FederatedSearch:
+    """Query several search backends in parallel and merge what arrives in time.
+
+    ``backends`` maps a name to ``fn(query, limit)`` returning track dicts,
+    most preferred first. Tracks are merged by youtube_id, taking metadata
+    from the most preferred backend that returned the track, whatever order
+    they arrive in; fields it leaves empty are filled in from the others.
+    Each backend that returns a track adds
+    ``1 / (1 + position)`` to its confidence, so a track is confident when one
+    backend ranks it near the top or several backends agree on it. A search
+    stops waiting as soon as ``limit`` tracks are confident, when every
+    backend has answered, or at ``deadline`` seconds, whichever comes first.
+    Backends still running are left to finish in the background.
+
+    Every call records latency (a moving average, including calls that
+    finished after their search had returned) and whether the backend
+    supplied the winning top result. Once a backend has ``min_samples`` calls
+    it is demoted if most of them failed, or if its average latency exceeds
+    ``demote_latency`` seconds and it wins less than ``keep_win_rate`` of the
+    time. Demoted backends only run when the others come up short, and on
+    every ``probe_every``-th search, which lets them earn their place back.
+    """
+
+    def __init__(self, backends, deadline=4.0, confidence=0.5, demote_latency=2.5, keep_win_rate=0.5,
+                 min_samples=5, probe_every=10, rank=None, workers=8, alpha=0.2, name="federated"):
+        self.backends = dict(backends)
+        self.deadline = deadline
+        self.confidence = confidence
+        self.demote_latency = demote_latency
+        self.keep_win_rate = keep_win_rate
+        self.min_samples = min_samples
+        self.probe_every = probe_every
+        self.rank = rank
+        self.alpha = alpha
+        self.name = name
+        self._stats = {backend: _BackendStats() for backend in self.backends}
+        self._preference = {backend: i for i, backend in enumerate(self.backends)}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.searches = 0
+        self.early_returns = 0
+        self.deadline_hits = 0
+        self.fallbacks = 0
+
+    def is_demoted(self, backend):
+        stats = self._stats[backend]
+        if stats.calls < self.min_samples:
+            return False
+        if stats.failures > stats.calls / 2:
+            return True
+        slow = stats.latency_ms is not None and stats.latency_ms > self.demote_latency * 1000
+        return slow and stats.win_rate() < self.keep_win_rate
+
+    def search(self, query, limit=5):
+        """Merged results plus per-backend status for one query"""
+        started = time.monotonic()
+        deadline_at = started + self.deadline
+        with self._lock:
+            self.searches += 1
+            probe = self.probe_every and self.searches % self.probe_every == 0
+            demoted = {backend for backend in self.backends if self.is_demoted(backend)}
+        active = [b for b in self.backends if probe or b not in demoted] or list(self.backends)
+        reserve = [b for b in self.backends if b not in active]
+
+        futures = {self._launch(backend, query, limit): backend for backend in active}
+        status = {backend: "demoted" for backend in reserve}
+        status.update({backend: "pending" for backend in active})
+        merged = {}
+        pending = set(futures)
+        early = False
+        while pending:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                backend = futures[future]
+                if future.exception() is None:
+                    status[backend] = "ok"
+                    self._merge(merged, backend, future.result())
+                else:
+                    status[backend] = "failed"
+            if self._confident(merged) >= limit:
+                early = bool(pending)
+                break
+            if not pending and reserve and len(merged) < limit:
+                # The preferred backends came up short; try the demoted ones in the time left
+                with self._lock:
+                    self.fallbacks += 1
+                for backend in reserve:
+                    future = self._launch(backend, query, limit)
+                    futures[future] = backend
+                    pending.add(future)
+                    status[backend] = "pending"
+                reserve = []
+
+        # Still running: not needed after an early return, otherwise out of time
+        timed_out = [] if early else [futures[f] for f in pending]
+        for future in pending:
+            status[futures[future]] = "skipped" if early else "timeout"
+
+        ordered = sorted(merged.values(), key=lambda entry: (-entry["confidence"], entry["order"]))
+        tracks = [dict(entry["track"], sources=sorted(entry["sources"], key=self._preference.get))
+                  for entry in ordered]
+        tracks = self.rank(query, tracks, limit) if self.rank else tracks[:limit]
+        self._score(tracks, timed_out, early)
+        return {
+            "tracks": tracks,
+            "backends": status,
+            "early": early,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
+    def _launch(self, backend, query, limit):
+        with self._lock:
+            self._stats[backend].calls += 1
+        started = time.monotonic()
+        future = self._executor.submit(self.backends[backend], query, limit)
+        future.add_done_callback(lambda f: self._record(backend, started, f))
+        return future
+
+    def _record(self, backend, started, future):
+        latency = (time.monotonic() - started) * 1000
+        error = future.exception()
+        if error is not None:
+            logger.error(f"{self.name} backend {backend} failed: {error}")
+        with self._lock:
+            stats = self._stats[backend]
+            stats.last_latency_ms = latency
+            if stats.latency_ms is None:
+                stats.latency_ms = latency
+            else:
+                stats.latency_ms += self.alpha * (latency - stats.latency_ms)
+            if error is None:
+                stats.successes += 1
+            else:
+                stats.failures += 1
+
+    def _merge(self, merged, backend, tracks):
+        for position, track in enumerate(tracks or []):
+            youtube_id = track.get("youtube_id")
+            if not youtube_id:
+                continue  # e.g. a Spotify hit whose YouTube match didn't resolve
+            entry = merged.get(youtube_id)
+            if entry is None:
+                track = dict(track)
+                track.setdefault("id", f"youtube_{youtube_id}")
+                merged[youtube_id] = {"track": track, "confidence": 1.0 / (1 + position),
+                                      "sources": [backend], "order": len(merged)}
+            elif backend not in entry["sources"]:
+                entry["confidence"] += 1.0 / (1 + position)
+                preferred = min(entry["sources"], key=self._preference.get)
+                if self._preference[backend] < self._preference[preferred]:
+                    entry["track"] = _fill(track, entry["track"])
+                else:
+                    entry["track"] = _fill(entry["track"], track)
+                entry["sources"].append(backend)
+
+    def _confident(self, merged):
+        return sum(1 for entry in merged.values() if entry["confidence"] >= self.confidence)
+
+    def _score(self, tracks, timed_out, early):
+        with self._lock:
+            if early:
+                self.early_returns += 1
+            if timed_out:
+                self.deadline_hits += 1
+            for backend in timed_out:
+                self._stats[backend].timeouts += 1
+            for backend in {source for track in tracks for source in track["sources"]}:
+                self._stats[backend].contributions += 1
+            if tracks:
+                for backend in tracks[0]["sources"]:
+                    self._stats[backend].wins += 1
+
+    def stats(self):
+        with self._lock:
+            backends = {
+                backend: {
+                    "calls": s.calls,
+                    "successes": s.successes,
+                    "failures": s.failures,
+                    "timeouts": s.timeouts,
+                    "latency_ms": round(s.latency_ms, 1) if s.latency_ms is not None else None,
+                    "last_latency_ms": round(s.last_latency_ms, 1) if s.last_latency_ms is not None else None,
+                    "wins": s.wins,
+                    "win_rate": round(s.win_rate(), 4),
+                    "contributions": s.contributions,
+                    "demoted": self.is_demoted(backend),
+                }
+                for backend, s in self._stats.items()
+            }
+            return {
+                "searches": self.searches,
+                "early_returns": self.early_returns,
+                "deadline_hits": self.deadline_hits,
+                "fallbacks": self.fallbacks,
+                "deadline": self.deadline,
+                "backends": backends,
+            }
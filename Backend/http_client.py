@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Shared connection pool settings (one pool per host, reused across requests)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+# Longest a server's Retry-After header may make a request sleep before retrying
+MAX_RETRY_AFTER = float(os.getenv("HTTP_MAX_RETRY_AFTER", "2"))
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+HOST_TIMEOUTS = {
+    "www.youtube.com": (3.05, 10),
+    "suggestqueries.google.com": (2, 3),
+    "accounts.spotify.com": (3.05, 5),
+    "api.spotify.com": (3.05, 8),
+}
+
+# A user is waiting on these: a read timeout fails fast instead of being retried
+INTERACTIVE_HOSTS = frozenset(["www.youtube.com", "suggestqueries.google.com"])
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class CappedRetry(Retry):
+    """Retry that never sleeps longer than MAX_RETRY_AFTER for a Retry-After header"""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+
+def build_retry(retries, backoff, read_retries):
+    return CappedRetry(
+        total=retries,
+        connect=retries,
+        read=read_retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the last response back to the caller
+    )
+
+
+def build_session(pool_size=POOL_SIZE, retries=RETRIES, backoff=BACKOFF, interactive_hosts=INTERACTIVE_HOSTS):
+    """Create a keep-alive session with pooled adapters and retry/backoff.
+
+    Interactive hosts get their own adapter that still retries connect errors
+    and 5xx/429 responses but not read timeouts, so a slow upstream costs one
+    read timeout rather than ``retries + 1`` of them.
+    """
+    adapter = HTTPAdapter(pool_connections=len(HOST_TIMEOUTS), pool_maxsize=pool_size,
+                          max_retries=build_retry(retries, backoff, retries))
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    for host in interactive_hosts:
+        interactive = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                  max_retries=build_retry(retries, backoff, 0))
+        # requests picks the adapter with the longest matching prefix
+        session.mount(f"https://{host}", interactive)
+        session.mount(f"http://{host}", interactive)
+    return session
+
+
+def get_session():
+    """Return the process-wide session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def configure(pool_size=POOL_SIZE, retries=RETRIES, backoff=BACKOFF, host_timeouts=None):
+    """Replace the shared session, e.g. with a bigger pool for a busy worker"""
+    global _session
+    if host_timeouts:
+        HOST_TIMEOUTS.update(host_timeouts)
+    with _session_lock:
+        old, _session = _session, build_session(pool_size, retries, backoff)
+    if old is not None:
+        old.close()
+    logger.info(f"HTTP session configured: pool_size={pool_size}, retries={retries}, backoff={backoff}")
+
+
+def timeout_for(url):
+    return HOST_TIMEOUTS.get(urlsplit(url).hostname, DEFAULT_TIMEOUT)
+
+
+def request(method, url, **kwargs):
+    """Send a request through the shared pool using the host's timeout unless one is given"""
+    kwargs.setdefault("timeout", timeout_for(url))
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -1,11 +1,16 @@
 import os
-import requests
+import re
 import json
+import time
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import yt_dlp
 import logging
-from urllib.parse import quote_plus
+import http_client
+from cache import TTLCache, SingleFlight
+from suggestions import SuggestionEngine
+from ytdl_pool import YoutubeDLPool
+from ytdl_search import SEARCH_YDL_POOL, SEARCH_FLIGHTS, ytdlp_search
+from urllib.parse import quote_plus, urlsplit, parse_qs
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +28,48 @@ CORS(app, resources={
     }
 })
 
+# Pre-warmed YoutubeDL instances, one pool per option profile (the search pool lives in ytdl_search)
+STREAM_FORMAT = 'bestaudio/best'
+STREAM_YDL_POOL = YoutubeDLPool({
+    'format': STREAM_FORMAT,
+    'quiet': True,
+    'no_warnings': True,
+}, name="stream")
+SEARCH_YDL_POOL.warm_in_background()
+STREAM_YDL_POOL.warm_in_background()
+
+# Resolved googlevideo URLs, kept until shortly before their signed expiry
+STREAM_EXPIRY_MARGIN = int(os.getenv("STREAM_EXPIRY_MARGIN", "300"))
+STREAM_CACHE = TTLCache(
+    maxsize=int(os.getenv("STREAM_CACHE_SIZE", "1024")),
+    ttl=int(os.getenv("STREAM_CACHE_DEFAULT_TTL", "1800")),  # used when the URL carries no expire=
+    refresh_ahead=int(os.getenv("STREAM_CACHE_REFRESH_AHEAD", "600")),
+    name="stream_cache",
+)
+STREAM_FLIGHTS = SingleFlight("stream")
+
+def fetch_google_suggestions(query):
+    """YouTube completions from Google Suggest; raises so failures aren't cached"""
+    url = f"https://suggestqueries.google.com/complete/search?client=youtube&ds=yt&client=firefox&q={quote_plus(query)}"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    }
+    response = http_client.get(url, headers=headers)
+    response.raise_for_status()
+    data = json.loads(response.text)
+    return data[1] if len(data) > 1 else []
+
+# Keystroke autocomplete: prefix trie over Google Suggest, blended with popular local searches
+SUGGESTIONS = SuggestionEngine(
+    fetch_google_suggestions,
+    maxsize=int(os.getenv("SUGGESTIONS_CACHE_SIZE", "20000")),
+    ttl=int(os.getenv("SUGGESTIONS_CACHE_TTL", "3600")),
+    derive_min=int(os.getenv("SUGGESTIONS_DERIVE_MIN", "5")),
+    popular_size=int(os.getenv("SUGGESTIONS_POPULAR_SIZE", "5000")),
+)
+
+VIDEO_ID_RE = re.compile(r'(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})')
+
 # Security Configuration
 HYDE_API_KEY = os.getenv("HYDE_API_KEY", "hyde-api-key-2026")
 
@@ -42,46 +89,60 @@ def require_api_key(f):
     decorated.__name__ = f.__name__
     return decorated
 
-def format_track_ytdlp(entry):
-    """Formats raw yt-dlp entry into the standardized track object."""
-    video_id = entry.get('id')
-    if not video_id:
-        return None
-    return {
-        "id": f"youtube_{video_id}",
-        "name": entry.get("title", "Unknown Title"),
-        "artists": ["YouTube"],
-        "album": "YouTube Music",
-        "image": f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
-        "youtube_id": video_id,
-        "duration": int(entry.get("duration", 0)) * 1000,
-        "source": "youtube"
-    }
+def video_id_from_url(url):
+    """Pull the 11-character video id out of a YouTube URL (or accept a bare id)."""
+    match = VIDEO_ID_RE.search(url)
+    if match:
+        return match.group(1)
+    if re.fullmatch(r'[A-Za-z0-9_-]{11}', url):
+        return url
+    return None
+
+def stream_url_ttl(stream_url):
+    """Seconds a signed googlevideo URL stays usable, minus STREAM_EXPIRY_MARGIN."""
+    expire = parse_qs(urlsplit(stream_url).query).get("expire", [None])[0]
+    if expire is None:
+        match = re.search(r'/expire/(\d+)', stream_url)
+        expire = match.group(1) if match else None
+    if expire is None or not expire.isdigit():
+        return STREAM_CACHE.ttl
+    return int(expire) - time.time() - STREAM_EXPIRY_MARGIN
+
+def extract_stream(url):
+    """Run yt-dlp extraction for a playable audio URL."""
+    with STREAM_YDL_POOL.instance() as ydl:
+        info = ydl.extract_info(url, download=False)
+        return {
+            "title": info.get("title"),
+            "stream_url": info.get("url")
+        }
 
-def ytdlp_search(query, limit=10):
-    """Reliable YouTube search using yt-dlp's built-in search service."""
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'noplaylist': True,
-        'quiet': True,
-        'no_warnings': True,
-        'extract_flat': True,
-        'skip_download': True,
-    }
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            data = ydl.extract_info(f"ytsearch{limit}:{query}", download=False)
-            entries = data.get('entries', [])
-            tracks = [format_track_ytdlp(entry) for entry in entries if entry]
-            return [t for t in tracks if t]
-    except Exception as e:
-        logger.error(f"yt-dlp search error for query '{query}': {str(e)}")
-        raise e
+def resolve_stream(url):
+    """Return {title, stream_url}, reusing a cached URL until it nears expiry."""
+    video_id = video_id_from_url(url)
+    key = (video_id or url, STREAM_FORMAT)
+    return STREAM_CACHE.get_or_load(
+        key,
+        lambda: STREAM_FLIGHTS.do(key, lambda: extract_stream(url)),
+        ttl=lambda info: stream_url_ttl(info["stream_url"]),
+        cache_if=lambda info: bool(info.get("stream_url")) and stream_url_ttl(info["stream_url"]) > 0,
+    )
 
 @app.route("/", methods=["GET"])
 def home():
     return jsonify({"status": "Hyde Music API running", "engine": "yt-dlp native search"})
 
+@app.route("/stats", methods=["GET", "OPTIONS"])
+@require_api_key
+def stats():
+    return jsonify({
+        "search_single_flight": SEARCH_FLIGHTS.stats(),
+        "stream_cache": STREAM_CACHE.stats(),
+        "stream_single_flight": STREAM_FLIGHTS.stats(),
+        "suggestions": SUGGESTIONS.stats(),
+        "ytdl_pools": {pool.name: pool.stats() for pool in (SEARCH_YDL_POOL, STREAM_YDL_POOL)},
+    })
+
 @app.route("/search", methods=["GET", "OPTIONS"])
 @require_api_key
 def search():
@@ -90,6 +151,7 @@ def search():
         return jsonify({"error": "Query parameter 'q' is required"}), 400
 
     logger.info(f"YTDLP GET Search: {query}")
+    SUGGESTIONS.record_query(query)
     try:
         tracks = ytdlp_search(query)
         return jsonify(tracks)
@@ -105,6 +167,7 @@ def search_music():
     
     query = data.get("query")
     logger.info(f"YTDLP POST Search: {query}")
+    SUGGESTIONS.record_query(query)
     try:
         tracks = ytdlp_search(query)
         return jsonify({"tracks": tracks})
@@ -118,18 +181,8 @@ def get_suggestions():
     if not query:
         return jsonify([])
     
-    logger.info(f"Fetching suggestions for: {query}")
     try:
-        url = f"https://suggestqueries.google.com/complete/search?client=youtube&ds=yt&client=firefox&q={quote_plus(query)}"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            data = json.loads(response.text)
-            if len(data) > 1:
-                return jsonify(data[1])
-        return jsonify([])
+        return jsonify(SUGGESTIONS.suggest(query))
     except Exception as e:
         logger.error(f"Suggestions error: {e}")
         return jsonify([])
@@ -142,18 +195,8 @@ def stream():
         return jsonify({"error": "URL parameter 'url' is required"}), 400
 
     logger.info(f"Extracting stream for: {url}")
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'quiet': True,
-        'no_warnings': True,
-    }
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            return jsonify({
-                "title": info.get("title"),
-                "stream_url": info.get("url")
-            })
+        return jsonify(resolve_stream(url))
     except Exception as e:
         logger.error(f"Stream extraction error: {str(e)}")
         return jsonify({"error": "Failed to extract stream"}), 500
@@ -0,0 +1,47 @@
+import gzip
+import hashlib
+import os
+
+from flask import Response
+
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "300"))
+
+
+class PrecomputedResponse:
+    """A JSON body serialized and gzipped once, served from memory.
+
+    Clients that accept gzip get the compressed bytes; anyone else gets the
+    plain body. Both carry a strong ETag derived from the content, and a
+    matching If-None-Match on GET/HEAD is answered with an empty 304.
+    """
+
+    def __init__(self, body, mimetype="application/json", max_age=CATALOG_MAX_AGE):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.mimetype = mimetype
+        self.max_age = max_age
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.etag = digest
+        self.gzip_etag = f"{digest}-gz"
+        cache_control = f"public, max-age={max_age}"
+        self._headers = [("ETag", f'"{self.etag}"'), ("Vary", "Accept-Encoding"), ("Cache-Control", cache_control)]
+        self._gzip_headers = [("ETag", f'"{self.gzip_etag}"'), ("Vary", "Accept-Encoding"),
+                              ("Cache-Control", cache_control), ("Content-Encoding", "gzip")]
+
+    def respond(self, request):
+        use_gzip = "gzip" in request.accept_encodings
+        headers = self._gzip_headers if use_gzip else self._headers
+        # Either representation's tag means the client already has this content
+        if request.method in ("GET", "HEAD") and "If-None-Match" in request.headers and \
+                (self.etag in request.if_none_match or self.gzip_etag in request.if_none_match):
+            return Response(status=304, headers=headers[:3])
+        return Response(self.gzipped if use_gzip else self.body, headers=headers, mimetype=self.mimetype)
+
+    def stats(self):
+        return {
+            "bytes": len(self.body),
+            "gzip_bytes": len(self.gzipped),
+            "etag": self.etag,
+        }
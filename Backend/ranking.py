@@ -0,0 +1,109 @@
+import os
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+
+# How much each feature contributes to a candidate's score
+DEFAULT_WEIGHTS = {
+    "song_bm25": 1.0,      # BM25 of the query tokens against the song name
+    "artist_bm25": 0.6,    # ...and against the artist names
+    "coverage": 1.5,       # share of query tokens found anywhere in song + artist
+    "exact": 3.0,          # song name equals the query
+    "song_phrase": 1.5,    # whole query appears in the song name
+    "artist_phrase": 0.8,  # whole query appears in the artist names
+    "position": 0.5,       # upstream order, decaying as 1 / (1 + rank)
+}
+
+
+def weights_from_env(defaults=DEFAULT_WEIGHTS):
+    """Override weights with RANK_WEIGHT_<FEATURE> variables, e.g. RANK_WEIGHT_ARTIST_BM25=1.0"""
+    return {name: float(os.getenv(f"RANK_WEIGHT_{name.upper()}", value)) for name, value in defaults.items()}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class Ranker:
+    """Scores a batch of search candidates at once and returns them best first.
+
+    The candidates themselves are the BM25 corpus: a query token that shows
+    up in every result says little, and a rarer one says more. Tokenizing is
+    the only per-candidate Python work. Term frequencies go into
+    (candidates x query tokens) arrays, and every feature and the weighted
+    sum are whole-array NumPy operations. Ties keep the upstream order.
+    """
+
+    def __init__(self, weights=None, k1=1.2, b=0.75):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.k1 = k1
+        self.b = b
+
+    def scores(self, query, candidates):
+        """One float per candidate track ({"name", "artists", ...}), in input order"""
+        count = len(candidates)
+        query_text = " ".join(tokenize(query))
+        terms = list(dict.fromkeys(query_text.split()))
+        if not count:
+            return np.zeros(0)
+
+        column = {term: j for j, term in enumerate(terms)}
+        song_tokens = [tokenize(track.get("name") or "") for track in candidates]
+        artist_tokens = [tokenize(" ".join(track.get("artists") or [])) for track in candidates]
+        song_len = np.fromiter(map(len, song_tokens), dtype=float, count=count)
+        artist_len = np.fromiter(map(len, artist_tokens), dtype=float, count=count)
+        song_tf = self._term_frequencies(song_tokens, column)
+        artist_tf = self._term_frequencies(artist_tokens, column)
+
+        if query_text:
+            padded_query = f" {query_text} "
+            song_texts = [" ".join(tokens) for tokens in song_tokens]
+            exact = np.array([text == query_text for text in song_texts])
+            song_phrase = np.array([padded_query in f" {text} " for text in song_texts])
+            artist_phrase = np.array([padded_query in f" {' '.join(tokens)} " for tokens in artist_tokens])
+        else:
+            exact = song_phrase = artist_phrase = np.zeros(count, dtype=bool)
+
+        present = (song_tf + artist_tf) > 0
+        if terms:
+            df = present.sum(axis=0)
+            idf = np.log1p((count - df + 0.5) / (df + 0.5))
+            coverage = present.mean(axis=1)
+        else:
+            idf = np.zeros(0)
+            coverage = np.zeros(count)
+
+        w = self.weights
+        total = (w["song_bm25"] * self._bm25(song_tf, song_len, idf)
+                 + w["artist_bm25"] * self._bm25(artist_tf, artist_len, idf)
+                 + w["coverage"] * coverage
+                 + w["exact"] * exact
+                 + w["song_phrase"] * song_phrase
+                 + w["artist_phrase"] * artist_phrase
+                 + w["position"] / (1.0 + np.arange(count)))
+        return total
+
+    @staticmethod
+    def _term_frequencies(token_lists, column):
+        """(candidates x query terms) counts from one bincount over flattened cell indices"""
+        width = len(column)
+        cells = [i * width + column[token] for i, tokens in enumerate(token_lists)
+                 for token in tokens if token in column]
+        size = len(token_lists) * width
+        return np.bincount(cells, minlength=size).reshape(len(token_lists), width).astype(float)
+
+    def _bm25(self, tf, lengths, idf):
+        average = lengths.mean() or 1.0
+        norm = self.k1 * (1 - self.b + self.b * lengths / average)
+        return (idf * tf * (self.k1 + 1) / (tf + norm[:, None])).sum(axis=1)
+
+    def rank(self, query, candidates, limit=None):
+        """Candidates sorted by score, best first, cut to limit"""
+        if not candidates:
+            return []
+        order = np.argsort(-self.scores(query, candidates), kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return [candidates[i] for i in order]
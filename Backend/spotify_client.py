@@ -0,0 +1,314 @@
+"""Spotify track search with YouTube ids matched in.
+
+Shared by music.py and main_api's federated search. Importing this module
+starts nothing and reads no files: the lookup pool, the Spotify token and
+the Spotify -> YouTube match map are all set up on first use.
+"""
+from base64 import b64encode
+import http_client
+from youtubesearchpython import VideosSearch
+import os
+import atexit
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# YouTube matching: bounded worker pool and a per-request deadline
+MATCH_WORKERS = int(os.getenv("YT_MATCH_WORKERS", "8"))
+MATCH_DEADLINE = float(os.getenv("YT_MATCH_DEADLINE", "8"))
+
+# ========================
+# SPOTIFY -> YOUTUBE MATCH CACHE
+# ========================
+
+# Next to this file rather than the working directory, so every launcher shares one map
+MATCH_CACHE_FILE = os.getenv(
+    "YT_MATCH_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "spotify_youtube_map.json"),
+)
+# Oldest matches are dropped past this many entries (~100 bytes each on disk)
+MATCH_CACHE_SIZE = int(os.getenv("YT_MATCH_CACHE_SIZE", "50000"))
+# New matches reach disk at most once per this many seconds, off the request path
+MATCH_FLUSH_DEBOUNCE = float(os.getenv("YT_MATCH_FLUSH_DEBOUNCE", "2"))
+MATCH_LOCK = threading.Lock()
+
+def trim_matches(matches):
+    """Drop the oldest entries (dicts keep insertion order) beyond MATCH_CACHE_SIZE"""
+    excess = len(matches) - MATCH_CACHE_SIZE
+    for spotify_id in list(matches)[:max(excess, 0)]:
+        del matches[spotify_id]
+    return matches
+
+def load_match_cache():
+    """Load the Spotify track id -> youtube_id map"""
+    if not os.path.exists(MATCH_CACHE_FILE):
+        return {}
+    try:
+        with open(MATCH_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return trim_matches(json.load(f))
+    except Exception as e:
+        logger.error(f"Error loading match cache: {e}")
+        return {}
+
+def save_match_cache(matches):
+    """Write the match map atomically (temp file + rename); returns False if it failed"""
+    tmp_path = f"{MATCH_CACHE_FILE}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(matches, f)
+        os.replace(tmp_path, MATCH_CACHE_FILE)
+        return True
+    except Exception as e:
+        logger.error(f"Error saving match cache: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+YOUTUBE_MATCHES = {}  # read from MATCH_CACHE_FILE on first use
+_matches_loaded = False
+_matches_dirty = False
+_flush_lock = threading.Lock()
+_flush_wake = threading.Event()
+_flusher = None
+
+def _ensure_loaded():
+    """Read the map file the first time it is needed (caller holds MATCH_LOCK)"""
+    global _matches_loaded
+    if not _matches_loaded:
+        YOUTUBE_MATCHES.update(load_match_cache())
+        _matches_loaded = True
+
+def flush_matches():
+    """Write the map if it changed: snapshot under MATCH_LOCK, disk I/O outside it"""
+    global _matches_dirty
+    with _flush_lock:
+        with MATCH_LOCK:
+            if not _matches_dirty:
+                return
+            snapshot = dict(YOUTUBE_MATCHES)
+            _matches_dirty = False
+        if not save_match_cache(snapshot):
+            with MATCH_LOCK:
+                _matches_dirty = True  # retried on the next flush
+
+def _flush_loop():
+    while True:
+        _flush_wake.wait()
+        time.sleep(MATCH_FLUSH_DEBOUNCE)  # batch the matches that arrive meanwhile
+        _flush_wake.clear()
+        flush_matches()
+
+def _schedule_flush():
+    """Mark the map dirty and wake the flusher (caller holds MATCH_LOCK)"""
+    global _matches_dirty, _flusher
+    _matches_dirty = True
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, daemon=True, name="yt-match-flush")
+        _flusher.start()
+        atexit.register(flush_matches)
+    _flush_wake.set()
+
+# ========================
+# SPOTIFY TOKEN
+# ========================
+
+TOKEN_REFRESH_MARGIN = int(os.getenv("SPOTIFY_TOKEN_REFRESH_MARGIN", "300"))
+
+class SpotifyTokenManager:
+    """Process-wide client-credentials token, refreshed shortly before expires_in.
+
+    Once the token is inside the refresh margin one request renews it while
+    the others keep using the still-valid current token.
+    """
+
+    def __init__(self, client_id, client_secret, margin=TOKEN_REFRESH_MARGIN):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.margin = margin
+        self._token = None
+        self._expires_at = 0
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh_ms = None
+        self.total_refresh_ms = 0.0
+        self.last_error = None
+
+    def _fresh(self, now):
+        return self._token is not None and now < self._expires_at - self.margin
+
+    def _refresh(self):
+        url = "https://accounts.spotify.com/api/token"
+        auth_header = {
+            "Authorization": "Basic " + b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        }
+        data = {"grant_type": "client_credentials"}
+        started = time.monotonic()
+        try:
+            res = http_client.post(url, headers=auth_header, data=data)
+            payload = res.json()
+            token = payload.get("access_token")
+            if res.status_code != 200 or not token:
+                raise ValueError(f"status {res.status_code}: {payload.get('error', 'no access_token')}")
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Spotify token refresh failed: {e}")
+            return
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self.last_refresh_ms = round(elapsed_ms, 1)
+            self.total_refresh_ms += elapsed_ms
+        self._expires_at = started + int(payload.get("expires_in", 3600))
+        self._token = token
+        self.refreshes += 1
+
+    def get_token(self):
+        if not self.client_id or not self.client_secret:
+            return None
+        now = time.monotonic()
+        if self._fresh(now):
+            return self._token
+
+        if self._token is not None and now < self._expires_at:
+            # Still valid: refresh once, everyone else keeps the current token
+            if self._refresh_lock.acquire(blocking=False):
+                try:
+                    self._refresh()
+                finally:
+                    self._refresh_lock.release()
+            return self._token
+
+        # No usable token: wait for whoever is refreshing
+        with self._refresh_lock:
+            if not self._fresh(time.monotonic()):
+                self._refresh()
+        return self._token if time.monotonic() < self._expires_at else None
+
+    def stats(self):
+        return {
+            "has_token": self._token is not None,
+            "expires_in": max(0, round(self._expires_at - time.monotonic())) if self._token else 0,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_refresh_ms": self.last_refresh_ms,
+            "avg_refresh_ms": round(self.total_refresh_ms / (self.refreshes + self.failures), 1)
+            if self.refreshes + self.failures else None,
+            "last_error": self.last_error,
+        }
+
+# Built on first use, once the caller has loaded its environment (.env included)
+_token_manager = None
+_executor = None
+_init_lock = threading.Lock()
+
+def token_manager():
+    global _token_manager
+    with _init_lock:
+        if _token_manager is None:
+            _token_manager = SpotifyTokenManager(os.getenv('SPOTIFY_CLIENT_ID'), os.getenv('SPOTIFY_CLIENT_SECRET'))
+        return _token_manager
+
+def get_spotify_token():
+    return token_manager().get_token()
+
+def match_executor():
+    """Bounded pool for YouTube lookups, started on first use"""
+    global _executor
+    with _init_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MATCH_WORKERS, thread_name_prefix="yt-match")
+        return _executor
+
+# ========================
+# SPOTIFY -> YOUTUBE MATCHING
+# ========================
+
+def find_youtube_id(track):
+    """Look up the best YouTube match for a Spotify track"""
+    yt_query = f"{track['name']} {track['artists'][0]['name']} audio"
+    yt_result = VideosSearch(yt_query, limit=1).result()
+    return yt_result["result"][0]["id"] if yt_result["result"] else None
+
+def _remember_match(spotify_id, future):
+    """Record a finished lookup, even one that missed its request's deadline"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    yt_id = future.result()
+    if yt_id:
+        with MATCH_LOCK:
+            YOUTUBE_MATCHES.pop(spotify_id, None)  # re-insert as the newest entry
+            YOUTUBE_MATCHES[spotify_id] = yt_id
+            trim_matches(YOUTUBE_MATCHES)
+            _schedule_flush()
+
+def match_youtube_ids(tracks, deadline=MATCH_DEADLINE):
+    """Resolve youtube ids for Spotify tracks concurrently.
+
+    Cached ids are used directly; the rest are looked up on match_executor().
+    Lookups still running at the deadline are left out of the result.
+    New matches are written to disk later by the background flusher.
+    """
+    with MATCH_LOCK:
+        _ensure_loaded()
+        matches = {t["id"]: YOUTUBE_MATCHES[t["id"]] for t in tracks if t["id"] in YOUTUBE_MATCHES}
+
+    executor = match_executor()
+    futures = {}
+    for track in tracks:
+        if track["id"] in matches or track["id"] in futures:
+            continue
+        future = executor.submit(find_youtube_id, track)
+        future.add_done_callback(lambda f, spotify_id=track["id"]: _remember_match(spotify_id, f))
+        futures[track["id"]] = future
+
+    if futures:
+        done, not_done = wait(futures.values(), timeout=deadline)
+        for spotify_id, future in futures.items():
+            if future in done and future.exception() is None:
+                matches[spotify_id] = future.result()
+                _remember_match(spotify_id, future)  # wait() can return before the done callback runs
+            elif future in done:
+                logger.error(f"YouTube lookup failed for {spotify_id}: {future.exception()}")
+        for future in not_done:
+            future.cancel()  # drop lookups that never started
+        if not_done:
+            logger.warning(f"{len(not_done)}/{len(futures)} YouTube lookups missed the {deadline}s deadline")
+    return matches
+
+def spotify_search(query, limit=50, token=None):
+    """Spotify track search with YouTube ids matched in; raises RuntimeError if Spotify fails"""
+    token = token or get_spotify_token()
+    if not token:
+        raise RuntimeError("Spotify token unavailable")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"q": query, "type": "track", "limit": limit}
+    res = http_client.get("https://api.spotify.com/v1/search", headers=headers, params=params)
+    if res.status_code != 200:
+        raise RuntimeError(f"Spotify search failed with status {res.status_code}")
+
+    tracks = res.json().get("tracks", {}).get("items", [])
+    youtube_ids = match_youtube_ids(tracks)
+    results = []
+    for track in tracks:
+        results.append({
+            "name": track["name"],
+            "artists": [a["name"] for a in track["artists"]],
+            "album": track["album"]["name"],
+            "image": track["album"]["images"][0]["url"],
+            "youtube_id": youtube_ids.get(track["id"])
+        })
+    return results
+
+def stats():
+    with MATCH_LOCK:
+        matches = len(YOUTUBE_MATCHES)
+    return {
+        "spotify_token": token_manager().stats(),
+        "youtube_matches": matches,
+    }
@@ -0,0 +1,127 @@
+import os
+import sys
+import tempfile
+import time
+
+from audio_proxy import AudioProxy, TrackBusy
+from download_store import DownloadStore
+
+YOUTUBE_ID = "dQw4w9WgXcQ"
+
+
+def fake_resolve(youtube_id):
+    return f"https://example.invalid/{youtube_id}", {}, f"Title {youtube_id}"
+
+
+def fake_ffmpeg(chunks=5, delay=0.2, exit_code=0):
+    """Command that writes `chunks` blocks of MP3-ish bytes slowly, like a live transcode"""
+    def command(source_url, headers, quality):
+        script = (
+            "import sys, time\n"
+            f"for i in range({chunks}):\n"
+            "    sys.stdout.buffer.write(bytes([65 + i]) * 1000)\n"
+            "    sys.stdout.buffer.flush()\n"
+            f"    time.sleep({delay})\n"
+            f"sys.exit({exit_code})\n"
+        )
+        return [sys.executable, "-c", script]
+    return command
+
+
+def wait_until(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condition not reached")
+
+
+def test_first_bytes_arrive_before_transcode_ends():
+    """Chunks are served while ffmpeg runs and the result lands in the store"""
+    with tempfile.TemporaryDirectory() as root:
+        store = DownloadStore(root)
+        proxy = AudioProxy(store, "192", resolve=fake_resolve, command=fake_ffmpeg())
+        started = time.monotonic()
+        chunks = proxy.stream(YOUTUBE_ID)
+        first = next(chunks)
+        assert time.monotonic() - started < 0.8
+        assert first.startswith(b"A")
+        assert store.get(YOUTUBE_ID, "192") is None
+
+        body = first + b"".join(chunks)
+        assert body == b"".join(bytes([65 + i]) * 1000 for i in range(5))
+        wait_until(lambda: store.get(YOUTUBE_ID, "192") is not None)
+        entry = store.get(YOUTUBE_ID, "192")
+        assert entry["size"] == 5000
+        assert entry["title"] == f"Title {YOUTUBE_ID}"
+        assert [n for n in os.listdir(root) if n.endswith(".tmp")] == []
+        assert proxy.stats()["completed"] == 1
+
+
+def test_concurrent_listeners_share_one_transcode():
+    with tempfile.TemporaryDirectory() as root:
+        store = DownloadStore(root)
+        proxy = AudioProxy(store, "192", resolve=fake_resolve, command=fake_ffmpeg(chunks=3, delay=0.1))
+        first = proxy.stream(YOUTUBE_ID)
+        second = proxy.stream(YOUTUBE_ID)
+        assert b"".join(first) == b"".join(second)
+        stats = proxy.stats()
+        assert stats["started"] == 1
+        assert stats["joined"] == 1
+
+
+def test_disconnected_client_still_stores_file():
+    """Closing the response early does not abort the tee into the store"""
+    with tempfile.TemporaryDirectory() as root:
+        store = DownloadStore(root)
+        proxy = AudioProxy(store, "192", resolve=fake_resolve, command=fake_ffmpeg(chunks=3, delay=0.1))
+        chunks = proxy.stream(YOUTUBE_ID)
+        next(chunks)
+        chunks.close()
+        wait_until(lambda: store.get(YOUTUBE_ID, "192") is not None)
+        assert store.get(YOUTUBE_ID, "192")["size"] == 3000
+
+
+def test_failed_transcode_is_not_stored():
+    with tempfile.TemporaryDirectory() as root:
+        store = DownloadStore(root)
+        proxy = AudioProxy(store, "192", resolve=fake_resolve, command=fake_ffmpeg(chunks=0, exit_code=1))
+        try:
+            proxy.stream(YOUTUBE_ID)
+            assert False, "expected RuntimeError"
+        except RuntimeError as e:
+            assert "exited with 1" in str(e)
+        assert store.get(YOUTUBE_ID, "192") is None
+        assert os.listdir(root) == ["index.json"]
+        assert proxy.stats()["failed"] == 1
+
+
+def test_track_claimed_by_download_job_is_not_transcoded():
+    """The proxy defers to a download job writing the same track, and holds its own claim while running"""
+    with tempfile.TemporaryDirectory() as root:
+        store = DownloadStore(root)
+        proxy = AudioProxy(store, "192", resolve=fake_resolve, command=fake_ffmpeg(chunks=3, delay=0.1))
+        assert store.claim(YOUTUBE_ID, "192", "download") == "download"
+        try:
+            proxy.stream(YOUTUBE_ID)
+            assert False, "expected TrackBusy"
+        except TrackBusy as e:
+            assert e.owner == "download"
+        assert proxy.stats()["started"] == 0
+
+        store.release(YOUTUBE_ID, "192", "download")
+        chunks = proxy.stream(YOUTUBE_ID)
+        assert store.claim(YOUTUBE_ID, "192", "download") == "stream"
+        b"".join(chunks)
+        wait_until(lambda: store.stats()["producing"] == 0)
+        assert store.get(YOUTUBE_ID, "192") is not None
+
+
+if __name__ == "__main__":
+    test_first_bytes_arrive_before_transcode_ends()
+    test_concurrent_listeners_share_one_transcode()
+    test_disconnected_client_still_stores_file()
+    test_failed_transcode_is_not_stored()
+    test_track_claimed_by_download_job_is_not_transcoded()
+    print("✅ audio proxy tests passed")
@@ -0,0 +1,170 @@
+import threading
+import time
+
+from cache import TTLCache, SingleFlight
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_hit_miss_and_expiry():
+    """Fresh entries hit, expired entries miss"""
+    cache = TTLCache(maxsize=4, ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_lru_eviction():
+    """The least recently used key is evicted first"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get_or_load_skips_vetoed_values():
+    """cache_if=bool keeps empty results out of the cache"""
+    cache = TTLCache(maxsize=4, ttl=60)
+    calls = []
+    loader = lambda: calls.append(1) or []
+    cache.get_or_load("q", loader, cache_if=bool)
+    cache.get_or_load("q", loader, cache_if=bool)
+    assert len(calls) == 2
+
+
+def test_get_or_refresh_leaves_misses_to_the_caller():
+    cache = TTLCache(maxsize=4, ttl=60)
+    loader = lambda: ["fresh"]
+    assert cache.get_or_refresh("q", loader) == (None, False)
+    cache.set("q", ["track"])
+    assert cache.get_or_refresh("q", loader) == (["track"], True)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_stale_while_revalidate():
+    """Stale entries are served immediately and refreshed in the background"""
+    cache = TTLCache(maxsize=4, ttl=0.01, stale_ttl=60)
+    cache.set("q", "old")
+    time.sleep(0.02)
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return "new"
+
+    assert cache.get_or_load("q", loader) == "old"
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get("q") == "new":
+            break
+        time.sleep(0.01)
+    assert cache.get("q") == "new"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_refresh_ahead_with_value_derived_ttl():
+    """Entries close to expiry are served and reloaded before they lapse"""
+    cache = TTLCache(maxsize=4, ttl=60, refresh_ahead=10)
+    cache.set("v", {"expires_in": 5}, ttl=lambda v: v["expires_in"])
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return {"expires_in": 600}
+
+    assert cache.get_or_load("v", loader)["expires_in"] == 5
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get("v")["expires_in"] == 600:
+            break
+        time.sleep(0.01)
+    assert cache.get("v")["expires_in"] == 600
+    assert cache.stats()["refresh_aheads"] == 1
+
+
+def test_single_flight_collapses_concurrent_calls():
+    """Callers that arrive while a fetch is running share its result"""
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return ["track"]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("q", fetch)))
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("q", fetch))) for _ in range(4)]
+    for t in followers:
+        t.start()
+    wait_until(lambda: flights.stats()["collapsed"] >= 4)
+    release.set()
+    for t in [leader] + followers:
+        t.join()
+    assert len(calls) == 1
+    assert results == [["track"]] * 5
+    assert flights.stats() == {"calls": 5, "executions": 1, "collapsed": 4, "in_flight": 0}
+
+
+def test_single_flight_shares_errors():
+    """A failed fetch raises for the caller and frees the key"""
+    flights = SingleFlight()
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    try:
+        flights.do("q", boom)
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    assert flights.do("q", lambda: "ok") == "ok"
+
+
+def test_single_flight_leader_completes_by_hand():
+    """join() makes the first caller leader; complete() hands its result to waiters"""
+    flights = SingleFlight()
+    call, leader = flights.join("q")
+    assert leader
+    results = []
+    follower = threading.Thread(target=lambda: results.append(flights.do("q", lambda: ["other"])))
+    follower.start()
+    wait_until(lambda: flights.stats()["collapsed"] == 1)
+    flights.complete("q", call, ["track"])
+    follower.join()
+    assert results == [["track"]]
+    assert flights.join("q")[1]  # the key is free again
+
+
+if __name__ == "__main__":
+    test_hit_miss_and_expiry()
+    test_lru_eviction()
+    test_get_or_load_skips_vetoed_values()
+    test_get_or_refresh_leaves_misses_to_the_caller()
+    test_stale_while_revalidate()
+    test_refresh_ahead_with_value_derived_ttl()
+    test_single_flight_collapses_concurrent_calls()
+    test_single_flight_shares_errors()
+    test_single_flight_leader_completes_by_hand()
+    print("✅ cache tests passed")
@@ -0,0 +1,65 @@
+import gzip
+import json
+
+import main_api
+
+
+def test_catalog_bodies_and_gzip():
+    """Each catalog endpoint serves the curated payload, gzipped when the client allows it"""
+    client = main_api.app.test_client()
+    plain = client.get("/trending_music")
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert plain.json["tracks"] == main_api.MUSIC_DATABASE["trending"]
+
+    packed = client.get("/trending_music", headers={"Accept-Encoding": "gzip, deflate"})
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert packed.headers["Vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(packed.data)) == plain.json
+    assert packed.headers["ETag"] != plain.headers["ETag"]
+
+    shuffle = client.post("/get_shuffle_songs", json={})
+    assert shuffle.json["total"] == len(shuffle.json["tracks"]) == 24
+
+    recommendations = client.post("/get_ai_recommendations", json={})
+    assert recommendations.status_code == 200
+    ids = [t["youtube_id"] for t in recommendations.json["tracks"]]
+    assert len(ids) == len(set(ids)) <= 25
+
+
+def test_if_none_match():
+    """A matching ETag on GET is a bodiless 304; POST always gets the body"""
+    client = main_api.app.test_client()
+    first = client.get("/get_shuffle_songs", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["ETag"]
+
+    again = client.get("/get_shuffle_songs", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+    # The tag from the other representation still means "unchanged"
+    assert client.get("/get_shuffle_songs", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/get_shuffle_songs", headers={"If-None-Match": '"stale"'}).status_code == 200
+    assert client.post("/get_shuffle_songs", json={}, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_reload_catalog_changes_etag():
+    client = main_api.app.test_client()
+    before = client.get("/trending_music").headers["ETag"]
+    main_api.MUSIC_DATABASE["trending"].append({"name": "Extra", "youtube_id": "zzExtra0001"})
+    try:
+        main_api.reload_catalog()
+        after = client.get("/trending_music", headers={"If-None-Match": before})
+        assert after.status_code == 200
+        assert after.json["tracks"][-1]["name"] == "Extra"
+    finally:
+        main_api.MUSIC_DATABASE["trending"].pop()
+        main_api.reload_catalog()
+    assert client.get("/trending_music").headers["ETag"] == before
+
+
+if __name__ == "__main__":
+    test_catalog_bodies_and_gzip()
+    test_if_none_match()
+    test_reload_catalog_changes_etag()
+    print("✅ catalog tests passed")
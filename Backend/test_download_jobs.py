@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import download_jobs
+from download_jobs import DownloadJobQueue
+
+
+def fake_download(job_id, youtube_id, opts):
+    """Stands in for run_download inside the worker process"""
+    download_jobs._current_job = job_id
+    download_jobs._report({"stage": "downloading", "downloaded_bytes": 50, "total_bytes": 100})
+    time.sleep(0.3)
+    if youtube_id == "crash":
+        os._exit(1)  # the worker process dies mid-job
+    if youtube_id == "broken":
+        raise RuntimeError("video unavailable")
+    return {"path": f"downloads/{youtube_id}.mp3", "title": f"Title {youtube_id}"}
+
+
+def wait_for(queue, job_id, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("finished", "error"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_jobs_run_in_background_and_deduplicate():
+    """submit() returns at once; the same id maps to the running job"""
+    completed = []
+    queue = DownloadJobQueue({}, workers=1, worker=fake_download, on_complete=completed.append)
+    job, created = queue.submit("abc123def45")
+    assert created and job["status"] == "queued"
+    again, created_again = queue.submit("abc123def45")
+    assert not created_again and again["job_id"] == job["job_id"]
+
+    done = wait_for(queue, job["job_id"])
+    assert done["status"] == "finished"
+    assert done["file"] == "abc123def45.mp3"
+    assert done["progress"]["percent"] == 100.0
+    assert completed[0]["job_id"] == job["job_id"]
+    assert queue.stats()["deduplicated"] == 1
+
+    # Once the job has been released, a new request gets a fresh job
+    while "abc123def45" in queue._active:
+        time.sleep(0.01)
+    _, created_after = queue.submit("abc123def45")
+    assert created_after
+
+
+def test_failed_job_reports_error():
+    queue = DownloadJobQueue({}, workers=1, worker=fake_download)
+    job, _ = queue.submit("broken")
+    done = wait_for(queue, job["job_id"])
+    assert done["status"] == "error"
+    assert "video unavailable" in done["error"]
+    assert queue.stats()["failed"] == 1
+
+
+def test_crashed_worker_fails_job_and_is_replaced():
+    """A dead worker fails its job; a new process runs the later jobs"""
+    queue = DownloadJobQueue({}, workers=1, worker=fake_download)
+    crashed, _ = queue.submit("crash")
+    done = wait_for(queue, crashed["job_id"])
+    assert done["status"] == "error"
+    assert "worker process died" in done["error"]
+    while "crash" in queue._active:
+        time.sleep(0.01)
+    assert queue.stats()["restarts"] == 1
+
+    job, created = queue.submit("abc123def45")
+    assert created
+    assert wait_for(queue, job["job_id"])["status"] == "finished"
+    assert queue.stats()["restarts"] == 1
+
+
+def test_rejected_submit_is_not_recorded():
+    """If the queue refuses a job, no half-registered job blocks later requests"""
+    queue = DownloadJobQueue({}, workers=1, worker=fake_download)
+    queue.close()
+    try:
+        queue.submit("abc123def45")
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    assert queue._jobs == {} and queue._active == {}
+    assert queue.stats()["submitted"] == 0
+
+
+LAUNCHER = """
+import sys
+sys.path.insert(0, {backend!r})
+with open({marker!r}, "a") as f:
+    f.write("ran\\n")
+import test_download_jobs
+from download_jobs import DownloadJobQueue
+
+if __name__ == "__main__":
+    queue = DownloadJobQueue({{}}, workers=2, worker=test_download_jobs.fake_download)
+    jobs = [queue.submit(youtube_id)[0] for youtube_id in ("aaaaaaaaaaa", "bbbbbbbbbbb")]
+    print(",".join(test_download_jobs.wait_for(queue, job["job_id"])["status"] for job in jobs))
+"""
+
+
+def test_workers_do_not_rerun_the_launching_script():
+    """Workers import download_jobs, not the script that owns the queue (as main_api would be)"""
+    with tempfile.TemporaryDirectory() as root:
+        marker, script = os.path.join(root, "marker"), os.path.join(root, "launcher.py")
+        backend = os.path.dirname(os.path.abspath(__file__))
+        with open(script, "w") as f:
+            f.write(LAUNCHER.format(backend=backend, marker=marker))
+        out = subprocess.run([sys.executable, script], capture_output=True, text=True, timeout=60)
+        assert out.stdout.strip() == "finished,finished", out.stderr
+        with open(marker) as f:
+            assert f.read() == "ran\n"
+
+
+if __name__ == "__main__":
+    test_jobs_run_in_background_and_deduplicate()
+    test_failed_job_reports_error()
+    test_crashed_worker_fails_job_and_is_replaced()
+    test_rejected_submit_is_not_recorded()
+    test_workers_do_not_rerun_the_launching_script()
+    print("✅ download job tests passed")
@@ -0,0 +1,99 @@
+import os
+import tempfile
+
+from download_store import DownloadStore, is_valid_youtube_id
+
+
+def write_file(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+
+
+def test_add_and_get():
+    """Stored tracks are found by id + quality without listing the directory"""
+    with tempfile.TemporaryDirectory() as root:
+        store = DownloadStore(root)
+        assert store.get("dQw4w9WgXcQ", "192") is None
+        write_file(store.path_for("dQw4w9WgXcQ", "192"), 1234)
+        store.add("dQw4w9WgXcQ", "192", title="Never Gonna Give You Up")
+        entry = store.get("dQw4w9WgXcQ", "192")
+        assert entry["file"] == "dQw4w9WgXcQ_192.mp3"
+        assert entry["size"] == 1234
+        assert store.get("dQw4w9WgXcQ", "320") is None
+
+        # The index survives a restart
+        assert DownloadStore(root).get("dQw4w9WgXcQ", "192")["title"] == "Never Gonna Give You Up"
+
+
+def test_missing_file_is_dropped_from_index():
+    with tempfile.TemporaryDirectory() as root:
+        store = DownloadStore(root)
+        write_file(store.path_for("dQw4w9WgXcQ", "192"), 10)
+        store.add("dQw4w9WgXcQ", "192")
+        os.remove(store.path_for("dQw4w9WgXcQ", "192"))
+        assert store.get("dQw4w9WgXcQ", "192") is None
+        assert store.stats()["files"] == 0
+
+
+def test_index_rebuilt_from_existing_files():
+    """A store without index.json picks up files already on disk"""
+    with tempfile.TemporaryDirectory() as root:
+        write_file(os.path.join(root, "kJQP7kiw5Fk_192.mp3"), 99)
+        write_file(os.path.join(root, "Some Old Title.mp3"), 5)
+        store = DownloadStore(root)
+        assert store.get("kJQP7kiw5Fk", "192")["size"] == 99
+        assert store.stats()["files"] == 2
+
+
+def test_lru_eviction_respects_access_and_pins():
+    """Over budget, the least recently served unpinned file goes first"""
+    with tempfile.TemporaryDirectory() as root:
+        store = DownloadStore(root, max_bytes=250)
+        ids = ["aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"]
+        for youtube_id in ids[:2]:
+            write_file(store.path_for(youtube_id, "192"), 100)
+            store.add(youtube_id, "192")
+        store.touch("aaaaaaaaaaa_192.mp3")   # a is now the most recently served
+        store.pin("bbbbbbbbbbb", "192")      # ...but b has an active job
+
+        write_file(store.path_for(ids[2], "192"), 100)
+        store.add(ids[2], "192")
+        # Over budget (300 > 250): b is pinned, so a is evicted instead
+        assert store.get("aaaaaaaaaaa", "192") is None
+        assert not os.path.exists(store.path_for("aaaaaaaaaaa", "192"))
+        assert store.get("bbbbbbbbbbb", "192") is not None
+
+        store.unpin("bbbbbbbbbbb", "192")
+        stats = store.stats()
+        assert stats["bytes"] == 200
+        assert stats["evictions"] == 1
+        assert stats["pinned"] == 0
+
+
+def test_legacy_files_count_against_budget():
+    """Title-named files from before the store are indexed and evicted first"""
+    with tempfile.TemporaryDirectory() as root:
+        legacy = os.path.join(root, "Some Old Title.mp3")
+        write_file(legacy, 100)
+        os.utime(legacy, (1, 1))
+        store = DownloadStore(root, max_bytes=150)
+        write_file(store.path_for("kJQP7kiw5Fk", "192"), 100)
+        store.add("kJQP7kiw5Fk", "192")
+        assert not os.path.exists(legacy)
+        assert store.stats()["bytes"] == 100
+
+
+def test_youtube_id_validation():
+    assert is_valid_youtube_id("dQw4w9WgXcQ")
+    assert not is_valid_youtube_id("../../etc/pw")
+    assert not is_valid_youtube_id("")
+
+
+if __name__ == "__main__":
+    test_add_and_get()
+    test_missing_file_is_dropped_from_index()
+    test_index_rebuilt_from_existing_files()
+    test_lru_eviction_respects_access_and_pins()
+    test_legacy_files_count_against_budget()
+    test_youtube_id_validation()
+    print("✅ download store tests passed")
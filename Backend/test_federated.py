@@ -0,0 +1,131 @@
+import time
+
+from federated import FederatedSearch
+
+
+def track(youtube_id, name=None):
+    return {"youtube_id": youtube_id, "name": name or f"Song {youtube_id}", "artists": ["Band"]}
+
+
+def backend(ids, delay=0.0, error=None):
+    def search(query, limit):
+        time.sleep(delay)
+        if error:
+            raise error
+        return [track(i) if i else {"name": "unmatched", "youtube_id": None} for i in ids][:limit]
+    return search
+
+
+def test_merges_and_dedupes_by_youtube_id():
+    """Agreeing backends raise a track's confidence; unmatched and duplicate ids are dropped"""
+    federated = FederatedSearch({
+        "a": backend(["x", "y", "z"]),
+        "b": backend([None, "z", "w", "x"]),
+    }, deadline=1.0)
+    result = federated.search("q", limit=10)
+    ids = [t["youtube_id"] for t in result["tracks"]]
+    assert sorted(ids) == ["w", "x", "y", "z"]
+    assert ids[:2] == ["x", "z"]  # x: 1 + 1/4, z: 1/3 + 1/2
+    assert result["tracks"][0]["sources"] == ["a", "b"]
+    assert result["tracks"][0]["id"] == "youtube_x"
+    assert result["backends"] == {"a": "ok", "b": "ok"}
+    stats = federated.stats()["backends"]
+    assert stats["a"]["wins"] == stats["b"]["wins"] == 1
+
+
+def test_preferred_backend_metadata_wins_over_first_arrival():
+    """A placeholder-artist track that arrives first is overwritten by the preferred backend's copy"""
+    def scraper(query, limit):
+        time.sleep(0.1)
+        return [{"youtube_id": "x", "name": "Shape of You", "artists": ["Ed Sheeran"], "duration": None}]
+
+    def ytdlp(query, limit):
+        return [{"id": "youtube_x", "youtube_id": "x", "name": "Ed Sheeran - Shape of You (Official Video)",
+                 "artists": ["YouTube"], "duration": 234000}]
+
+    federated = FederatedSearch({"scraper": scraper, "ytdlp": ytdlp}, deadline=1.0)
+    result = federated.search("q", limit=2)
+    assert result["backends"] == {"scraper": "ok", "ytdlp": "ok"}
+    merged = result["tracks"][0]
+    assert merged["name"] == "Shape of You" and merged["artists"] == ["Ed Sheeran"]
+    assert merged["duration"] == 234000  # the preferred copy left it empty
+    assert merged["id"] == "youtube_x"
+    assert merged["sources"] == ["scraper", "ytdlp"]
+
+
+def test_returns_early_when_confident_and_at_deadline():
+    fast = backend(["a", "b"])
+    slow = backend(["c"], delay=0.5)
+    federated = FederatedSearch({"fast": fast, "slow": slow}, deadline=2.0, confidence=0.5)
+    started = time.monotonic()
+    result = federated.search("q", limit=2)
+    assert time.monotonic() - started < 0.4
+    assert result["early"] and result["backends"]["slow"] == "skipped"
+    assert [t["youtube_id"] for t in result["tracks"]] == ["a", "b"]
+
+    # Not confident enough: wait, but only until the deadline
+    federated = FederatedSearch({"fast": fast, "slow": slow}, deadline=0.2, confidence=0.5)
+    result = federated.search("q", limit=5)
+    assert 0.15 < result["elapsed_ms"] / 1000 < 0.45
+    assert result["backends"] == {"fast": "ok", "slow": "timeout"}
+    assert federated.stats()["backends"]["slow"]["timeouts"] == 1
+    time.sleep(0.4)  # the slow call still lands in the latency stats
+    assert federated.stats()["backends"]["slow"]["latency_ms"] >= 400
+
+
+def test_slow_and_failing_backends_are_demoted():
+    federated = FederatedSearch({
+        "fast": backend(["a", "b", "c"]),
+        "slow": backend(["d"], delay=0.1),
+        "broken": backend([], error=ConnectionError("down")),
+    }, deadline=1.0, demote_latency=0.05, min_samples=3, probe_every=10)
+    for _ in range(3):
+        federated.search("q", limit=5)
+    time.sleep(0.05)
+    stats = federated.stats()["backends"]
+    assert stats["slow"]["demoted"] and stats["broken"]["demoted"]
+    assert not stats["fast"]["demoted"]
+
+    # Fast results suffice, so the demoted backends aren't called...
+    result = federated.search("q", limit=3)
+    assert result["backends"] == {"slow": "demoted", "broken": "demoted", "fast": "ok"}
+    # ...unless the rest come up short
+    result = federated.search("q", limit=5)
+    assert result["backends"]["slow"] == "ok"
+    assert "d" in [t["youtube_id"] for t in result["tracks"]]
+    assert federated.stats()["fallbacks"] == 1
+    # Every probe_every-th search runs everything so demoted backends can recover
+    calls = federated.stats()["backends"]["broken"]["calls"]
+    for _ in range(5):
+        federated.search("q", limit=3)
+    assert federated.stats()["backends"]["broken"]["calls"] == calls + 1
+
+
+def test_rank_hook_orders_final_results():
+    federated = FederatedSearch({"a": backend(["x", "y"])}, rank=lambda query, tracks, limit: tracks[::-1][:limit])
+    assert [t["youtube_id"] for t in federated.search("q", limit=2)["tracks"]] == ["y", "x"]
+
+
+def test_endpoint():
+    import main_api
+    original = main_api.FEDERATED
+    main_api.FEDERATED = FederatedSearch({"a": backend(["x", "y"]), "b": backend(["y"])}, rank=main_api.RANKER.rank)
+    try:
+        client = main_api.app.test_client()
+        assert client.get("/search/federated").status_code == 400
+        body = client.get("/search/federated?q=song&limit=3").json
+        assert sorted(t["youtube_id"] for t in body["tracks"]) == ["x", "y"]
+        assert body["backends"] == {"a": "ok", "b": "ok"}
+        assert client.get("/stats").json["federated_search"]["searches"] == 1
+    finally:
+        main_api.FEDERATED = original
+
+
+if __name__ == "__main__":
+    test_merges_and_dedupes_by_youtube_id()
+    test_preferred_backend_metadata_wins_over_first_arrival()
+    test_returns_early_when_confident_and_at_deadline()
+    test_slow_and_failing_backends_are_demoted()
+    test_rank_hook_orders_final_results()
+    test_endpoint()
+    print("✅ federated search tests passed")
@@ -0,0 +1,122 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import http_client
+
+
+class StubAdapter(HTTPAdapter):
+    """Answers every request with 200 and records the timeout it was sent with"""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def send(self, request, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        return response
+
+
+class LocalServer:
+    """A loopback HTTP server whose handler is a function of the request number"""
+
+    def __init__(self, handle):
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits += 1
+                status, headers, delay = handle(server.hits)
+                time.sleep(delay)
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                except OSError:
+                    pass  # the client gave up on a slow response
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def test_host_timeouts_are_applied():
+    stub = StubAdapter()
+    session = requests.Session()
+    session.mount("https://", stub)
+    original, http_client._session = http_client._session, session
+    try:
+        http_client.get("https://suggestqueries.google.com/complete/search")
+        http_client.get("https://api.spotify.com/v1/search")
+        http_client.get("https://example.com/")
+        http_client.get("https://www.youtube.com/results", timeout=1)
+    finally:
+        http_client._session = original
+    assert stub.timeouts == [
+        http_client.HOST_TIMEOUTS["suggestqueries.google.com"],
+        http_client.HOST_TIMEOUTS["api.spotify.com"],
+        http_client.DEFAULT_TIMEOUT,
+        1,
+    ]
+
+
+def test_interactive_hosts_do_not_retry_read_timeouts():
+    session = http_client.build_session(retries=2)
+    for host in http_client.INTERACTIVE_HOSTS:
+        retry = session.get_adapter(f"https://{host}/x").max_retries
+        assert retry.read == 0 and retry.connect == 2 and retry.status == 2
+    assert session.get_adapter("https://api.spotify.com/v1").max_retries.read == 2
+
+    server = LocalServer(lambda hit: (200, {}, 0.5))
+    try:
+        for interactive, expected_hits in ((set(), 3), ({"127.0.0.1"}, 1)):
+            server.hits = 0
+            session = http_client.build_session(retries=2, backoff=0, interactive_hosts=interactive)
+            try:
+                session.get(server.url, timeout=(1, 0.1))
+                assert False, "expected a read timeout"
+            except requests.exceptions.ConnectionError:
+                pass
+            assert server.hits == expected_hits
+    finally:
+        server.close()
+
+
+def test_retry_after_is_capped():
+    server = LocalServer(lambda hit: (503, {"Retry-After": "120"}, 0) if hit == 1 else (200, {}, 0))
+    original = http_client.MAX_RETRY_AFTER
+    http_client.MAX_RETRY_AFTER = 0.2
+    try:
+        session = http_client.build_session(retries=2, backoff=0)
+        started = time.monotonic()
+        response = session.get(server.url, timeout=(1, 1))
+        assert response.status_code == 200
+        assert server.hits == 2
+        assert time.monotonic() - started < 2
+    finally:
+        http_client.MAX_RETRY_AFTER = original
+        server.close()
+
+
+if __name__ == "__main__":
+    test_host_timeouts_are_applied()
+    test_interactive_hosts_do_not_retry_read_timeouts()
+    test_retry_after_is_capped()
+    print("✅ http client tests passed")
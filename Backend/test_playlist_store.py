@@ -0,0 +1,253 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from playlist_store import JsonPlaylistStore, SqlitePlaylistStore, migrate_json_to_sqlite, DEFAULT_COVER
+
+
+def track(youtube_id):
+    return {"youtube_id": youtube_id, "title": f"Song {youtube_id}", "image": f"img-{youtube_id}"}
+
+
+def check_playlist_lifecycle(store):
+    """Same behaviour from every backend"""
+    created = store.create("Road Trip")
+    assert created["cover"] == DEFAULT_COVER
+    assert store.create("Road Trip") is None
+
+    playlist, added = store.add_track("Road Trip", track("a"))
+    assert added and playlist["cover"] == "img-a"
+    store.add_track("Road Trip", track("b"))
+    store.add_track("Road Trip", track("c"))
+    playlist, added = store.add_track("Road Trip", track("b"))
+    assert not added
+    assert [t["youtube_id"] for t in playlist["tracks"]] == ["a", "b", "c"]
+    assert store.add_track("Nope", track("a")) == (None, False)
+
+    assert store.remove_track("Road Trip", "a") is True
+    assert store.remove_track("Road Trip", "a") is False
+    assert store.remove_track("Nope", "a") is None
+    playlist = store.get("Road Trip")
+    assert [t["youtube_id"] for t in playlist["tracks"]] == ["b", "c"]
+    assert playlist["cover"] == "img-b"
+
+    assert store.list() == [{"name": "Road Trip", "track_count": 2,
+                             "created_at": created["created_at"], "cover": "img-b"}]
+
+    # Pages by offset and by cursor
+    for youtube_id in "defg":
+        store.add_track("Road Trip", track(youtube_id))
+    page = store.get_page("Road Trip", offset=1, limit=2)
+    assert [t["youtube_id"] for t in page["tracks"]] == ["c", "d"]
+    assert (page["total"], page["offset"], page["cover"]) == (6, 1, "img-b")
+    page = store.get_page("Road Trip", after="d", limit=10)
+    assert [t["youtube_id"] for t in page["tracks"]] == ["e", "f", "g"]
+    assert page["offset"] == 3
+    assert store.get_page("Road Trip", offset=50, limit=5)["tracks"] == []
+    assert store.get_page("Nope") is None
+    try:
+        store.get_page("Road Trip", after="zz")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert store.list()[0]["track_count"] == 6
+
+    # Batches: ordered, per-operation results, nothing applied if any operation is invalid
+    store.create("Other")
+    results = store.apply_batch([
+        {"op": "move", "playlist_name": "Road Trip", "youtube_id": "g", "index": 0},
+        {"op": "add", "playlist_name": "Other", "track": track("b")},
+        {"op": "remove", "playlist_name": "Road Trip", "youtube_id": "c"},
+        {"op": "remove", "playlist_name": "Road Trip", "youtube_id": "c"},
+        {"op": "move", "playlist_name": "Road Trip", "youtube_id": "b", "index": 2},
+        {"op": "move", "playlist_name": "Road Trip", "youtube_id": "e", "index": 99},
+        {"op": "move", "playlist_name": "Road Trip", "youtube_id": "e", "index": 99},
+    ])
+    assert [list(r.values())[-1] for r in results] == [True, True, True, False, True, True, False]
+    playlist = store.get("Road Trip")
+    assert [t["youtube_id"] for t in playlist["tracks"]] == ["g", "d", "b", "f", "e"]
+    assert playlist["cover"] == "img-g"
+    assert store.get("Other")["cover"] == "img-b"
+    for bad, error in [([{"op": "add", "playlist_name": "Other", "track": track("x")},
+                         {"op": "add", "playlist_name": "Missing", "track": track("y")}], LookupError),
+                       ([{"op": "add", "playlist_name": "Other", "track": track("x")},
+                         {"op": "move", "playlist_name": "Other", "youtube_id": "b"}], ValueError)]:
+        try:
+            store.apply_batch(bad)
+            assert False, f"expected {error.__name__}"
+        except error:
+            pass
+        assert "x" not in [t["youtube_id"] for t in store.get("Other")["tracks"]]
+    store.delete("Other")
+    # Moves and appends interleave correctly
+    store.apply_batch([{"op": "move", "playlist_name": "Road Trip", "youtube_id": "f", "index": 1},
+                       {"op": "add", "playlist_name": "Road Trip", "track": track("c")},
+                       {"op": "move", "playlist_name": "Road Trip", "youtube_id": "g", "index": 5}])
+    assert [t["youtube_id"] for t in store.get("Road Trip")["tracks"]] == ["f", "d", "b", "e", "c", "g"]
+    assert store.get("Road Trip")["cover"] == "img-f"
+
+    assert store.delete("Road Trip") is True
+    assert store.delete("Road Trip") is False
+    assert store.get("Road Trip") is None
+
+
+def test_json_backend():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "hyde.json")
+        check_playlist_lifecycle(JsonPlaylistStore(path))
+
+
+def test_json_journal_replay_and_compaction():
+    """Mutations append to the journal; restart replays it; compaction folds it into hyde.json"""
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "hyde.json")
+        store = JsonPlaylistStore(path, compact_bytes=10 ** 6)
+        store.create("Mix")
+        store.add_track("Mix", track("a"))
+        store.add_track("Mix", track("a"))  # no-op, not journaled
+        store.add_track("Mix", track("b"))
+        store.remove_track("Mix", "a")
+        store.apply_batch([{"op": "add", "playlist_name": "Mix", "track": track("c")},
+                           {"op": "move", "playlist_name": "Mix", "youtube_id": "c", "index": 0},
+                           {"op": "remove", "playlist_name": "Mix", "youtube_id": "c"}])
+        store.flush()
+        assert not os.path.exists(path)
+        with open(f"{path}.journal", encoding='utf-8') as f:
+            assert [json.loads(line)["op"] for line in f] == ["create", "add", "add", "remove", "batch"]
+        assert store.stats()["queue_depth"] == 0
+
+        # A crash mid-append leaves a torn last line, which replay ignores
+        with open(f"{path}.journal", 'a', encoding='utf-8') as f:
+            f.write('{"op": "add", "name": "Mix", "tr')
+        reopened = JsonPlaylistStore(path, compact_bytes=10 ** 6)
+        assert [t["youtube_id"] for t in reopened.get("Mix")["tracks"]] == ["b"]
+        # ...and the torn journal was compacted away on startup
+        assert os.path.getsize(f"{path}.journal") == 0
+        with open(path, encoding='utf-8') as f:
+            assert [t["youtube_id"] for t in json.load(f)["Mix"]["tracks"]] == ["b"]
+
+        small = JsonPlaylistStore(path, compact_bytes=200)
+        for i in range(10):
+            small.add_track("Mix", track(f"t{i}"))
+        small.flush()
+        small.compact()
+        assert small.stats()["compactions"] >= 1
+        assert len(JsonPlaylistStore(path).get("Mix")["tracks"]) == 11
+
+
+def test_json_concurrent_adds_are_coalesced():
+    """Concurrent adds lose nothing and bursts share a few flushes"""
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "hyde.json")
+        store = JsonPlaylistStore(path, debounce=0.02, max_delay=0.2)
+        store.create("A")
+        store.create("B")
+
+        def add_many(worker):
+            for i in range(50):
+                store.add_track("A" if i % 2 else "B", track(f"{worker}-{i}"))
+
+        threads = [threading.Thread(target=add_many, args=(w,)) for w in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(store.get("A")["tracks"]) == 200
+        assert len(store.get("B")["tracks"]) == 200
+
+        for _ in range(200):
+            if store.stats()["queue_depth"] == 0 and store.stats()["records_flushed"] == 402:
+                break
+            time.sleep(0.01)
+        stats = store.stats()
+        assert stats["records_flushed"] == 402
+        assert stats["flushes"] < 402 / 10
+        assert stats["last_flush_ms"] is not None
+        assert len(JsonPlaylistStore(path).get("A")["tracks"]) == 200
+
+
+def test_json_lock_stripes_are_shared():
+    """Names sharing a stripe still work, including together in one batch"""
+    with tempfile.TemporaryDirectory() as root:
+        store = JsonPlaylistStore(os.path.join(root, "hyde.json"), lock_stripes=1)
+        for i in range(50):
+            store.create(f"P{i}")
+            store.add_track(f"P{i}", track("a"))
+        for i in range(0, 50, 2):
+            store.delete(f"P{i}")
+        assert len(store._locks) == 1
+        results = store.apply_batch([
+            {"op": "add", "playlist_name": "P1", "track": track("b")},
+            {"op": "remove", "playlist_name": "P3", "youtube_id": "a"},
+        ])
+        assert results[0]["added"] and results[1]["removed"]
+        assert len(store.list()) == 25
+
+
+def test_sqlite_backend():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "playlists.db")
+        store = SqlitePlaylistStore(path)
+        check_playlist_lifecycle(store)
+
+        # Rows survive a restart
+        store.create("Chill")
+        store.add_track("Chill", track("x"))
+        reopened = SqlitePlaylistStore(path)
+        assert [t["title"] for t in reopened.get("Chill")["tracks"]] == ["Song x"]
+
+
+def test_sqlite_add_races_delete():
+    """A delete arriving between add_track's check and its insert waits for the add to commit"""
+    with tempfile.TemporaryDirectory() as root:
+        store = SqlitePlaylistStore(os.path.join(root, "playlists.db"))
+        store.create("Shared")
+        deleter = threading.Thread(target=store.delete, args=("Shared",))
+        add = store._add
+
+        def delete_then_add(db, name, t):
+            deleter.start()
+            deleter.join(0.3)  # still blocked on the add's write lock
+            return add(db, name, t)
+
+        store._add = delete_then_add
+        _, added = store.add_track("Shared", track("x"))
+        deleter.join()
+        assert added
+        assert store.get("Shared") is None
+        assert store.add_track("Shared", track("y")) == (None, False)
+        assert store.remove_track("Shared", "y") is None
+
+
+def test_migrate_from_hyde_json():
+    """hyde.json is imported once, keeping order and filling in missing covers"""
+    with tempfile.TemporaryDirectory() as root:
+        json_path = os.path.join(root, "hyde.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "Old": {"name": "Old", "tracks": [track("z"), track("y")], "created_at": 1.0},
+                "Empty": {"name": "Empty", "tracks": [], "created_at": 2.0, "cover": None},
+            }, f)
+        store = SqlitePlaylistStore(os.path.join(root, "playlists.db"))
+        assert migrate_json_to_sqlite(store, json_path) == 2
+        old = store.get("Old")
+        assert [t["youtube_id"] for t in old["tracks"]] == ["z", "y"]
+        assert old["cover"] == "https://img.youtube.com/vi/z/hqdefault.jpg"
+        assert store.get("Empty")["cover"] is None
+
+        store.delete("Old")
+        assert migrate_json_to_sqlite(store, json_path) == 0
+        assert store.get("Old") is None
+
+
+if __name__ == "__main__":
+    test_json_backend()
+    test_json_journal_replay_and_compaction()
+    test_json_concurrent_adds_are_coalesced()
+    test_json_lock_stripes_are_shared()
+    test_sqlite_backend()
+    test_sqlite_add_races_delete()
+    test_migrate_from_hyde_json()
+    print("✅ playlist store tests passed")
@@ -0,0 +1,76 @@
+import os
+
+from ranking import Ranker, weights_from_env, DEFAULT_WEIGHTS
+from title_parser import parse_title
+from youtube_parser import parse_search_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def track(name, artist, youtube_id=None):
+    return {"name": name, "artists": [artist], "youtube_id": youtube_id or name}
+
+
+def names(tracks):
+    return [t["name"] for t in tracks]
+
+
+def test_exact_and_phrase_matches_rank_first():
+    candidates = [
+        track("Bad Habits", "Ed Sheeran"),
+        track("Shape of You (Piano Cover)", "Some Pianist"),
+        track("You", "Shape"),
+        track("Shape of You", "Ed Sheeran"),
+    ]
+    ranked = Ranker().rank("shape of you", candidates)
+    assert names(ranked[:2]) == ["Shape of You", "Shape of You (Piano Cover)"]
+    assert ranked[-1]["name"] == "Bad Habits"
+    assert len(Ranker().rank("shape of you", candidates, limit=2)) == 2
+
+
+def test_artist_queries_and_weights():
+    candidates = [track("Hello", "Adele"), track("Someone Like You", "Adele"), track("Adele Tribute", "Cover Band")]
+    # The song-name phrase match outweighs artist matches by default...
+    assert Ranker().rank("adele", candidates)[0]["name"] == "Adele Tribute"
+    # ...unless artist evidence is weighted up
+    artist_first = Ranker({"artist_bm25": 4.0, "artist_phrase": 4.0, "position": 0})
+    assert names(artist_first.rank("adele", candidates)[:2]) == ["Hello", "Someone Like You"]
+
+
+def test_ties_keep_upstream_order():
+    candidates = [track(f"Song {i}", "Band", youtube_id=str(i)) for i in range(300)]
+    ranked = Ranker({"position": 0}).rank("unrelated words", candidates)
+    assert [t["youtube_id"] for t in ranked] == [str(i) for i in range(300)]
+    assert Ranker().rank("", candidates[:3]) == candidates[:3]
+    assert Ranker().rank("anything", []) == []
+
+
+def test_weights_from_env():
+    os.environ["RANK_WEIGHT_EXACT"] = "9"
+    try:
+        weights = weights_from_env()
+    finally:
+        del os.environ["RANK_WEIGHT_EXACT"]
+    assert weights["exact"] == 9.0
+    assert weights["song_bm25"] == DEFAULT_WEIGHTS["song_bm25"]
+
+
+def test_real_search_page():
+    with open(os.path.join(FIXTURES, "youtube_search_shape_of_you.html"), encoding='utf-8') as f:
+        videos = parse_search_page(f.read())
+    candidates = []
+    for video in videos:
+        artist, song = parse_title(video["title"], "shape of you", video["channel"])
+        candidates.append({"name": song, "artists": [artist], "youtube_id": video["video_id"]})
+    top = Ranker().rank("shape of you", candidates, limit=5)
+    assert all(t["name"].lower() == "shape of you" for t in top)
+    assert top[0]["artists"] == ["Ed Sheeran"]
+
+
+if __name__ == "__main__":
+    test_exact_and_phrase_matches_rank_first()
+    test_artist_queries_and_weights()
+    test_ties_keep_upstream_order()
+    test_weights_from_env()
+    test_real_search_page()
+    print("✅ ranking tests passed")
@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+
+import main_api
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def with_page(html, fn, delay=0.0):
+    """Run fn with the YouTube fetch answered from a fixture and a cold search cache; returns the fetch count"""
+    original = main_api.fetch_youtube_search_page
+    fetches = []
+
+    def fetch(query):
+        fetches.append(query)
+        time.sleep(delay)
+        return html
+
+    main_api.fetch_youtube_search_page = fetch
+    main_api.SEARCH_CACHE.clear()
+    try:
+        fn(main_api.app.test_client())
+    finally:
+        main_api.fetch_youtube_search_page = original
+        main_api.SEARCH_CACHE.clear()
+    return len(fetches)
+
+
+def fixture_page(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def read_events(response):
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def stream_tracks(events):
+    return [e["track"]["youtube_id"] for e in events if e["event"] == "track"]
+
+
+def test_cold_stream_sends_candidates_then_ranked_order():
+    """A cold stream sends every candidate as parsed; a warm one replays the ranked tracks"""
+    def check(client):
+        response = client.get("/search/stream?q=shape+of+you&limit=3")
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert response.headers["Cache-Control"] == "no-store"
+        events = read_events(response)
+        done = events[-1]
+        assert done["event"] == "done" and done["cached"] is False
+        assert done["total"] == 3
+        candidates = stream_tracks(events)
+        assert len(candidates) > 3
+        assert set(done["order"]) <= set(candidates)
+        # The ranked order, as the non-streaming search (now served from cache) returns it
+        assert done["order"] == [t["youtube_id"] for t in main_api.search_youtube_music("shape of you", limit=3)]
+
+        again = read_events(client.get("/search/stream?q=Shape%20of%20You&limit=3"))
+        assert again[-1] == dict(done, cached=True)
+        assert stream_tracks(again) == done["order"]
+
+    assert with_page(fixture_page("youtube_search_shape_of_you.html"), check) == 1
+
+
+def test_concurrent_cold_streams_share_one_fetch():
+    """One stream leads and sends candidates; the others wait and replay its ranked tracks"""
+    def check(client):
+        results = []
+
+        def stream():
+            results.append(read_events(main_api.app.test_client().get("/search/stream?q=lofi&limit=4")))
+
+        threads = [threading.Thread(target=stream) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        orders = [events[-1]["order"] for events in results]
+        assert len(orders) == 4 and len(orders[0]) == 4
+        assert all(order == orders[0] for order in orders)
+        leaders = [events for events in results if len(stream_tracks(events)) > 4]
+        assert len(leaders) == 1
+        followers = [events for events in results if events is not leaders[0]]
+        assert all(stream_tracks(events) == orders[0] for events in followers)
+
+    assert with_page(fixture_page("youtube_search_lofi_hip_hop.html"), check, delay=0.3) == 1
+
+
+def test_leader_hang_up_still_serves_followers():
+    """A leading stream closed mid-way still ranks, caches and publishes for the requests waiting on it"""
+    def check(client):
+        leader = main_api.stream_search_events("lofi", 4, False)
+        assert json.loads(next(leader))["event"] == "track"
+        collapsed = main_api.SEARCH_FLIGHTS.stats()["collapsed"]
+        followers = []
+        follower = threading.Thread(target=lambda: followers.append(
+            read_events(main_api.app.test_client().get("/search/stream?q=lofi&limit=4"))))
+        follower.start()
+        wait_until(lambda: main_api.SEARCH_FLIGHTS.stats()["collapsed"] > collapsed)
+        leader.close()
+        follower.join()
+        done = followers[0][-1]
+        assert done["total"] == 4 and done["cached"] is False
+        assert stream_tracks(followers[0]) == done["order"]
+        assert main_api.SEARCH_CACHE.get(main_api.search_key("lofi", 4)) is not None
+
+    assert with_page(fixture_page("youtube_search_lofi_hip_hop.html"), check) == 1
+
+
+def test_sse_frames():
+    def check(client):
+        response = client.get("/search/stream?q=lofi", headers={"Accept": "text/event-stream"})
+        assert response.mimetype == "text/event-stream"
+        frames = response.data.decode().strip().split("\n\n")
+        names = [frame.split("\n")[0] for frame in frames]
+        assert names[-1] == "event: done"
+        assert set(names[:-1]) == {"event: track"}
+        data = json.loads(frames[-1].split("\n")[1][len("data: "):])
+        assert data["total"] == 5
+
+    with_page(fixture_page("youtube_search_lofi_hip_hop.html"), check)
+
+
+def test_bad_requests_and_failed_fetch():
+    def check(client):
+        assert client.get("/search/stream").status_code == 400
+        assert client.get("/search/stream?q=x&limit=abc").status_code == 400
+        events = read_events(client.get("/search/stream?q=nothing"))
+        assert events == [{"event": "done", "order": [], "total": 0, "cached": False}]
+
+    with_page(None, check)
+
+
+if __name__ == "__main__":
+    test_cold_stream_sends_candidates_then_ranked_order()
+    test_concurrent_cold_streams_share_one_fetch()
+    test_leader_hang_up_still_serves_followers()
+    test_sse_frames()
+    test_bad_requests_and_failed_fetch()
+    print("✅ search stream tests passed")
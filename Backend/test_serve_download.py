@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+import main_api
+from download_store import DownloadStore
+
+FILENAME = "zzTestTrack_192.mp3"
+PAYLOAD = bytes(range(256)) * 40
+
+_tmp = None
+_original_store = None
+
+
+def setup_module(module):
+    """Serve from a throwaway store instead of the real downloads/ folder"""
+    global _tmp, _original_store
+    _tmp = tempfile.TemporaryDirectory()
+    store = DownloadStore(_tmp.name)
+    with open(os.path.join(_tmp.name, FILENAME), 'wb') as f:
+        f.write(PAYLOAD)
+    store.add("zzTestTrack", "192", title="test")
+    _original_store, main_api.DOWNLOAD_STORE = main_api.DOWNLOAD_STORE, store
+    main_api.AUDIO_PROXY.store = store
+
+
+def teardown_module(module):
+    main_api.DOWNLOAD_STORE = main_api.AUDIO_PROXY.store = _original_store
+    _tmp.cleanup()
+
+
+def test_full_and_range_requests():
+    """Whole-file GETs are 200, byte ranges are 206 with the right slice"""
+    client = main_api.app.test_client()
+    full = client.get(f"/downloads/{FILENAME}")
+    assert full.status_code == 200
+    assert full.data == PAYLOAD
+    assert full.headers["Accept-Ranges"] == "bytes"
+    assert full.headers["Content-Type"] == "audio/mpeg"
+
+    part = client.get(f"/downloads/{FILENAME}", headers={"Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.data == PAYLOAD[100:200]
+    assert part.headers["Content-Range"] == f"bytes 100-199/{len(PAYLOAD)}"
+
+    tail = client.get(f"/downloads/{FILENAME}", headers={"Range": f"bytes={len(PAYLOAD)}-"})
+    assert tail.status_code == 416
+
+
+def test_conditional_requests():
+    """Strong ETag and Last-Modified validators produce 304s"""
+    client = main_api.app.test_client()
+    first = client.get(f"/downloads/{FILENAME}")
+    etag = first.headers["ETag"]
+    assert not etag.startswith("W/")
+    assert client.get(f"/downloads/{FILENAME}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/downloads/{FILENAME}",
+                      headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+    # A stale If-Range validator means the whole file comes back
+    stale = client.get(f"/downloads/{FILENAME}", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200
+
+
+def test_bytes_served_are_recorded():
+    client = main_api.app.test_client()
+    before = main_api.DOWNLOAD_STORE.stats()["bytes_served"]
+    client.get(f"/downloads/{FILENAME}", headers={"Range": "bytes=0-9"})
+    assert main_api.DOWNLOAD_STORE.stats()["bytes_served"] == before + 10
+
+
+def test_missing_and_unsafe_paths():
+    client = main_api.app.test_client()
+    assert client.get("/downloads/nope.mp3").status_code == 404
+    assert client.get("/downloads/..%2Fmain_api.py").status_code == 404
+
+
+def test_download_and_stream_do_not_both_produce():
+    """/download defers to a live stream of the same track, and the stream to a download job"""
+    client = main_api.app.test_client()
+    store = main_api.DOWNLOAD_STORE
+    youtube_id = "zzLiveTrack"
+    submitted = main_api.DOWNLOAD_JOBS.stats()["submitted"]
+
+    store.claim(youtube_id, "192", "stream")
+    try:
+        response = client.post("/download", json={"youtube_id": youtube_id})
+        assert response.status_code == 202
+        assert response.get_json()["status"] == "streaming"
+        assert main_api.DOWNLOAD_JOBS.stats()["submitted"] == submitted
+    finally:
+        store.release(youtube_id, "192", "stream")
+
+    store.claim(youtube_id, "192", "download")
+    try:
+        response = client.get(f"/download/stream/{youtube_id}")
+        assert response.status_code == 409
+        assert response.headers["Retry-After"]
+    finally:
+        store.release(youtube_id, "192", "download")
+
+
+if __name__ == "__main__":
+    setup_module(None)
+    try:
+        test_full_and_range_requests()
+        test_conditional_requests()
+        test_bytes_served_are_recorded()
+        test_missing_and_unsafe_paths()
+        test_download_and_stream_do_not_both_produce()
+    finally:
+        teardown_module(None)
+    print("✅ download serving tests passed")
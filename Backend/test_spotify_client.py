@@ -0,0 +1,250 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+# youtubesearchpython isn't needed here (every test swaps in FakeVideosSearch); the
+# placeholder only lets spotify_client import, and is removed so other modules still see it missing
+_placeholder = types.SimpleNamespace(VideosSearch=None)
+if sys.modules.setdefault("youtubesearchpython", _placeholder) is _placeholder:
+    import spotify_client  # noqa: E402
+    del sys.modules["youtubesearchpython"]
+else:
+    import spotify_client  # noqa: E402
+
+
+class FakeVideosSearch:
+    """Stands in for youtubesearchpython.VideosSearch; `delays` maps a query prefix to seconds"""
+    delays = {}
+    queries = []
+
+    def __init__(self, query, limit=1):
+        self.query = query
+        FakeVideosSearch.queries.append(query)
+
+    def result(self):
+        name = self.query.split()[0]
+        time.sleep(self.delays.get(name, 0))
+        return {"result": [{"id": f"yt-{name}"}]}
+
+
+def spotify_track(name):
+    return {"id": f"sp-{name}", "name": name, "artists": [{"name": "Artist"}]}
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condition not reached")
+
+
+def with_match_cache(test):
+    """Run a test against an empty match map stored in a temp directory"""
+    def run():
+        original = spotify_client.VideosSearch, spotify_client.MATCH_CACHE_FILE
+        with tempfile.TemporaryDirectory() as root:
+            spotify_client.VideosSearch = FakeVideosSearch
+            spotify_client.MATCH_CACHE_FILE = os.path.join(root, "map.json")
+            FakeVideosSearch.delays, FakeVideosSearch.queries = {}, []
+            spotify_client.YOUTUBE_MATCHES.clear()
+            try:
+                test(root)
+            finally:
+                spotify_client.flush_matches()  # nothing left for the flusher to write after root is gone
+                spotify_client.VideosSearch, spotify_client.MATCH_CACHE_FILE = original
+                spotify_client.YOUTUBE_MATCHES.clear()
+    run.__name__ = test.__name__
+    return run
+
+
+@with_match_cache
+def test_deadline_returns_partial_results(root):
+    FakeVideosSearch.delays = {"slow": 0.5}
+    tracks = [spotify_track("fast"), spotify_track("slow"), spotify_track("quick")]
+    started = time.monotonic()
+    matches = spotify_client.match_youtube_ids(tracks, deadline=0.2)
+    assert time.monotonic() - started < 0.45
+    assert matches == {"sp-fast": "yt-fast", "sp-quick": "yt-quick"}
+
+
+@with_match_cache
+def test_late_results_are_cached(root):
+    """A lookup that misses its deadline still lands in the map for the next request"""
+    FakeVideosSearch.delays = {"slow": 0.3}
+    assert spotify_client.match_youtube_ids([spotify_track("slow")], deadline=0.05) == {}
+    wait_until(lambda: "sp-slow" in spotify_client.YOUTUBE_MATCHES)
+
+    FakeVideosSearch.queries = []
+    assert spotify_client.match_youtube_ids([spotify_track("slow")], deadline=0.05) == {"sp-slow": "yt-slow"}
+    assert FakeVideosSearch.queries == []
+    spotify_client.flush_matches()
+    with open(spotify_client.MATCH_CACHE_FILE, encoding="utf-8") as f:
+        assert json.load(f) == {"sp-slow": "yt-slow"}
+
+
+@with_match_cache
+def test_map_is_persisted_atomically(root):
+    spotify_client.match_youtube_ids([spotify_track("a"), spotify_track("b")])
+    spotify_client.flush_matches()
+    with open(spotify_client.MATCH_CACHE_FILE, encoding="utf-8") as f:
+        assert json.load(f) == {"sp-a": "yt-a", "sp-b": "yt-b"}
+
+    # A write that fails halfway leaves the previous file intact and no temp file behind
+    spotify_client.save_match_cache({"sp-a": "yt-a", "bad": object()})
+    with open(spotify_client.MATCH_CACHE_FILE, encoding="utf-8") as f:
+        assert json.load(f) == {"sp-a": "yt-a", "sp-b": "yt-b"}
+    assert os.listdir(root) == ["map.json"]
+    assert spotify_client.load_match_cache() == {"sp-a": "yt-a", "sp-b": "yt-b"}
+
+
+@with_match_cache
+def test_map_drops_oldest_past_its_size(root):
+    original = spotify_client.MATCH_CACHE_SIZE
+    spotify_client.MATCH_CACHE_SIZE = 2
+    try:
+        for name in ("a", "b", "c"):
+            spotify_client.match_youtube_ids([spotify_track(name)])
+        assert spotify_client.YOUTUBE_MATCHES == {"sp-b": "yt-b", "sp-c": "yt-c"}
+        with open(spotify_client.MATCH_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"sp-x": "1", "sp-y": "2", "sp-z": "3"}, f)
+        assert spotify_client.load_match_cache() == {"sp-y": "2", "sp-z": "3"}
+    finally:
+        spotify_client.MATCH_CACHE_SIZE = original
+
+
+@with_match_cache
+def test_map_is_flushed_in_the_background(root):
+    """match_youtube_ids doesn't write; the flusher does, without holding MATCH_LOCK"""
+    original = spotify_client.MATCH_FLUSH_DEBOUNCE, spotify_client.save_match_cache
+    writes = []
+
+    def save(matches):
+        assert not spotify_client.MATCH_LOCK.locked()
+        writes.append(dict(matches))
+        return original[1](matches)
+
+    spotify_client.MATCH_FLUSH_DEBOUNCE, spotify_client.save_match_cache = 0.2, save
+    try:
+        spotify_client.match_youtube_ids([spotify_track("a")])
+        spotify_client.match_youtube_ids([spotify_track("b")])
+        wait_until(lambda: writes and writes[-1] == {"sp-a": "yt-a", "sp-b": "yt-b"})
+        with open(spotify_client.MATCH_CACHE_FILE, encoding="utf-8") as f:
+            assert json.load(f) == {"sp-a": "yt-a", "sp-b": "yt-b"}
+    finally:
+        spotify_client.MATCH_FLUSH_DEBOUNCE, spotify_client.save_match_cache = original
+
+
+IMPORT_CHECK = """
+import sys, threading, types
+sys.modules["youtubesearchpython"] = types.SimpleNamespace(VideosSearch=None)
+import spotify_client
+assert spotify_client.YOUTUBE_MATCHES == {}
+assert spotify_client._executor is None and spotify_client._token_manager is None
+assert threading.active_count() == 1
+assert "flask" not in sys.modules and "dotenv" not in sys.modules
+"""
+
+
+def test_import_has_no_side_effects():
+    """Importing spotify_client (as main_api does) starts no threads and reads no map"""
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "map.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"sp-a": "yt-a"}, f)
+        env = dict(os.environ, YT_MATCH_CACHE_FILE=path)
+        out = subprocess.run([sys.executable, "-c", IMPORT_CHECK], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), env=env, timeout=30)
+        assert out.returncode == 0, out.stderr
+
+
+class FakeTokenEndpoint:
+    """Replaces spotify_client.http_client: each post() hands out the next token after `delay` seconds"""
+
+    def __init__(self, expires_in=3600, delay=0.0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def post(self, url, headers=None, data=None):
+        self.calls += 1
+        token = f"token-{self.calls}"
+        time.sleep(self.delay)
+        self.release.wait(5)
+        return types.SimpleNamespace(status_code=200,
+                                     json=lambda: {"access_token": token, "expires_in": self.expires_in})
+
+
+def with_token_endpoint(endpoint, test):
+    original, spotify_client.http_client = spotify_client.http_client, endpoint
+    try:
+        test()
+    finally:
+        spotify_client.http_client = original
+
+
+def test_token_is_refreshed_once_for_concurrent_callers():
+    endpoint = FakeTokenEndpoint(delay=0.2)
+    manager = spotify_client.SpotifyTokenManager("id", "secret")
+
+    def run():
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(manager.get_token())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == ["token-1"] * 8
+        assert manager.get_token() == "token-1"
+
+    with_token_endpoint(endpoint, run)
+    assert endpoint.calls == 1
+    assert manager.stats()["refreshes"] == 1
+
+
+def test_token_is_renewed_inside_the_margin():
+    """Inside the margin one caller refreshes while the rest keep the still-valid token"""
+    endpoint = FakeTokenEndpoint()
+    manager = spotify_client.SpotifyTokenManager("id", "secret", margin=300)
+
+    def run():
+        assert manager.get_token() == "token-1"
+        manager._expires_at = time.monotonic() + 301
+        assert manager.get_token() == "token-1"
+        assert endpoint.calls == 1
+
+        manager._expires_at = time.monotonic() + 200  # valid, but inside the margin
+        endpoint.release.clear()
+        refresher = threading.Thread(target=manager.get_token)
+        refresher.start()
+        wait_until(lambda: endpoint.calls == 2)
+        started = time.monotonic()
+        assert manager.get_token() == "token-1"
+        assert time.monotonic() - started < 0.1
+        endpoint.release.set()
+        refresher.join()
+        assert manager.get_token() == "token-2"
+
+    with_token_endpoint(endpoint, run)
+    assert endpoint.calls == 2
+    assert manager.stats()["expires_in"] > 3500
+
+
+if __name__ == "__main__":
+    test_deadline_returns_partial_results()
+    test_late_results_are_cached()
+    test_map_is_persisted_atomically()
+    test_map_drops_oldest_past_its_size()
+    test_map_is_flushed_in_the_background()
+    test_import_has_no_side_effects()
+    test_token_is_refreshed_once_for_concurrent_callers()
+    test_token_is_renewed_inside_the_margin()
+    print("✅ spotify client tests passed")
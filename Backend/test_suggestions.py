@@ -0,0 +1,96 @@
+import time
+
+from suggestions import SuggestionEngine
+
+COMPLETIONS = [
+    "taylor swift", "taylor swift anti hero", "taylor swift shake it off", "taylor swift love story",
+    "taylor swift cruel summer", "taylor swift lover", "taylor swift blank space", "taylor swift style",
+    "taylor swift karma", "taylor swift 22", "the weeknd", "tame impala",
+]
+
+
+class FakeUpstream:
+    """Google Suggest stand-in: up to 10 completions, counting calls"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, query):
+        self.calls.append(query)
+        if self.fail:
+            raise ConnectionError("upstream down")
+        return [c for c in COMPLETIONS if c.startswith(query.lower())][:10]
+
+
+def test_exact_and_derived_hits():
+    """Longer prefixes are answered from a cached shorter one when that is reliable"""
+    upstream = FakeUpstream()
+    engine = SuggestionEngine(upstream, derive_min=3)
+    assert engine.suggest("t")[:2] == ["taylor swift", "taylor swift anti hero"]
+    assert engine.suggest("T ") == engine.suggest("t")  # normalized: same prefix
+    assert upstream.calls == ["t"]
+
+    # "t" returned a full page (10), so "ta" is derived only because >= 3 items survive the filter
+    assert engine.suggest("ta")[0] == "taylor swift"
+    # Nothing in the cached page for "t" starts with "tam", so that goes upstream...
+    assert engine.suggest("tam") == ["tame impala"]
+    assert upstream.calls == ["t", "tam"]
+    # ...and that short list is exhaustive, so every longer prefix is derived from it
+    assert engine.suggest("tame i") == ["tame impala"]
+    assert engine.suggest("tamx") == []
+    assert upstream.calls == ["t", "tam"]
+    stats = engine.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+    assert stats["derived"] == 3
+
+
+def test_ttl_and_lru_eviction():
+    upstream = FakeUpstream()
+    engine = SuggestionEngine(upstream, maxsize=2, ttl=0.05)
+    engine.suggest("tay")
+    time.sleep(0.06)
+    engine.suggest("tay")
+    assert upstream.calls == ["tay", "tay"]
+
+    engine.suggest("the")
+    engine.suggest("tay")  # touch: "the" is now least recently used
+    engine.suggest("lov")
+    assert engine.stats()["evictions"] == 1
+    assert engine.stats()["size"] == 2
+    assert "h" not in engine._root.children["t"].children  # evicted branch pruned from the trie
+    engine.suggest("the")
+    assert upstream.calls[-1] == "the"
+
+
+def test_popular_queries_are_blended_first():
+    engine = SuggestionEngine(FakeUpstream(), popular_slots=2, popular_min_count=2)
+    for query in ["taylor swift karma"] * 3 + ["Tame  Impala"] * 2 + ["tay once"]:
+        engine.record_query(query)
+    results = engine.suggest("ta")
+    assert results[:2] == ["taylor swift karma", "tame impala"]
+    assert results.count("taylor swift karma") == 1
+    assert "tay once" not in results  # searched only once
+    assert len(results) == 10
+
+
+def test_upstream_failure_falls_back_to_cache():
+    upstream = FakeUpstream()
+    engine = SuggestionEngine(upstream, ttl=0.01)
+    engine.suggest("tay")
+    time.sleep(0.02)
+    upstream.fail = True
+    assert engine.suggest("taylor swift l") == ["taylor swift love story", "taylor swift lover"]
+    assert engine.suggest("zzz") == []
+    assert engine.stats()["upstream_errors"] == 2
+    upstream.fail = False
+    engine.suggest("zzz")
+    assert upstream.calls[-1] == "zzz"  # failures were not cached
+
+
+if __name__ == "__main__":
+    test_exact_and_derived_hits()
+    test_ttl_and_lru_eviction()
+    test_popular_queries_are_blended_first()
+    test_upstream_failure_falls_back_to_cache()
+    print("✅ suggestion tests passed")
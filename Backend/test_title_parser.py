@@ -0,0 +1,46 @@
+import json
+import os
+
+import title_parser
+from title_parser import parse_title, strip_suffixes, UNKNOWN_ARTIST
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "titles.json")
+
+
+def test_fixture_titles():
+    """Every title in the corpus parses to the recorded artist and song"""
+    with open(FIXTURE, encoding='utf-8') as f:
+        cases = json.load(f)
+    assert len(cases) >= 50
+    for case in cases:
+        assert parse_title(case["title"], case["query"], case["channel"]) == (case["artist"], case["song"]), case
+
+
+def test_query_and_channel_decide_ambiguous_titles():
+    assert parse_title("Adele - Hello", "hello") == ("Adele", "Hello")
+    assert parse_title("Hello - Adele", "hello") == ("Adele", "Hello")
+    assert parse_title("Hello", "hello", "AdeleVEVO") == ("Adele", "Hello")
+    assert parse_title("Hello", "", "") == (UNKNOWN_ARTIST, "Hello")
+
+
+def test_suffixes_stripped_in_one_pass():
+    assert strip_suffixes("Song (Official Video) [HD]") == "Song"
+    assert strip_suffixes("Song - Official Audio (4K)") == "Song"
+    assert strip_suffixes("Song (Official Music Video)") == "Song"
+    assert strip_suffixes("  Untouched  ") == "  Untouched  "
+
+
+def test_titles_are_memoized():
+    title_parser.split_title.cache_clear()
+    for query in ("shape of you", "ed sheeran", "shape of you"):
+        parse_title("Ed Sheeran - Shape of You (Official Video)", query)
+    stats = title_parser.cache_stats()["split_title"]
+    assert (stats["misses"], stats["hits"]) == (1, 2)
+
+
+if __name__ == "__main__":
+    test_fixture_titles()
+    test_query_and_channel_decide_ambiguous_titles()
+    test_suffixes_stripped_in_one_pass()
+    test_titles_are_memoized()
+    print("✅ title parser tests passed")
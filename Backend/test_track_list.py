@@ -0,0 +1,71 @@
+import random
+
+from track_list import TrackList
+
+
+def track(youtube_id):
+    return {"youtube_id": youtube_id, "title": f"Song {youtube_id}"}
+
+
+def ids(tracks):
+    return [t["youtube_id"] for t in tracks]
+
+
+def test_append_contains_remove():
+    tracks = TrackList([track("a"), track("b"), track("a"), {"title": "no id"}, track("c")])
+    assert ids(tracks) == ["a", "b", "c"]
+    assert "b" in tracks and "z" not in tracks
+    assert not tracks.append(track("b"))
+    assert tracks.append(track("d"))
+    assert tracks.remove("b")["title"] == "Song b"
+    assert tracks.remove("b") is None
+    assert ids(tracks) == ["a", "c", "d"]
+    assert tracks[0]["youtube_id"] == "a"
+    assert ids(tracks[1:]) == ["c", "d"]
+    assert tracks.index_of("d") == 2
+    assert tracks.index_of("b") is None
+    assert tracks.get("c")["title"] == "Song c"
+
+
+def test_move():
+    tracks = TrackList(track(x) for x in "abcde")
+    assert tracks.move("e", 0)
+    assert ids(tracks) == ["e", "a", "b", "c", "d"]
+    assert tracks.move("e", 2)
+    assert ids(tracks) == ["a", "b", "e", "c", "d"]
+    assert tracks.move("a", 99)
+    assert ids(tracks) == ["b", "e", "c", "d", "a"]
+    assert not tracks.move("z", 0)
+
+
+def test_matches_plain_list_under_random_operations():
+    """Many moves into the same gap force a renumber without changing the order"""
+    rng = random.Random(7)
+    tracks = TrackList()
+    reference = []
+    for step in range(3000):
+        op = rng.random()
+        if op < 0.4 or not reference:
+            youtube_id = f"id{step}"
+            tracks.append(track(youtube_id))
+            reference.append(youtube_id)
+        elif op < 0.6:
+            youtube_id = rng.choice(reference)
+            tracks.remove(youtube_id)
+            reference.remove(youtube_id)
+        else:
+            youtube_id = rng.choice(reference)
+            index = 1 if op < 0.9 else rng.randrange(len(reference))
+            tracks.move(youtube_id, index)
+            reference.remove(youtube_id)
+            reference.insert(min(index, len(reference)), youtube_id)
+        assert len(tracks) == len(reference)
+    assert ids(tracks) == reference
+    assert all(tracks.index_of(x) == i for i, x in enumerate(reference))
+
+
+if __name__ == "__main__":
+    test_append_contains_remove()
+    test_move()
+    test_matches_plain_list_under_random_operations()
+    print("✅ track list tests passed")
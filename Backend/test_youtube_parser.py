@@ -0,0 +1,54 @@
+import os
+
+from youtube_parser import parse_search_page, parse_length, clean_channel_name, extract_initial_data
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_parse_search_page():
+    """Videos come back unique, in page order, with channel data"""
+    videos = parse_search_page(load_fixture("youtube_search_shape_of_you.html"))
+    ids = [v["video_id"] for v in videos]
+    assert ids[0] == "JGwWNGJdvx8"
+    assert len(ids) == len(set(ids))
+    first = videos[0]
+    assert first["title"] == "Ed Sheeran - Shape of You (Official Music Video)"
+    assert first["length"] == "4:24"
+    assert first["channel"] == "Ed Sheeran"
+    assert first["thumbnail"].startswith("https://i.ytimg.com/vi/JGwWNGJdvx8/")
+    # Shorts are reelItemRenderers, not videoRenderers
+    assert not any(i.startswith("SHORT") for i in ids)
+
+
+def test_escaped_characters_are_decoded():
+    """\\u0026 and friends are decoded by the JSON parser, not by hand"""
+    videos = parse_search_page(load_fixture("youtube_search_lofi_hip_hop.html"))
+    titles = [v["title"] for v in videos]
+    assert "Coffee Shop Radio ☕ - 24/7 lofi & jazzy hip-hop beats" in titles
+
+
+def test_missing_or_broken_blob():
+    """Pages without a decodable ytInitialData yield nothing"""
+    assert extract_initial_data("<html></html>") is None
+    assert parse_search_page('<script>var ytInitialData = {"broken": </script>') == []
+
+
+def test_helpers():
+    assert parse_length("3:54") == 234
+    assert parse_length("1:00:01") == 3601
+    assert parse_length("") == 180
+    assert clean_channel_name("Ed Sheeran - Topic") == "Ed Sheeran"
+    assert clean_channel_name("Ed SheeranVEVO") == "Ed Sheeran"
+
+
+if __name__ == "__main__":
+    test_parse_search_page()
+    test_escaped_characters_are_decoded()
+    test_missing_or_broken_blob()
+    test_helpers()
+    print("✅ youtube_parser tests passed")
@@ -0,0 +1,81 @@
+import threading
+
+import yt_dlp
+
+from ytdl_pool import YoutubeDLPool
+
+OPTS = {'quiet': True, 'no_warnings': True}
+
+
+def test_instances_are_reused():
+    """Sequential checkouts get the same instance back"""
+    pool = YoutubeDLPool(OPTS, size=2)
+    with pool.instance() as first:
+        pass
+    with pool.instance() as second:
+        pass
+    assert first is second
+    assert pool.stats()["created"] == 1
+
+
+def test_recycled_after_max_uses():
+    """An instance is replaced once it has served max_uses checkouts"""
+    pool = YoutubeDLPool(OPTS, size=1, max_uses=2)
+    seen = []
+    for _ in range(3):
+        with pool.instance() as ydl:
+            seen.append(ydl)
+    assert seen[0] is seen[1]
+    assert seen[2] is not seen[0]
+    assert pool.stats()["recycled"] == 1
+
+
+def test_unexpected_error_discards_instance():
+    """Non-yt-dlp errors retire the instance, DownloadError does not"""
+    pool = YoutubeDLPool(OPTS, size=1)
+    try:
+        with pool.instance() as broken:
+            raise yt_dlp.utils.DownloadError("video unavailable")
+    except yt_dlp.utils.DownloadError:
+        pass
+    with pool.instance() as ydl:
+        assert ydl is broken
+    try:
+        with pool.instance():
+            raise RuntimeError("opener died")
+    except RuntimeError:
+        pass
+    with pool.instance() as ydl:
+        assert ydl is not broken
+
+
+def test_pool_is_bounded():
+    """Checkouts beyond size wait, then time out"""
+    pool = YoutubeDLPool(OPTS, size=1, acquire_timeout=0.05)
+    held = threading.Event()
+    done = threading.Event()
+
+    def hold():
+        with pool.instance():
+            held.set()
+            done.wait(1)
+
+    t = threading.Thread(target=hold)
+    t.start()
+    held.wait(1)
+    try:
+        with pool.instance():
+            assert False, "pool should be exhausted"
+    except TimeoutError:
+        pass
+    done.set()
+    t.join()
+    assert pool.stats()["total"] == 1
+
+
+if __name__ == "__main__":
+    test_instances_are_reused()
+    test_recycled_after_max_uses()
+    test_unexpected_error_discards_instance()
+    test_pool_is_bounded()
+    print("✅ ytdl_pool tests passed")
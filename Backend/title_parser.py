@@ -0,0 +1,122 @@
+import os
+import re
+from functools import lru_cache
+
+from youtube_parser import clean_channel_name
+
+UNKNOWN_ARTIST = "Unknown Artist"
+TITLE_CACHE_SIZE = int(os.getenv("TITLE_CACHE_SIZE", "8192"))
+
+PAREN_RE = re.compile(r'\(([^)]+)\)')
+# "Artist - Song (Official Video)", "Artist | Song", then a looser "Artist - Song"
+TITLE_PATTERNS = (
+    re.compile(r'^([^-]+)\s*-\s*([^(]+)'),
+    re.compile(r'^([^|]+)\s*\|\s*([^(]+)'),
+    re.compile(r'([^-]+)\s*-\s*(.+)'),
+)
+EDGE_PUNCTUATION_RE = re.compile(r'^[-|•·\s]+|[-|•·\s]+$')
+
+# Words that mark a fragment as video metadata rather than an artist name (substring match)
+PAREN_NOISE_RE = re.compile('official|video|audio|lyrics|music|ft|feat')
+PATTERN_NOISE_RE = re.compile('official|video|audio|lyrics|hd|4k')
+REMAINDER_NOISE_RE = re.compile('official|video|audio|lyrics|music')
+
+SUFFIXES = (
+    '(Official Video)', '(Official Audio)', '(Official Music Video)',
+    '(Lyrics)', '(Lyric Video)', '[Official Video]', '[Official Audio]',
+    '- Official Video', '- Official Audio', '| Official Video',
+    '(Full Video)', '(HD)', '[HD]', '(4K)', '[4K]', '(Official)',
+)
+# Every suffix in one left-to-right pass; longest first so overlapping alternatives can't split a match
+SUFFIX_RE = re.compile('|'.join(re.escape(s) for s in sorted(SUFFIXES, key=len, reverse=True)))
+
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def split_title(title):
+    """The query-independent reading of a title, computed once per raw title.
+
+    Returns ("dash", first, second) when the title has " - " (which side is
+    the song depends on the query), otherwise ("fixed", artist, song).
+    """
+    if ' - ' in title:
+        first, second = title.split(' - ', 1)
+        return "dash", first.strip(), second.strip()
+
+    artist, song = UNKNOWN_ARTIST, title
+    if ' | ' in title:
+        parts = title.split(' | ')
+        song, artist = parts[0].strip(), parts[1].strip()
+    else:
+        by_index = title.lower().find(' by ')
+        if by_index != -1:
+            song, artist = title[:by_index].strip(), title[by_index + 4:].strip()
+        elif '(' in title and ')' in title:
+            match = PAREN_RE.search(title)
+            if match:
+                candidate = match.group(1).strip()
+                if not PAREN_NOISE_RE.search(candidate.lower()):
+                    artist = candidate
+                    song = title.replace(f'({candidate})', '').strip()
+
+    if artist == UNKNOWN_ARTIST:
+        artist, song = match_title_patterns(title) or (artist, song)
+    return "fixed", artist, song
+
+
+def match_title_patterns(title):
+    """The first regex fallback whose artist isn't metadata, as (artist, song); None if none apply"""
+    for pattern in TITLE_PATTERNS:
+        match = pattern.match(title)
+        if match:
+            candidate = match.group(1).strip()
+            if not PATTERN_NOISE_RE.search(candidate.lower()):
+                return candidate, match.group(2).strip()
+    return None
+
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def strip_suffixes(song):
+    """Remove "(Official Video)"-style decorations from a song name"""
+    stripped, count = SUFFIX_RE.subn('', song)
+    return stripped.strip() if count else song
+
+
+def parse_title(title, query="", channel=""):
+    """Split a YouTube video title into (artist, song name).
+
+    ``query`` decides which side of "A - B" is the song and is the last-resort
+    song name; ``channel`` is the artist when the title itself names none.
+    """
+    kind, first, second = split_title(title)
+    if kind == "dash":
+        if query.lower() in first.lower():
+            song, artist = first, second
+        else:
+            artist, song = first, second
+        if artist == UNKNOWN_ARTIST:
+            artist, song = match_title_patterns(title) or (artist, song)
+    else:
+        artist, song = first, second
+
+    if artist == UNKNOWN_ARTIST and channel:
+        artist = clean_channel_name(channel)
+
+    if artist == UNKNOWN_ARTIST and query:
+        song = query
+        remaining = title.replace(query, '').strip()
+        if remaining and len(remaining) > 2:
+            remaining = EDGE_PUNCTUATION_RE.sub('', remaining)
+            if remaining and not REMAINDER_NOISE_RE.search(remaining.lower()):
+                artist = remaining
+
+    if not artist or artist.strip() == "":
+        artist = UNKNOWN_ARTIST
+    return artist, strip_suffixes(song)
+
+
+def cache_stats():
+    return {
+        name: {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+        for name, info in (("split_title", split_title.cache_info()),
+                           ("strip_suffixes", strip_suffixes.cache_info()))
+    }
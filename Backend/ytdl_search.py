@@ -0,0 +1,57 @@
+import logging
+
+from cache import SingleFlight, normalize_query
+from ytdl_pool import YoutubeDLPool
+
+logger = logging.getLogger(__name__)
+
+# Shared by music_api and main_api's federated search. Importing this module
+# starts nothing: the pool creates YoutubeDL instances on first use, or when
+# the owning service calls SEARCH_YDL_POOL.warm_in_background().
+SEARCH_YDL_POOL = YoutubeDLPool({
+    'format': 'bestaudio/best',
+    'noplaylist': True,
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': True,
+    'skip_download': True,
+}, name="flat_search")
+
+# Concurrent identical searches share one yt-dlp lookup
+SEARCH_FLIGHTS = SingleFlight("ytdlp_search")
+
+
+def format_track_ytdlp(entry):
+    """Formats raw yt-dlp entry into the standardized track object."""
+    video_id = entry.get('id')
+    if not video_id:
+        return None
+    return {
+        "id": f"youtube_{video_id}",
+        "name": entry.get("title", "Unknown Title"),
+        "artists": ["YouTube"],
+        "album": "YouTube Music",
+        "image": f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+        "youtube_id": video_id,
+        "duration": int(entry.get("duration", 0)) * 1000,
+        "source": "youtube"
+    }
+
+
+def ytdlp_search(query, limit=10):
+    """YouTube search via yt-dlp, collapsing identical concurrent queries."""
+    key = (normalize_query(query), limit)
+    return SEARCH_FLIGHTS.do(key, lambda: _ytdlp_search(query, limit))
+
+
+def _ytdlp_search(query, limit=10):
+    """Reliable YouTube search using yt-dlp's built-in search service."""
+    try:
+        with SEARCH_YDL_POOL.instance() as ydl:
+            data = ydl.extract_info(f"ytsearch{limit}:{query}", download=False)
+            entries = data.get('entries', [])
+            tracks = [format_track_ytdlp(entry) for entry in entries if entry]
+            return [t for t in tracks if t]
+    except Exception as e:
+        logger.error(f"yt-dlp search error for query '{query}': {str(e)}")
+        raise e
@@ -0,0 +1,237 @@
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+from ytdl_pool import YoutubeDLPool
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+CHUNK_SIZE = int(os.getenv("AUDIO_PROXY_CHUNK_SIZE", "16384"))
+# A listener gives up if the transcoder produces nothing for this long (seconds)
+STALL_TIMEOUT = float(os.getenv("AUDIO_PROXY_STALL_TIMEOUT", "30"))
+
+RESOLVE_OPTS = {
+    'format': 'bestaudio/best',
+    'noplaylist': True,
+    'quiet': True,
+    'no_warnings': True,
+}
+
+
+def ffmpeg_command(source_url, headers, quality):
+    """ffmpeg argv that reads the remote audio stream and writes MP3 to stdout"""
+    command = [FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error"]
+    if headers:
+        command += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+    command += [
+        "-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5",
+        "-i", source_url,
+        "-vn", "-codec:a", "libmp3lame", "-b:a", f"{quality}k",
+        "-f", "mp3", "pipe:1",
+    ]
+    return command
+
+
+class TrackBusy(RuntimeError):
+    """Another producer (a download job) is already writing this track"""
+
+    def __init__(self, youtube_id, owner):
+        super().__init__(f"{youtube_id} is already being produced by {owner}")
+        self.youtube_id = youtube_id
+        self.owner = owner
+
+
+class _Transcode:
+    """One running ffmpeg process and the file it is being teed into"""
+
+    def __init__(self, youtube_id, path):
+        self.youtube_id = youtube_id
+        self.path = path
+        self.size = 0
+        self.done = False
+        self.error = None
+        self.title = None
+        self.started_at = time.monotonic()
+        self.cond = threading.Condition()
+
+
+class AudioProxy:
+    """Streams MP3 to clients while it is still being transcoded.
+
+    The bestaudio stream is piped through ffmpeg and every chunk is appended
+    to a temp file in the download store. Listeners follow that file, so the
+    first bytes go out as soon as ffmpeg produces them and any number of
+    clients can share one transcode. When ffmpeg finishes the file is renamed
+    into place and indexed; it keeps going if every client disconnects.
+    A track another producer has claimed in the store raises TrackBusy.
+    """
+
+    def __init__(self, store, quality, resolve=None, command=ffmpeg_command,
+                 chunk_size=CHUNK_SIZE, stall_timeout=STALL_TIMEOUT):
+        self.store = store
+        self.quality = quality
+        self.command = command
+        self.chunk_size = chunk_size
+        self.stall_timeout = stall_timeout
+        self.resolve = resolve or self._resolve_with_ytdl
+        self.pool = YoutubeDLPool(RESOLVE_OPTS, size=2, name="audio-proxy")
+        self._active = {}  # youtube_id -> _Transcode
+        self._lock = threading.Lock()
+        self.started = 0
+        self.joined = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes_streamed = 0
+        self.total_first_byte_ms = 0.0
+        self.first_bytes = 0
+
+    def _resolve_with_ytdl(self, youtube_id):
+        """Return (audio url, request headers, title) for a video"""
+        url = f"https://www.youtube.com/watch?v={youtube_id}"
+        with self.pool.instance() as ydl:
+            info = ydl.extract_info(url, download=False)
+        return info["url"], info.get("http_headers") or {}, info.get("title")
+
+    def stream(self, youtube_id):
+        """Return an iterator of MP3 chunks; raises if no audio could be produced"""
+        with self._lock:
+            transcode = self._active.get(youtube_id)
+            if transcode is None:
+                owner = self.store.claim(youtube_id, self.quality, "stream")
+                if owner != "stream":
+                    raise TrackBusy(youtube_id, owner)
+                transcode = self._start(youtube_id)
+                self.started += 1
+            else:
+                self.joined += 1
+            # Open under the lock: the writer renames the file when it finishes
+            reader = open(transcode.path, 'rb')
+        try:
+            first = self._next_chunk(transcode, reader)
+            if not first:
+                raise RuntimeError(transcode.error or "transcoder produced no audio")
+        except Exception:
+            reader.close()
+            raise
+        return self._follow(transcode, reader, first)
+
+    def _start(self, youtube_id):
+        """Create the temp file and launch the writer thread (caller holds the lock)"""
+        path = os.path.join(self.store.root, f"{self.store.key(youtube_id, self.quality)}.stream.tmp")
+        try:
+            out = open(path, 'wb')
+        except OSError:
+            self.store.release(youtube_id, self.quality, "stream")
+            raise
+        transcode = _Transcode(youtube_id, path)
+        self._active[youtube_id] = transcode
+        self.store.pin(youtube_id, self.quality)
+        threading.Thread(target=self._run, args=(transcode, out), daemon=True,
+                         name=f"audio-proxy-{youtube_id}").start()
+        return transcode
+
+    def _run(self, transcode, out):
+        youtube_id = transcode.youtube_id
+        proc = None
+        try:
+            source_url, headers, transcode.title = self.resolve(youtube_id)
+            with tempfile.TemporaryFile() as stderr:
+                proc = subprocess.Popen(self.command(source_url, headers, self.quality),
+                                        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+                while True:
+                    # read1 returns whatever is buffered instead of waiting for a full chunk
+                    chunk = proc.stdout.read1(self.chunk_size)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    out.flush()
+                    with transcode.cond:
+                        if transcode.size == 0:
+                            self._record_first_byte(transcode)
+                        transcode.size += len(chunk)
+                        transcode.cond.notify_all()
+                returncode = proc.wait()
+                if returncode != 0:
+                    stderr.seek(0)
+                    lines = stderr.read().decode('utf-8', 'replace').strip().splitlines()
+                    detail = f": {lines[-1]}" if lines else ""
+                    raise RuntimeError(f"ffmpeg exited with {returncode}{detail}")
+            if transcode.size == 0:
+                raise RuntimeError("transcoder produced no audio")
+            out.close()
+            final_path = self.store.path_for(youtube_id, self.quality)
+            with self._lock:
+                os.replace(transcode.path, final_path)
+                transcode.path = final_path
+            self.store.add(youtube_id, self.quality, title=transcode.title)
+            self.completed += 1
+            logger.info(f"Streamed and stored {youtube_id} ({transcode.size} bytes)")
+        except Exception as e:
+            transcode.error = str(e)
+            self.failed += 1
+            logger.error(f"Audio proxy failed for {youtube_id}: {e}")
+            out.close()
+            try:
+                os.remove(transcode.path)
+            except OSError:
+                pass
+        finally:
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            with self._lock:
+                self._active.pop(youtube_id, None)
+            self.store.release(youtube_id, self.quality, "stream")
+            self.store.unpin(youtube_id, self.quality)
+            with transcode.cond:
+                transcode.done = True
+                transcode.cond.notify_all()
+
+    def _record_first_byte(self, transcode):
+        self.first_bytes += 1
+        self.total_first_byte_ms += (time.monotonic() - transcode.started_at) * 1000
+
+    def _next_chunk(self, transcode, reader):
+        """Block until the writer is ahead of this reader; b'' once the transcode is over"""
+        position = reader.tell()
+        with transcode.cond:
+            while transcode.size <= position and not transcode.done:
+                if not transcode.cond.wait(self.stall_timeout):
+                    raise TimeoutError(f"no audio from transcoder for {self.stall_timeout}s")
+            available = transcode.size - position
+        if not available:
+            if transcode.error:
+                raise RuntimeError(transcode.error)
+            return b""
+        chunk = reader.read(min(available, self.chunk_size))
+        self.bytes_streamed += len(chunk)
+        return chunk
+
+    def _follow(self, transcode, reader, first):
+        try:
+            yield first
+            while True:
+                chunk = self._next_chunk(transcode, reader)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            reader.close()
+
+    def stats(self):
+        with self._lock:
+            active = len(self._active)
+        return {
+            "active": active,
+            "started": self.started,
+            "joined": self.joined,
+            "completed": self.completed,
+            "failed": self.failed,
+            "bytes_streamed": self.bytes_streamed,
+            "avg_first_byte_ms": round(self.total_first_byte_ms / self.first_bytes, 1)
+            if self.first_bytes else None,
+        }
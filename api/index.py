@@ -1,19 +1,27 @@
-from flask import Flask, request, jsonify, Response, send_from_directory
+from flask import Flask, request, jsonify, Response, send_file
+from werkzeug.security import safe_join
 from flask_cors import CORS
 import logging
 import json
-import time
-from base64 import b64encode
-import requests
 import os
-import yt_dlp
 from dotenv import load_dotenv
 import urllib.parse
 import re
-from functools import lru_cache
 import urllib3
 from urllib.parse import quote_plus
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import http_client
+from cache import TTLCache, SingleFlight, normalize_query
+from audio_proxy import AudioProxy, TrackBusy
+from download_jobs import DownloadJobQueue
+from download_store import DownloadStore, is_valid_youtube_id
+from playlist_store import open_playlist_store
+from precomputed import PrecomputedResponse
+from suggestions import SuggestionEngine
+import title_parser
+from title_parser import parse_title
+from ranking import Ranker, weights_from_env
+from federated import FederatedSearch
+from youtube_parser import iter_search_page, parse_length
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -28,6 +36,72 @@ logger = logging.getLogger(__name__)
 # Create downloads folder if it doesn't exist
 os.makedirs('downloads', exist_ok=True)
 
+# Search result cache (normalized query + limit -> tracks)
+SEARCH_CACHE = TTLCache(
+    maxsize=int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+    ttl=int(os.getenv("SEARCH_CACHE_TTL", "900")),
+    stale_ttl=int(os.getenv("SEARCH_CACHE_STALE_TTL", "3600")),
+    name="search_cache",
+)
+# Concurrent identical searches share one upstream fetch
+SEARCH_FLIGHTS = SingleFlight("search")
+# Scraped results considered per search before ranking cuts them to the requested limit
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "30"))
+RANKER = Ranker(weights_from_env())
+
+def fetch_google_suggestions(query):
+    """YouTube completions from Google Suggest; raises so failures aren't cached"""
+    url = f"http://suggestqueries.google.com/complete/search?client=youtube&ds=yt&client=firefox&q={quote_plus(query)}"
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    }
+    response = http_client.get(url, headers=headers, verify=False)
+    response.raise_for_status()
+    return json.loads(response.text)[1]
+
+# Keystroke autocomplete: prefix trie over Google Suggest, blended with popular local searches
+SUGGESTIONS = SuggestionEngine(
+    fetch_google_suggestions,
+    maxsize=int(os.getenv("SUGGESTIONS_CACHE_SIZE", "20000")),
+    ttl=int(os.getenv("SUGGESTIONS_CACHE_TTL", "3600")),
+    derive_min=int(os.getenv("SUGGESTIONS_DERIVE_MIN", "5")),
+    popular_size=int(os.getenv("SUGGESTIONS_POPULAR_SIZE", "5000")),
+)
+
+# Audio serving: browser cache lifetime, and optional offload to the front server
+AUDIO_MAX_AGE = int(os.getenv("AUDIO_MAX_AGE", "86400"))
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "")
+
+# Finished MP3s live at downloads/<youtube_id>_<quality>.mp3
+DOWNLOAD_QUALITY = '192'
+DOWNLOAD_STORE = DownloadStore('downloads')
+
+def record_download(job):
+    """Job completion hook: index the finished file and release its claim and pin"""
+    try:
+        if job["status"] == "finished":
+            DOWNLOAD_STORE.add(job["youtube_id"], DOWNLOAD_QUALITY, title=job["title"])
+    finally:
+        DOWNLOAD_STORE.release(job["youtube_id"], DOWNLOAD_QUALITY, "download")
+        DOWNLOAD_STORE.unpin(job["youtube_id"], DOWNLOAD_QUALITY)
+
+# MP3 downloads run as background jobs on a process pool (FFmpeg is CPU-bound)
+DOWNLOAD_OPTS = {
+    'format': 'bestaudio/best',
+    'postprocessors': [{
+        'key': 'FFmpegExtractAudio',
+        'preferredcodec': 'mp3',
+        'preferredquality': DOWNLOAD_QUALITY,
+    }],
+    'outtmpl': DOWNLOAD_STORE.outtmpl(DOWNLOAD_QUALITY),
+    'noplaylist': True,
+    'quiet': True,
+    'no_warnings': True,
+}
+DOWNLOAD_JOBS = DownloadJobQueue(DOWNLOAD_OPTS, on_complete=record_download)
+# Play-while-downloading: ffmpeg output is streamed to the client and teed into the store
+AUDIO_PROXY = AudioProxy(DOWNLOAD_STORE, DOWNLOAD_QUALITY)
+
 # Dynamic music data based on search queries
 MUSIC_DATABASE = {
     "trending": [
@@ -148,328 +222,240 @@ MUSIC_DATABASE = {
     ]
 }
 
+def search_key(query, limit):
+    """SEARCH_CACHE and SEARCH_FLIGHTS key shared by /search and /search/stream"""
+    return (normalize_query(query), limit)
+
+def load_search(query, limit):
+    """Scrape a search, collapsing identical concurrent ones into one fetch"""
+    return SEARCH_FLIGHTS.do(search_key(query, limit), lambda: scrape_youtube_music(query, limit))
+
 def search_youtube_music(query, limit=5):
+    """Search YouTube for music, serving repeated queries from SEARCH_CACHE"""
+    results = SEARCH_CACHE.get_or_load(search_key(query, limit), lambda: load_search(query, limit),
+                                       cache_if=bool)  # don't pin failed/empty searches
+    return [dict(track) for track in results]
+
+YOUTUBE_SEARCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+def fetch_youtube_search_page(query):
+    """Fetch the YouTube results page for a music search; None if YouTube didn't answer 200"""
+    logger.info(f"Searching YouTube for: {query}")
+    search_url = f"https://www.youtube.com/results?search_query={quote_plus(f'{query} music')}"
+    response = http_client.get(search_url, headers=YOUTUBE_SEARCH_HEADERS, verify=False)
+    logger.info(f"YouTube response status: {response.status_code}")
+    if response.status_code != 200:
+        return None
+    logger.info(f"Response content length: {len(response.text)}")
+    return response.text
+
+def iter_youtube_tracks(query, content, count):
+    """Yield up to count tracks from a results page, in page order, as each video is parsed"""
+    yielded = 0
+    # Decode the embedded ytInitialData once instead of regex-scanning the page
+    for video in iter_search_page(content):
+        if yielded >= count:
+            return
+        if not video["title"]:
+            continue
+        video_id = video["video_id"]
+        artist, song_name = parse_title(video["title"], query, video["channel"])
+        yielded += 1
+        yield {
+            "id": f"youtube_{video_id}",
+            "name": song_name,
+            "artists": [artist],
+            "album": "YouTube Music",
+            "image": f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+            "youtube_id": video_id,
+            "duration": parse_length(video["length"]) * 1000,
+            "source": "youtube"
+        }
+
+def fallback_youtube_tracks(content, limit):
+    """Bare video ids scraped from a page whose ytInitialData couldn't be read"""
+    video_ids = re.findall(r'"videoId":"([a-zA-Z0-9_-]{11})"', content)
+    fallback_results = []
+    seen_fallback_ids = set()
+    for video_id in video_ids[:limit]:
+        if video_id not in seen_fallback_ids:
+            seen_fallback_ids.add(video_id)
+            fallback_results.append({
+                "id": f"youtube_{video_id}",
+                "name": f"Search Result {len(fallback_results)+1}",
+                "artists": ["YouTube"],
+                "album": "Search Results",
+                "image": f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+                "youtube_id": video_id,
+                "duration": 180000,
+                "source": "youtube"
+            })
+    logger.info(f"Fallback search found {len(fallback_results)} unique video IDs")
+    return fallback_results
+
+def scrape_youtube_music(query, limit=5):
     """Search YouTube for any music using web scraping"""
     try:
-        logger.info(f"Searching YouTube for: {query}")
-        
-        # Clean and encode the search query
-        search_query = f"{query} music"
-        encoded_query = quote_plus(search_query)
-        search_url = f"https://www.youtube.com/results?search_query={encoded_query}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        }
-        
-        response = requests.get(search_url, headers=headers, timeout=10, verify=False)
-        logger.info(f"YouTube response status: {response.status_code}")
+        content = fetch_youtube_search_page(query)
+        if content is None:
+            logger.error("All search methods failed")
+            return []
         
-        if response.status_code == 200:
-            content = response.text
-            logger.info(f"Response content length: {len(content)}")
-            
-            # Multiple regex patterns to catch different YouTube formats
-            patterns = [
-                r'"videoId":"([a-zA-Z0-9_-]{11})"[^}]*"title":\{"runs":\[\{"text":"([^"]+)"[^}]*\}[^}]*"lengthText":\{"simpleText":"([^"]+)"',
-                r'"videoId":"([a-zA-Z0-9_-]{11})"[^}]*"title":\{"simpleText":"([^"]+)"[^}]*"lengthText":\{"simpleText":"([^"]+)"',
-                r'"videoId":"([a-zA-Z0-9_-]{11})".*?"text":"([^"]+)".*?"lengthText".*?"simpleText":"([^"]+)"',
-                r'{"videoId":"([a-zA-Z0-9_-]{11})".*?"title":{"runs":\[{"text":"([^"]+)"}.*?"lengthText":{"simpleText":"([^"]+)"}',
-            ]
-            
-            results = []
-            seen_video_ids = set()  # Track seen video IDs to prevent duplicates
-            
-            for pattern in patterns:
-                matches = re.findall(pattern, content, re.DOTALL)
-                logger.info(f"Pattern found {len(matches)} matches")
-                
-                if matches:
-                    for i, match in enumerate(matches):
-                        if len(match) >= 3 and len(results) < limit:
-                            video_id, title, duration = match[0], match[1], match[2]
-                            
-                            # Skip if we've already seen this video ID
-                            if video_id in seen_video_ids:
-                                continue
-                            seen_video_ids.add(video_id)
-                            
-                            # Clean title
-                            clean_title = title.replace('\\u0026', '&').replace('\\"', '"').replace('\\/', '/').replace('\\u003c', '<').replace('\\u003e', '>')
-                            
-                            # Enhanced artist and song extraction with better logic
-                            artist = "Unknown Artist"
-                            song_name = clean_title
-                            
-                            logger.info(f"Processing title: {clean_title}")
-                            
-                            # Improved parsing logic with multiple strategies
-                            if ' - ' in clean_title:
-                                parts = clean_title.split(' - ', 1)
-                                if len(parts) == 2:
-                                    # Check which part is more likely to be the song
-                                    first_part = parts[0].strip()
-                                    second_part = parts[1].strip()
-                                    
-                                    # If first part contains query, it's likely the song
-                                    if query.lower() in first_part.lower():
-                                        song_name = first_part
-                                        artist = second_part
-                                    else:
-                                        artist = first_part
-                                        song_name = second_part
-                                    logger.info(f"Parsed with ' - ': artist={artist}, song={song_name}")
-                            elif ' | ' in clean_title:
-                                parts = clean_title.split(' | ')
-                                if len(parts) >= 2:
-                                    # First part is usually the song, second is artist
-                                    song_name = parts[0].strip()
-                                    artist = parts[1].strip()
-                                    logger.info(f"Parsed with ' | ': artist={artist}, song={song_name}")
-                            elif ' by ' in clean_title.lower():
-                                by_index = clean_title.lower().find(' by ')
-                                if by_index != -1:
-                                    song_name = clean_title[:by_index].strip()
-                                    artist = clean_title[by_index + 4:].strip()
-                                    logger.info(f"Parsed with ' by ': artist={artist}, song={song_name}")
-                            elif '(' in clean_title and ')' in clean_title:
-                                # Extract artist from parentheses if present
-                                paren_match = re.search(r'\(([^)]+)\)', clean_title)
-                                if paren_match:
-                                    potential_artist = paren_match.group(1).strip()
-                                    if not any(word in potential_artist.lower() for word in ['official', 'video', 'audio', 'lyrics', 'music', 'ft', 'feat']):
-                                        artist = potential_artist
-                                        song_name = clean_title.replace(f'({potential_artist})', '').strip()
-                                        logger.info(f"Parsed with parentheses: artist={artist}, song={song_name}")
-                            
-                            # Additional fallback: try to extract from common patterns
-                            if artist == "Unknown Artist":
-                                # Try patterns like "Artist Name - Song Title (Official Video)"
-                                title_patterns = [
-                                    r'^([^-]+)\s*-\s*([^(]+)',  # Artist - Song
-                                    r'^([^|]+)\s*\|\s*([^(]+)',  # Artist | Song
-                                    r'([^-]+)\s*-\s*(.+)',      # Fallback Artist - Song
-                                ]
-                                
-                                for pattern in title_patterns:
-                                    match = re.match(pattern, clean_title)
-                                    if match:
-                                        potential_artist = match.group(1).strip()
-                                        potential_song = match.group(2).strip()
-                                        
-                                        # Validate that it's not just metadata
-                                        if not any(word in potential_artist.lower() for word in ['official', 'video', 'audio', 'lyrics', 'hd', '4k']):
-                                            artist = potential_artist
-                                            song_name = potential_song
-                                            logger.info(f"Parsed with regex pattern: artist={artist}, song={song_name}")
-                                            break
-                            
-                            # Final fallback: use query as song name if no good parsing found
-                            if artist == "Unknown Artist" and query:
-                                song_name = query
-                                # Try to extract artist from remaining title
-                                remaining = clean_title.replace(query, '').strip()
-                                if remaining and len(remaining) > 2:
-                                    # Clean up common prefixes/suffixes
-                                    remaining = re.sub(r'^[-|•·\s]+|[-|•·\s]+$', '', remaining)
-                                    if remaining and not any(word in remaining.lower() for word in ['official', 'video', 'audio', 'lyrics', 'music']):
-                                        artist = remaining
-                                        logger.info(f"Fallback parsing: artist={artist}, song={song_name}")
-                            
-                            # Ensure we always have an artist name
-                            if not artist or artist.strip() == "":
-                                artist = "Unknown Artist"
-                            
-                            # Clean up common suffixes from song names
-                            suffixes_to_remove = [
-                                '(Official Video)', '(Official Audio)', '(Official Music Video)',
-                                '(Lyrics)', '(Lyric Video)', '[Official Video]', '[Official Audio]',
-                                '- Official Video', '- Official Audio', '| Official Video',
-                                '(Full Video)', '(HD)', '[HD]', '(4K)', '[4K]', '(Official)'
-                            ]
-                            for suffix in suffixes_to_remove:
-                                if suffix in song_name:
-                                    song_name = song_name.replace(suffix, '').strip()
-                            
-                            # Calculate relevance score for sorting
-                            relevance_score = 0
-                            query_lower = query.lower()
-                            song_lower = song_name.lower()
-                            artist_lower = artist.lower()
-                            
-                            # Exact match gets highest score
-                            if query_lower == song_lower:
-                                relevance_score = 100
-                            elif query_lower in song_lower:
-                                relevance_score = 80
-                            elif any(word in song_lower for word in query_lower.split()):
-                                relevance_score = 60
-                            elif query_lower in artist_lower:
-                                relevance_score = 40
-                            else:
-                                relevance_score = 20
-                            
-                            # Parse duration
-                            duration_seconds = 180  # Default
-                            if ':' in duration:
-                                try:
-                                    time_parts = duration.split(':')
-                                    if len(time_parts) == 2:
-                                        duration_seconds = int(time_parts[0]) * 60 + int(time_parts[1])
-                                    elif len(time_parts) == 3:
-                                        duration_seconds = int(time_parts[0]) * 3600 + int(time_parts[1]) * 60 + int(time_parts[2])
-                                except:
-                                    duration_seconds = 180
-                            
-                            results.append({
-                                "id": f"youtube_{video_id}",
-                                "name": song_name,
-                                "artists": [artist],
-                                "album": "YouTube Music",
-                                "image": f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
-                                "youtube_id": video_id,
-                                "duration": duration_seconds * 1000,
-                                "source": "youtube",
-                                "relevance_score": relevance_score
-                            })
-                    
-                    if results:
-                        break
-            
-            # Sort by relevance score (highest first)
-            results.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
-            
-            # Remove relevance_score from final results
-            for result in results:
-                result.pop('relevance_score', None)
-            
-            if results:
-                logger.info(f"Successfully found {len(results)} unique tracks, sorted by relevance")
-                return results
-            else:
-                logger.warning("No tracks found with any pattern, trying fallback search")
-                # Fallback: simpler search without duration
-                simple_pattern = r'"videoId":"([a-zA-Z0-9_-]{11})"'
-                video_ids = re.findall(simple_pattern, content)
-                
-                if video_ids:
-                    fallback_results = []
-                    seen_fallback_ids = set()
-                    for i, video_id in enumerate(video_ids[:limit]):
-                        if video_id not in seen_fallback_ids:
-                            seen_fallback_ids.add(video_id)
-                            fallback_results.append({
-                                "id": f"youtube_{video_id}",
-                                "name": f"Search Result {len(fallback_results)+1}",
-                                "artists": ["YouTube"],
-                                "album": "Search Results",
-                                "image": f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
-                                "youtube_id": video_id,
-                                "duration": 180000,
-                                "source": "youtube"
-                            })
-                    logger.info(f"Fallback search found {len(fallback_results)} unique video IDs")
-                    return fallback_results
-        
-        logger.error("All search methods failed")
-        return []
+        # Collect a wider pool than asked for, then let the ranker pick the best `limit`
+        candidates = list(iter_youtube_tracks(query, content, max(limit, SEARCH_CANDIDATES)))
+        return rank_youtube_tracks(query, content, candidates, limit)
         
     except Exception as e:
         logger.error(f"YouTube search failed with error: {e}")
         return []
 
+def rank_youtube_tracks(query, content, candidates, limit):
+    """The best `limit` candidates, or bare video ids if the page yielded none"""
+    results = RANKER.rank(query, candidates, limit)
+    if results:
+        logger.info(f"Successfully found {len(results)} unique tracks, sorted by relevance")
+        return results
+    
+    logger.warning("No tracks found in ytInitialData, trying fallback search")
+    return fallback_youtube_tracks(content, limit)
+
+# ========================
+# FEDERATED SEARCH
+# ========================
+
+# Comma-separated backends for /search/federated, in preference order
+FEDERATED_BACKENDS = [b.strip() for b in os.getenv("FEDERATED_BACKENDS", "scraper,ytdlp,spotify").split(",") if b.strip()]
+
+def load_federated_backends(names=FEDERATED_BACKENDS):
+    """name -> fn(query, limit); backends whose module or dependencies are missing are left out"""
+    backends = {}
+    for name in names:
+        try:
+            if name == "scraper":
+                backends[name] = lambda query, limit: search_youtube_music(query, limit=limit)
+            elif name == "ytdlp":
+                from ytdl_search import ytdlp_search
+                backends[name] = lambda query, limit: ytdlp_search(query, limit=limit)
+            elif name == "spotify":
+                from spotify_client import spotify_search
+                backends[name] = lambda query, limit: spotify_search(query, limit=limit)
+            else:
+                logger.warning(f"Unknown federated search backend: {name}")
+        except ImportError as e:
+            logger.warning(f"Federated search backend {name} unavailable: {e}")
+    return backends
+
+FEDERATED = FederatedSearch(
+    load_federated_backends(),
+    deadline=float(os.getenv("FEDERATED_DEADLINE", "4.0")),
+    confidence=float(os.getenv("FEDERATED_CONFIDENCE", "0.5")),
+    demote_latency=float(os.getenv("FEDERATED_DEMOTE_LATENCY", "2.5")),
+    min_samples=int(os.getenv("FEDERATED_MIN_SAMPLES", "5")),
+    probe_every=int(os.getenv("FEDERATED_PROBE_EVERY", "10")),
+    rank=RANKER.rank,
+)
+
 def get_trending_music():
     """Get trending music"""
     return MUSIC_DATABASE['trending']
 
 def get_fallback_shuffle_playlist():
-    """Fallback shuffle playlist"""
-    try:
-        logger.info("Using fallback shuffle playlist")
-        
-        # Curated diverse shuffle playlist
-        fallback_tracks = [
-            {"id": "youtube_G7KNmW9a75Y", "name": "Flowers", "artists": ["Miley Cyrus"], "album": "Endless Summer Vacation", "image": "https://img.youtube.com/vi/G7KNmW9a75Y/hqdefault.jpg", "youtube_id": "G7KNmW9a75Y", "duration": 200000, "source": "youtube"},
-            {"id": "youtube_b1kbLWvqugk", "name": "Anti-Hero", "artists": ["Taylor Swift"], "album": "Midnights", "image": "https://img.youtube.com/vi/b1kbLWvqugk/hqdefault.jpg", "youtube_id": "b1kbLWvqugk", "duration": 201000, "source": "youtube"},
-            {"id": "youtube_H5v3kku4y6Q", "name": "As It Was", "artists": ["Harry Styles"], "album": "Harry's House", "image": "https://img.youtube.com/vi/H5v3kku4y6Q/hqdefault.jpg", "youtube_id": "H5v3kku4y6Q", "duration": 167000, "source": "youtube"},
-            {"id": "youtube_4NRXx6U8ABQ", "name": "Blinding Lights", "artists": ["The Weeknd"], "album": "After Hours", "image": "https://img.youtube.com/vi/4NRXx6U8ABQ/hqdefault.jpg", "youtube_id": "4NRXx6U8ABQ", "duration": 200000, "source": "youtube"},
-            {"id": "youtube_JGwWNGJdvx8", "name": "Shape of You", "artists": ["Ed Sheeran"], "album": "÷ (Divide)", "image": "https://img.youtube.com/vi/JGwWNGJdvx8/hqdefault.jpg", "youtube_id": "JGwWNGJdvx8", "duration": 233000, "source": "youtube"},
-            {"id": "youtube_DyDfgMOUjCI", "name": "Bad Guy", "artists": ["Billie Eilish"], "album": "When We All Fall Asleep, Where Do We Go?", "image": "https://img.youtube.com/vi/DyDfgMOUjCI/hqdefault.jpg", "youtube_id": "DyDfgMOUjCI", "duration": 194000, "source": "youtube"},
-            {"id": "youtube_fJ9rUzIMcZQ", "name": "Bohemian Rhapsody", "artists": ["Queen"], "album": "A Night at the Opera", "image": "https://img.youtube.com/vi/fJ9rUzIMcZQ/hqdefault.jpg", "youtube_id": "fJ9rUzIMcZQ", "duration": 355000, "source": "youtube"},
-            {"id": "youtube_hTWKbfoikeg", "name": "Smells Like Teen Spirit", "artists": ["Nirvana"], "album": "Nevermind", "image": "https://img.youtube.com/vi/hTWKbfoikeg/hqdefault.jpg", "youtube_id": "hTWKbfoikeg", "duration": 301000, "source": "youtube"},
-            {"id": "youtube_OPf0YbXqDm0", "name": "Uptown Funk", "artists": ["Mark Ronson", "Bruno Mars"], "album": "Uptown Special", "image": "https://img.youtube.com/vi/OPf0YbXqDm0/hqdefault.jpg", "youtube_id": "OPf0YbXqDm0", "duration": 270000, "source": "youtube"},
-            {"id": "youtube_09R8_2nJtjg", "name": "Sugar", "artists": ["Maroon 5"], "album": "V", "image": "https://img.youtube.com/vi/09R8_2nJtjg/hqdefault.jpg", "youtube_id": "09R8_2nJtjg", "duration": 235000, "source": "youtube"},
-            {"id": "youtube_YQHsXMglC9A", "name": "Hello", "artists": ["Adele"], "album": "25", "image": "https://img.youtube.com/vi/YQHsXMglC9A/hqdefault.jpg", "youtube_id": "YQHsXMglC9A", "duration": 295000, "source": "youtube"},
-            {"id": "youtube_My2FRPA3Gf8", "name": "Wrecking Ball", "artists": ["Miley Cyrus"], "album": "Bangerz", "image": "https://img.youtube.com/vi/My2FRPA3Gf8/hqdefault.jpg", "youtube_id": "My2FRPA3Gf8", "duration": 221000, "source": "youtube"},
-            {"id": "youtube_dQw4w9WgXcQ", "name": "Never Gonna Give You Up", "artists": ["Rick Astley"], "album": "Whenever You Need Somebody", "image": "https://img.youtube.com/vi/dQw4w9WgXcQ/hqdefault.jpg", "youtube_id": "dQw4w9WgXcQ", "duration": 213000, "source": "youtube"},
-            {"id": "youtube_nfWlot6h_JM", "name": "Shake It Off", "artists": ["Taylor Swift"], "album": "1989", "image": "https://img.youtube.com/vi/nfWlot6h_JM/hqdefault.jpg", "youtube_id": "nfWlot6h_JM", "duration": 219000, "source": "youtube"},
-            {"id": "youtube_CevxZvSJLk8", "name": "Roar", "artists": ["Katy Perry"], "album": "Prism", "image": "https://img.youtube.com/vi/CevxZvSJLk8/hqdefault.jpg", "youtube_id": "CevxZvSJLk8", "duration": 223000, "source": "youtube"},
-            {"id": "youtube_QYh6mYIJG2Y", "name": "7 rings", "artists": ["Ariana Grande"], "album": "thank u, next", "image": "https://img.youtube.com/vi/QYh6mYIJG2Y/hqdefault.jpg", "youtube_id": "QYh6mYIJG2Y", "duration": 178000, "source": "youtube"},
-            {"id": "youtube_hT_nvWreIhg", "name": "Counting Stars", "artists": ["OneRepublic"], "album": "Native", "image": "https://img.youtube.com/vi/hT_nvWreIhg/hqdefault.jpg", "youtube_id": "hT_nvWreIhg", "duration": 257000, "source": "youtube"},
-            {"id": "youtube_9bZkp7q19f0", "name": "Gangnam Style", "artists": ["PSY"], "album": "PSY 6 (Six Rules), Part 1", "image": "https://img.youtube.com/vi/9bZkp7q19f0/hqdefault.jpg", "youtube_id": "9bZkp7q19f0", "duration": 253000, "source": "youtube"},
-            {"id": "youtube_kJQP7kiw5Fk", "name": "Despacito", "artists": ["Luis Fonsi", "Daddy Yankee"], "album": "Vida", "image": "https://img.youtube.com/vi/kJQP7kiw5Fk/hqdefault.jpg", "youtube_id": "kJQP7kiw5Fk", "duration": 281000, "source": "youtube"},
-            {"id": "youtube_jfKfPfyJRdk", "name": "Lofi Hip Hop Radio", "artists": ["ChilledCow"], "album": "Lofi Collection", "image": "https://img.youtube.com/vi/jfKfPfyJRdk/hqdefault.jpg", "youtube_id": "jfKfPfyJRdk", "duration": 3600000, "source": "youtube"},
-            {"id": "youtube_UfcAVejslrU", "name": "Weightless", "artists": ["Marconi Union"], "album": "Ambient Works", "image": "https://img.youtube.com/vi/UfcAVejslrU/hqdefault.jpg", "youtube_id": "UfcAVejslrU", "duration": 485000, "source": "youtube"},
-            {"id": "youtube_7maJOI3QMu0", "name": "River Flows in You", "artists": ["Yiruma"], "album": "First Love", "image": "https://img.youtube.com/vi/7maJOI3QMu0/hqdefault.jpg", "youtube_id": "7maJOI3QMu0", "duration": 180000, "source": "youtube"},
-            {"id": "youtube_RBumgq5yVrA", "name": "Let Her Go", "artists": ["Passenger"], "album": "All the Little Lights", "image": "https://img.youtube.com/vi/RBumgq5yVrA/hqdefault.jpg", "youtube_id": "RBumgq5yVrA", "duration": 252000, "source": "youtube"},
-            {"id": "youtube_4xDzrJKXOOY", "name": "Synthwave Programming Mix", "artists": ["The Midnight"], "album": "Coding Beats", "image": "https://img.youtube.com/vi/4xDzrJKXOOY/hqdefault.jpg", "youtube_id": "4xDzrJKXOOY", "duration": 3600000, "source": "youtube"}
-        ]
-        
-        logger.info(f"Returning {len(fallback_tracks)} fallback shuffle tracks")
-        
-        return jsonify({
-            "tracks": fallback_tracks,
-            "total": len(fallback_tracks)
-        })
-        
-    except Exception as e:
-        logger.error(f"Fallback shuffle playlist error: {e}")
-        return jsonify({"error": "Failed to generate shuffle playlist"}), 500
+    """Curated shuffle playlist payload"""
+    # Curated diverse shuffle playlist
+    fallback_tracks = [
+        {"id": "youtube_G7KNmW9a75Y", "name": "Flowers", "artists": ["Miley Cyrus"], "album": "Endless Summer Vacation", "image": "https://img.youtube.com/vi/G7KNmW9a75Y/hqdefault.jpg", "youtube_id": "G7KNmW9a75Y", "duration": 200000, "source": "youtube"},
+        {"id": "youtube_b1kbLWvqugk", "name": "Anti-Hero", "artists": ["Taylor Swift"], "album": "Midnights", "image": "https://img.youtube.com/vi/b1kbLWvqugk/hqdefault.jpg", "youtube_id": "b1kbLWvqugk", "duration": 201000, "source": "youtube"},
+        {"id": "youtube_H5v3kku4y6Q", "name": "As It Was", "artists": ["Harry Styles"], "album": "Harry's House", "image": "https://img.youtube.com/vi/H5v3kku4y6Q/hqdefault.jpg", "youtube_id": "H5v3kku4y6Q", "duration": 167000, "source": "youtube"},
+        {"id": "youtube_4NRXx6U8ABQ", "name": "Blinding Lights", "artists": ["The Weeknd"], "album": "After Hours", "image": "https://img.youtube.com/vi/4NRXx6U8ABQ/hqdefault.jpg", "youtube_id": "4NRXx6U8ABQ", "duration": 200000, "source": "youtube"},
+        {"id": "youtube_JGwWNGJdvx8", "name": "Shape of You", "artists": ["Ed Sheeran"], "album": "÷ (Divide)", "image": "https://img.youtube.com/vi/JGwWNGJdvx8/hqdefault.jpg", "youtube_id": "JGwWNGJdvx8", "duration": 233000, "source": "youtube"},
+        {"id": "youtube_DyDfgMOUjCI", "name": "Bad Guy", "artists": ["Billie Eilish"], "album": "When We All Fall Asleep, Where Do We Go?", "image": "https://img.youtube.com/vi/DyDfgMOUjCI/hqdefault.jpg", "youtube_id": "DyDfgMOUjCI", "duration": 194000, "source": "youtube"},
+        {"id": "youtube_fJ9rUzIMcZQ", "name": "Bohemian Rhapsody", "artists": ["Queen"], "album": "A Night at the Opera", "image": "https://img.youtube.com/vi/fJ9rUzIMcZQ/hqdefault.jpg", "youtube_id": "fJ9rUzIMcZQ", "duration": 355000, "source": "youtube"},
+        {"id": "youtube_hTWKbfoikeg", "name": "Smells Like Teen Spirit", "artists": ["Nirvana"], "album": "Nevermind", "image": "https://img.youtube.com/vi/hTWKbfoikeg/hqdefault.jpg", "youtube_id": "hTWKbfoikeg", "duration": 301000, "source": "youtube"},
+        {"id": "youtube_OPf0YbXqDm0", "name": "Uptown Funk", "artists": ["Mark Ronson", "Bruno Mars"], "album": "Uptown Special", "image": "https://img.youtube.com/vi/OPf0YbXqDm0/hqdefault.jpg", "youtube_id": "OPf0YbXqDm0", "duration": 270000, "source": "youtube"},
+        {"id": "youtube_09R8_2nJtjg", "name": "Sugar", "artists": ["Maroon 5"], "album": "V", "image": "https://img.youtube.com/vi/09R8_2nJtjg/hqdefault.jpg", "youtube_id": "09R8_2nJtjg", "duration": 235000, "source": "youtube"},
+        {"id": "youtube_YQHsXMglC9A", "name": "Hello", "artists": ["Adele"], "album": "25", "image": "https://img.youtube.com/vi/YQHsXMglC9A/hqdefault.jpg", "youtube_id": "YQHsXMglC9A", "duration": 295000, "source": "youtube"},
+        {"id": "youtube_My2FRPA3Gf8", "name": "Wrecking Ball", "artists": ["Miley Cyrus"], "album": "Bangerz", "image": "https://img.youtube.com/vi/My2FRPA3Gf8/hqdefault.jpg", "youtube_id": "My2FRPA3Gf8", "duration": 221000, "source": "youtube"},
+        {"id": "youtube_dQw4w9WgXcQ", "name": "Never Gonna Give You Up", "artists": ["Rick Astley"], "album": "Whenever You Need Somebody", "image": "https://img.youtube.com/vi/dQw4w9WgXcQ/hqdefault.jpg", "youtube_id": "dQw4w9WgXcQ", "duration": 213000, "source": "youtube"},
+        {"id": "youtube_nfWlot6h_JM", "name": "Shake It Off", "artists": ["Taylor Swift"], "album": "1989", "image": "https://img.youtube.com/vi/nfWlot6h_JM/hqdefault.jpg", "youtube_id": "nfWlot6h_JM", "duration": 219000, "source": "youtube"},
+        {"id": "youtube_CevxZvSJLk8", "name": "Roar", "artists": ["Katy Perry"], "album": "Prism", "image": "https://img.youtube.com/vi/CevxZvSJLk8/hqdefault.jpg", "youtube_id": "CevxZvSJLk8", "duration": 223000, "source": "youtube"},
+        {"id": "youtube_QYh6mYIJG2Y", "name": "7 rings", "artists": ["Ariana Grande"], "album": "thank u, next", "image": "https://img.youtube.com/vi/QYh6mYIJG2Y/hqdefault.jpg", "youtube_id": "QYh6mYIJG2Y", "duration": 178000, "source": "youtube"},
+        {"id": "youtube_hT_nvWreIhg", "name": "Counting Stars", "artists": ["OneRepublic"], "album": "Native", "image": "https://img.youtube.com/vi/hT_nvWreIhg/hqdefault.jpg", "youtube_id": "hT_nvWreIhg", "duration": 257000, "source": "youtube"},
+        {"id": "youtube_9bZkp7q19f0", "name": "Gangnam Style", "artists": ["PSY"], "album": "PSY 6 (Six Rules), Part 1", "image": "https://img.youtube.com/vi/9bZkp7q19f0/hqdefault.jpg", "youtube_id": "9bZkp7q19f0", "duration": 253000, "source": "youtube"},
+        {"id": "youtube_kJQP7kiw5Fk", "name": "Despacito", "artists": ["Luis Fonsi", "Daddy Yankee"], "album": "Vida", "image": "https://img.youtube.com/vi/kJQP7kiw5Fk/hqdefault.jpg", "youtube_id": "kJQP7kiw5Fk", "duration": 281000, "source": "youtube"},
+        {"id": "youtube_jfKfPfyJRdk", "name": "Lofi Hip Hop Radio", "artists": ["ChilledCow"], "album": "Lofi Collection", "image": "https://img.youtube.com/vi/jfKfPfyJRdk/hqdefault.jpg", "youtube_id": "jfKfPfyJRdk", "duration": 3600000, "source": "youtube"},
+        {"id": "youtube_UfcAVejslrU", "name": "Weightless", "artists": ["Marconi Union"], "album": "Ambient Works", "image": "https://img.youtube.com/vi/UfcAVejslrU/hqdefault.jpg", "youtube_id": "UfcAVejslrU", "duration": 485000, "source": "youtube"},
+        {"id": "youtube_7maJOI3QMu0", "name": "River Flows in You", "artists": ["Yiruma"], "album": "First Love", "image": "https://img.youtube.com/vi/7maJOI3QMu0/hqdefault.jpg", "youtube_id": "7maJOI3QMu0", "duration": 180000, "source": "youtube"},
+        {"id": "youtube_RBumgq5yVrA", "name": "Let Her Go", "artists": ["Passenger"], "album": "All the Little Lights", "image": "https://img.youtube.com/vi/RBumgq5yVrA/hqdefault.jpg", "youtube_id": "RBumgq5yVrA", "duration": 252000, "source": "youtube"},
+        {"id": "youtube_4xDzrJKXOOY", "name": "Synthwave Programming Mix", "artists": ["The Midnight"], "album": "Coding Beats", "image": "https://img.youtube.com/vi/4xDzrJKXOOY/hqdefault.jpg", "youtube_id": "4xDzrJKXOOY", "duration": 3600000, "source": "youtube"}
+    ]
+    
+    return {
+        "tracks": fallback_tracks,
+        "total": len(fallback_tracks)
+    }
 
 def get_fallback_recommendations():
-    """Fallback recommendations"""
-    try:
-        logger.info("Using fallback recommendations")
-        
-        # Mix of popular tracks from different categories
-        all_tracks = [
-            {"id": "youtube_dQw4w9WgXcQ", "name": "Never Gonna Give You Up", "artists": ["Rick Astley"], "album": "Whenever You Need Somebody", "image": "https://img.youtube.com/vi/dQw4w9WgXcQ/hqdefault.jpg", "youtube_id": "dQw4w9WgXcQ", "duration": 213000, "source": "youtube"},
-            {"id": "youtube_9bZkp7q19f0", "name": "Gangnam Style", "artists": ["PSY"], "album": "PSY 6 (Six Rules), Part 1", "image": "https://img.youtube.com/vi/9bZkp7q19f0/hqdefault.jpg", "youtube_id": "9bZkp7q19f0", "duration": 253000, "source": "youtube"},
-            {"id": "youtube_kJQP7kiw5Fk", "name": "Despacito", "artists": ["Luis Fonsi", "Daddy Yankee"], "album": "Vida", "image": "https://img.youtube.com/vi/kJQP7kiw5Fk/hqdefault.jpg", "youtube_id": "kJQP7kiw5Fk", "duration": 281000, "source": "youtube"},
-            {"id": "youtube_Pkh8UtuejGw", "name": "Senorita", "artists": ["Shawn Mendes", "Camila Cabello"], "album": "Senorita", "image": "https://img.youtube.com/vi/Pkh8UtuejGw/hqdefault.jpg", "youtube_id": "Pkh8UtuejGw", "duration": 191000, "source": "youtube"},
-            {"id": "youtube_jfKfPfyJRdk", "name": "Lofi Hip Hop Radio", "artists": ["ChilledCow"], "album": "Lofi Collection", "image": "https://img.youtube.com/vi/jfKfPfyJRdk/hqdefault.jpg", "youtube_id": "jfKfPfyJRdk", "duration": 3600000, "source": "youtube"},
-            {"id": "youtube_UfcAVejslrU", "name": "Weightless", "artists": ["Marconi Union"], "album": "Ambient Works", "image": "https://img.youtube.com/vi/UfcAVejslrU/hqdefault.jpg", "youtube_id": "UfcAVejslrU", "duration": 485000, "source": "youtube"}
-        ]
-        
-        # Add tracks from MUSIC_DATABASE
-        for category in MUSIC_DATABASE.values():
-            all_tracks.extend(category)
-        
-        # Return first 25 unique tracks
-        seen_ids = set()
-        fallback_tracks = []
-        for track in all_tracks:
-            if track['id'] not in seen_ids and len(fallback_tracks) < 25:
-                seen_ids.add(track['id'])
-                fallback_tracks.append(track)
-        
-        logger.info(f"Returning {len(fallback_tracks)} fallback recommendations")
-        return jsonify({"tracks": fallback_tracks})
-        
-    except Exception as e:
-        logger.error(f"Fallback recommendations error: {e}")
-        return jsonify({"error": "Failed to get recommendations"}), 500
+    """Curated recommendations payload"""
+    # Mix of popular tracks from different categories
+    all_tracks = [
+        {"id": "youtube_dQw4w9WgXcQ", "name": "Never Gonna Give You Up", "artists": ["Rick Astley"], "album": "Whenever You Need Somebody", "image": "https://img.youtube.com/vi/dQw4w9WgXcQ/hqdefault.jpg", "youtube_id": "dQw4w9WgXcQ", "duration": 213000, "source": "youtube"},
+        {"id": "youtube_9bZkp7q19f0", "name": "Gangnam Style", "artists": ["PSY"], "album": "PSY 6 (Six Rules), Part 1", "image": "https://img.youtube.com/vi/9bZkp7q19f0/hqdefault.jpg", "youtube_id": "9bZkp7q19f0", "duration": 253000, "source": "youtube"},
+        {"id": "youtube_kJQP7kiw5Fk", "name": "Despacito", "artists": ["Luis Fonsi", "Daddy Yankee"], "album": "Vida", "image": "https://img.youtube.com/vi/kJQP7kiw5Fk/hqdefault.jpg", "youtube_id": "kJQP7kiw5Fk", "duration": 281000, "source": "youtube"},
+        {"id": "youtube_Pkh8UtuejGw", "name": "Senorita", "artists": ["Shawn Mendes", "Camila Cabello"], "album": "Senorita", "image": "https://img.youtube.com/vi/Pkh8UtuejGw/hqdefault.jpg", "youtube_id": "Pkh8UtuejGw", "duration": 191000, "source": "youtube"},
+        {"id": "youtube_jfKfPfyJRdk", "name": "Lofi Hip Hop Radio", "artists": ["ChilledCow"], "album": "Lofi Collection", "image": "https://img.youtube.com/vi/jfKfPfyJRdk/hqdefault.jpg", "youtube_id": "jfKfPfyJRdk", "duration": 3600000, "source": "youtube"},
+        {"id": "youtube_UfcAVejslrU", "name": "Weightless", "artists": ["Marconi Union"], "album": "Ambient Works", "image": "https://img.youtube.com/vi/UfcAVejslrU/hqdefault.jpg", "youtube_id": "UfcAVejslrU", "duration": 485000, "source": "youtube"}
+    ]
+    
+    # Add tracks from MUSIC_DATABASE
+    for category in MUSIC_DATABASE.values():
+        all_tracks.extend(category)
+    
+    # First 25 unique tracks (MUSIC_DATABASE entries carry no "id", only youtube_id)
+    seen_ids = set()
+    fallback_tracks = []
+    for track in all_tracks:
+        track_id = track.get('youtube_id') or track['id']
+        if track_id not in seen_ids and len(fallback_tracks) < 25:
+            seen_ids.add(track_id)
+            fallback_tracks.append(track)
+    
+    return {"tracks": fallback_tracks}
 
 # Flask App
 app = Flask(__name__)
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
 CORS(app, origins=["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:5001", "http://127.0.0.1:5001"], 
      allow_headers=["Content-Type", "Authorization"], 
      methods=["GET", "POST", "OPTIONS"])  # Enable CORS for all routes
 
+# ========================
+# CATALOG RESPONSES
+# ========================
+# Trending, shuffle and recommendations are fixed curated lists, so each one is
+# serialized, gzipped and tagged once rather than rebuilt on every request
+CATALOG_RESPONSES = {}
+
+def reload_catalog():
+    """Rebuild the precomputed catalog responses; call after changing the curated lists"""
+    global CATALOG_RESPONSES
+    payloads = {
+        "trending": {"tracks": get_trending_music()},
+        "shuffle": get_fallback_shuffle_playlist(),
+        "recommendations": get_fallback_recommendations(),
+    }
+    CATALOG_RESPONSES = {name: PrecomputedResponse(f"{app.json.dumps(payload)}\n")
+                         for name, payload in payloads.items()}
+    logger.info(f"Catalog built: {', '.join(f'{n}={len(r.body)}B' for n, r in CATALOG_RESPONSES.items())}")
+    return CATALOG_RESPONSES
+
+reload_catalog()
+
 @app.route("/search_music", methods=["POST", "OPTIONS"])
 def search_music():
     if request.method == "OPTIONS":
@@ -482,6 +468,7 @@ def search_music():
             return jsonify({"error": "Query is required"}), 400
         
         logger.info(f"Searching YouTube Music for: {query}")
+        SUGGESTIONS.record_query(query)
         
         # Search YouTube Music
         results = search_youtube_music(query, limit=5)
@@ -497,13 +484,7 @@ def search_music():
 
 @app.route("/trending_music", methods=["GET"])
 def trending_music():
-    try:
-        logger.info("Fetching trending music")
-        results = get_trending_music()
-        return jsonify({"tracks": results})
-    except Exception as e:
-        logger.error(f"Trending music error: {e}")
-        return jsonify({"error": "Failed to fetch trending music"}), 500
+    return CATALOG_RESPONSES["trending"].respond(request)
 
 @app.route("/suggestions", methods=["GET"])
 def get_suggestions():
@@ -511,18 +492,7 @@ def get_suggestions():
         query = request.args.get("q", "").strip()
         if not query:
             return jsonify([])
-        
-        # YouTube Google Suggest API
-        url = f"http://suggestqueries.google.com/complete/search?client=youtube&ds=yt&client=firefox&q={quote_plus(query)}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=5, verify=False)
-        if response.status_code == 200:
-            suggestions = json.loads(response.text)[1]
-            return jsonify(suggestions)
-        return jsonify([])
+        return jsonify(SUGGESTIONS.suggest(query))
     except Exception as e:
         logger.error(f"Suggestions error: {e}")
         return jsonify([])
@@ -534,6 +504,7 @@ def search_tracks():
         if not query:
             logger.error("No query parameter provided")
             return jsonify({"error": "Query parameter 'q' is required"}), 400
+        SUGGESTIONS.record_query(query)
         
         # Search YouTube Music
         results = search_youtube_music(query, limit=5)
@@ -545,6 +516,117 @@ def search_tracks():
         logger.error(f"Music search error: {e}")
         return jsonify({"error": "Failed to search music"}), 500
 
+def search_event(event, payload, sse):
+    """One streamed search event: an NDJSON line, or an SSE frame carrying the same JSON"""
+    body = json.dumps(dict(payload, event=event))
+    if sse:
+        return f"event: {event}\ndata: {body}\n\n"
+    return f"{body}\n"
+
+def stream_search_events(query, limit, sse):
+    """Yield "track" events, then a closing "done" event with the ranked order.
+
+    A stream that finds the query cold leads the search: it sends each
+    candidate as soon as it is parsed from the page, then ranks them, caches
+    the result and hands it to identical /search and /search/stream requests
+    that arrived meanwhile. Cached hits and those followers replay the ranked
+    tracks. Either way "done" carries the ranked youtube_id order.
+    """
+    key = search_key(query, limit)
+    try:
+        results, cached = SEARCH_CACHE.get_or_refresh(key, lambda: load_search(query, limit), cache_if=bool)
+        if not cached:
+            call, leader = SEARCH_FLIGHTS.join(key)
+            if leader:
+                results = yield from stream_search_candidates(query, limit, key, call, sse)
+            else:
+                results = SEARCH_FLIGHTS.wait(call)
+                for track in results:
+                    yield search_event("track", {"track": track}, sse)
+        else:
+            for track in results:
+                yield search_event("track", {"track": track}, sse)
+        yield search_event("done", {
+            "order": [track["youtube_id"] for track in results],
+            "total": len(results),
+            "cached": cached,
+        }, sse)
+    except Exception as e:
+        logger.error(f"Streaming search failed for {query!r}: {e}")
+        yield search_event("error", {"error": "Failed to search music"}, sse)
+
+def stream_search_candidates(query, limit, key, call, sse):
+    """Leader side of a cold stream: yield candidates as parsed, then rank, cache and publish; returns the ranked tracks"""
+    results, sent, hung_up = [], set(), False
+    try:
+        content = fetch_youtube_search_page(query)
+        if content is None:
+            logger.error("All search methods failed")
+            return results
+        candidates = []
+        tracks = iter_youtube_tracks(query, content, max(limit, SEARCH_CANDIDATES))
+        for track in tracks:
+            candidates.append(track)
+            sent.add(track["youtube_id"])
+            try:
+                yield search_event("track", {"track": track}, sse)
+            except GeneratorExit:
+                hung_up = True  # finish anyway: other requests are waiting on this search
+                break
+        candidates.extend(tracks)
+        results = rank_youtube_tracks(query, content, candidates, limit)
+        if results:
+            SEARCH_CACHE.set(key, results)
+    finally:
+        # On an error the waiting requests get no results, as scrape_youtube_music would give them
+        SEARCH_FLIGHTS.complete(key, call, results)
+    if hung_up:
+        return results
+    # Fallback results weren't parsed as candidates; send them before "done"
+    for track in results:
+        if track["youtube_id"] not in sent:
+            yield search_event("track", {"track": track}, sse)
+    return results
+
+@app.route("/search/stream", methods=["GET"])
+def search_stream():
+    """Streamed /search: NDJSON by default, SSE with ?format=sse or Accept: text/event-stream"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 5)), SEARCH_CANDIDATES))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    sse = request.args.get("format") == "sse" or "text/event-stream" in request.headers.get("Accept", "")
+    SUGGESTIONS.record_query(query)
+    
+    response = Response(stream_search_events(query, limit, sse),
+                        mimetype='text/event-stream' if sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route("/search/federated", methods=["GET"])
+def search_federated():
+    """Search every available backend at once; merged, deduped by youtube_id, ranked"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 5)), SEARCH_CANDIDATES))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    SUGGESTIONS.record_query(query)
+    
+    try:
+        result = FEDERATED.search(query, limit)
+        logger.info(f"Federated search for {query!r}: {len(result['tracks'])} tracks in {result['elapsed_ms']}ms {result['backends']}")
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Federated search error: {e}")
+        return jsonify({"error": "Failed to search music"}), 500
+
 @app.route("/get_related_songs", methods=["POST", "OPTIONS"])
 def get_related_songs():
     if request.method == "OPTIONS":
@@ -576,29 +658,19 @@ def get_related_songs():
         logger.error(f"Related songs error: {e}")
         return jsonify({"error": "Failed to fetch related songs"}), 500
 
-@app.route("/get_shuffle_songs", methods=["POST", "OPTIONS"])
+@app.route("/get_shuffle_songs", methods=["GET", "POST", "OPTIONS"])
 def get_shuffle_songs():
     if request.method == "OPTIONS":
         return "", 200
-    try:
-        # Fallback to curated shuffle playlist (AI removed)
-        return get_fallback_shuffle_playlist()
-        
-    except Exception as e:
-        logger.error(f"Shuffle songs error: {e}")
-        return jsonify({"error": "Failed to generate shuffle songs"}), 500
+    # Curated shuffle playlist (AI removed)
+    return CATALOG_RESPONSES["shuffle"].respond(request)
 
-@app.route("/get_ai_recommendations", methods=["POST", "OPTIONS"])
+@app.route("/get_ai_recommendations", methods=["GET", "POST", "OPTIONS"])
 def get_ai_recommendations():
     if request.method == "OPTIONS":
         return "", 200
-    try:
-        # Fallback to curated recommendations (AI removed)
-        return get_fallback_recommendations()
-        
-    except Exception as e:
-        logger.error(f"Recommendations error: {e}")
-        return jsonify({"error": "Failed to get recommendations"}), 500
+    # Curated recommendations (AI removed)
+    return CATALOG_RESPONSES["recommendations"].respond(request)
 
 @app.route("/download", methods=["POST", "OPTIONS"])
 def download_song():
@@ -610,85 +682,171 @@ def download_song():
         
         if not youtube_id:
             return jsonify({"error": "YouTube ID is required"}), 400
+        if not is_valid_youtube_id(youtube_id):
+            return jsonify({"error": "Invalid YouTube ID"}), 400
         
-        logger.info(f"Downloading MP3 for YouTube ID: {youtube_id}")
-        
-        url = f"https://www.youtube.com/watch?v={youtube_id}"
-        
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'outtmpl': 'downloads/%(title)s.%(ext)s',
-            'noplaylist': True,
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        
-        # Find the downloaded file (yt-dlp may sanitize title)
-        downloaded_files = [f for f in os.listdir('downloads') if f.endswith('.mp3') and time.time() - os.path.getmtime(os.path.join('downloads', f)) < 60]  # Recent files
-        if downloaded_files:
-            filename = downloaded_files[0]  # Assume latest
-            file_path = os.path.join('downloads', filename)
-            logger.info(f"Downloaded: {file_path}")
+        # Already downloaded: no yt-dlp call at all
+        stored = DOWNLOAD_STORE.get(youtube_id, DOWNLOAD_QUALITY)
+        if stored:
             return jsonify({
                 "success": True,
-                "file": filename,
-                "path": file_path
+                "status": "finished",
+                "cached": True,
+                "file": stored["file"],
+                "path": os.path.join('downloads', stored["file"]),
+                "title": stored["title"],
+                "size": stored["size"]
             })
-        else:
-            return jsonify({"error": "Download completed but file not found"}), 500
+        
+        # A live stream is already transcoding this track into the store
+        if DOWNLOAD_STORE.claim(youtube_id, DOWNLOAD_QUALITY, "download") != "download":
+            logger.info(f"Download for YouTube ID {youtube_id} deferred to the live stream")
+            return jsonify({
+                "success": True,
+                "status": "streaming",
+                "deduplicated": True,
+                "stream_url": f"/download/stream/{youtube_id}"
+            }), 202
+        
+        # Pinned until record_download() runs, so eviction can't race the job
+        DOWNLOAD_STORE.pin(youtube_id, DOWNLOAD_QUALITY)
+        try:
+            job, created = DOWNLOAD_JOBS.submit(youtube_id)
+        except Exception:
+            DOWNLOAD_STORE.release(youtube_id, DOWNLOAD_QUALITY, "download")
+            DOWNLOAD_STORE.unpin(youtube_id, DOWNLOAD_QUALITY)
+            raise
+        if not created:
+            DOWNLOAD_STORE.unpin(youtube_id, DOWNLOAD_QUALITY)
+            if job["status"] in ("finished", "error"):
+                # Joined a job whose hook already ran; nothing else will release this claim
+                DOWNLOAD_STORE.release(youtube_id, DOWNLOAD_QUALITY, "download")
+        logger.info(f"Download job {job['job_id']} for YouTube ID {youtube_id} ({'queued' if created else 'already in progress'})")
+        
+        return jsonify({
+            "success": True,
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "deduplicated": not created,
+            "status_url": f"/download/status/{job['job_id']}",
+            "stream_url": f"/download/stream/{youtube_id}"
+        }), 202
             
     except Exception as e:
         logger.error(f"Download error: {e}")
-        return jsonify({"error": "Failed to download song", "details": str(e)}), 500
+        return jsonify({"error": "Failed to queue download", "details": str(e)}), 500
+
+@app.route("/download/status/<job_id>", methods=["GET"])
+def download_status(job_id):
+    job = DOWNLOAD_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Download job not found"}), 404
+    return jsonify(job)
+
+@app.route("/download/stream/<youtube_id>", methods=["GET"])
+def stream_download(youtube_id):
+    """Serve MP3 bytes as they come out of the transcoder"""
+    if not is_valid_youtube_id(youtube_id):
+        return jsonify({"error": "Invalid YouTube ID"}), 400
+    
+    stored = DOWNLOAD_STORE.get(youtube_id, DOWNLOAD_QUALITY)
+    if stored:
+        return serve_download(stored["file"])
+    
+    try:
+        # Returns once the first chunk exists, so failures still get a proper status
+        chunks = AUDIO_PROXY.stream(youtube_id)
+    except TrackBusy:
+        # A download job is writing this file; it can be served once that finishes
+        job = DOWNLOAD_JOBS.find(youtube_id)
+        response = jsonify({
+            "error": "Download in progress",
+            "job_id": job["job_id"] if job else None,
+            "status_url": f"/download/status/{job['job_id']}" if job else None,
+        })
+        response.headers['Retry-After'] = '2'
+        return response, 409
+    except Exception as e:
+        logger.error(f"Stream error for {youtube_id}: {e}")
+        return jsonify({"error": "Failed to stream audio", "details": str(e)}), 502
+    
+    response = Response(chunks, mimetype='audio/mpeg')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
-@app.route('/downloads/<filename>', methods=['GET'])
+@app.route('/downloads/<filename>', methods=['GET', 'HEAD'])
 def serve_download(filename):
-    try:
-        return send_from_directory('downloads', filename)
-    except FileNotFoundError:
+    path = safe_join(DOWNLOAD_STORE.root, filename)
+    if path is None or not filename.endswith('.mp3') or not os.path.isfile(path):
         return jsonify({"error": "File not found"}), 404
+    
+    stat = os.stat(path)
+    # Store files never change in place, so name + size + mtime is a strong validator
+    etag = f"{os.path.splitext(filename)[0]}-{stat.st_size:x}-{int(stat.st_mtime):x}"
+    
+    if X_ACCEL_REDIRECT_PREFIX:
+        # nginx serves the bytes (ranges, sendfile) from an internal location
+        response = Response(mimetype='audio/mpeg')
+        response.headers['X-Accel-Redirect'] = f"{X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{filename}"
+        DOWNLOAD_STORE.touch(filename, stat.st_size)
+        return response
+    
+    # send_file handles Range/If-Range (206/416), If-None-Match/If-Modified-Since (304),
+    # and hands the file to wsgi.file_wrapper (sendfile under gunicorn) or X-Sendfile
+    response = send_file(
+        path,
+        mimetype='audio/mpeg',
+        conditional=True,
+        etag=etag,
+        last_modified=stat.st_mtime,
+        max_age=AUDIO_MAX_AGE,
+    )
+    response.headers['Accept-Ranges'] = 'bytes'
+    
+    if request.method == 'HEAD' or response.status_code not in (200, 206):
+        sent = 0
+    else:
+        sent = response.content_length or 0
+    DOWNLOAD_STORE.touch(filename, sent)
+    return response
 
 @app.route("/", methods=["GET"])
 def home():
     return "Music API is running!"
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "search_cache": SEARCH_CACHE.stats(),
+        "search_single_flight": SEARCH_FLIGHTS.stats(),
+        "suggestions": SUGGESTIONS.stats(),
+        "title_parser": title_parser.cache_stats(),
+        "federated_search": FEDERATED.stats(),
+        "download_jobs": DOWNLOAD_JOBS.stats(),
+        "download_store": DOWNLOAD_STORE.stats(),
+        "audio_proxy": AUDIO_PROXY.stats(),
+        "playlists": PLAYLIST_STORE.stats(),
+        "catalog": {name: response.stats() for name, response in CATALOG_RESPONSES.items()},
+    })
+
 # ========================
-# PLAYLIST SYSTEM - hyde.json
+# PLAYLIST SYSTEM
 # ========================
 
-PLAYLIST_FILE = "hyde.json"
-
-def load_playlists():
-    """Load playlists from hyde.json"""
-    if not os.path.exists(PLAYLIST_FILE):
-        return {}
-    try:
-        with open(PLAYLIST_FILE, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return {}
-            return json.loads(content)
-    except Exception as e:
-        logger.error(f"Error loading playlists: {e}")
-        return {}
-
-def save_playlists(playlists):
-    """Save playlists to hyde.json"""
-    try:
-        with open(PLAYLIST_FILE, 'w', encoding='utf-8') as f:
-            json.dump(playlists, f, indent=2, ensure_ascii=False)
-        logger.info("Playlists saved to hyde.json")
-    except Exception as e:
-        logger.error(f"Error saving playlists: {e}")
+# PLAYLIST_BACKEND=sqlite (default, imports hyde.json once) or json (hyde.json + journal)
+PLAYLIST_STORE = open_playlist_store()
+# Largest page /playlist/<name>?limit= will return
+PLAYLIST_PAGE_MAX = int(os.getenv("PLAYLIST_PAGE_MAX", "500"))
+# Most operations one /playlist/batch request may carry
+PLAYLIST_BATCH_MAX = int(os.getenv("PLAYLIST_BATCH_MAX", "1000"))
 
-# Initialize playlists on startup
-PLAYLISTS = load_playlists()
+def project_fields(tracks, fields):
+    """Keep only the requested comma-separated track fields (all of them if fields is empty)"""
+    if not fields:
+        return tracks
+    keep = [f.strip() for f in fields.split(",") if f.strip()]
+    return [{f: t[f] for f in keep if f in t} for t in tracks]
 
 # ========================
 # PLAYLIST ENDPOINTS
@@ -704,19 +862,11 @@ def create_playlist():
         if not name:
             return jsonify({"error": "Playlist name is required"}), 400
         
-        global PLAYLISTS
-        if name in PLAYLISTS:
+        playlist = PLAYLIST_STORE.create(name)
+        if playlist is None:
             return jsonify({"error": "Playlist already exists"}), 400
         
-        PLAYLISTS[name] = {
-            "name": name,
-            "tracks": [],
-            "created_at": time.time(),
-            "cover": "https://img.youtube.com/vi/dQw4w9WgXcQ/hqdefault.jpg"  # default rickroll :)
-        }
-        save_playlists(PLAYLISTS)
-        
-        return jsonify({"success": True, "playlist": PLAYLISTS[name]})
+        return jsonify({"success": True, "playlist": playlist})
     
     except Exception as e:
         logger.error(f"Create playlist error: {e}")
@@ -726,17 +876,7 @@ def create_playlist():
 @app.route("/playlists", methods=["GET"])
 def get_playlists():
     try:
-        global PLAYLISTS
-        playlists_list = [
-            {
-                "name": name,
-                "track_count": len(data["tracks"]),
-                "created_at": data.get("created_at"),
-                "cover": data.get("cover", f"https://img.youtube.com/vi/{data['tracks'][0]['youtube_id']}/hqdefault.jpg" if data["tracks"] else None)
-            }
-            for name, data in PLAYLISTS.items()
-        ]
-        return jsonify({"playlists": playlists_list})
+        return jsonify({"playlists": PLAYLIST_STORE.list()})
     
     except Exception as e:
         logger.error(f"Get playlists error: {e}")
@@ -745,27 +885,39 @@ def get_playlists():
 
 @app.route("/playlist/<playlist_name>", methods=["GET"])
 def get_playlist(playlist_name):
+    """Playlist tracks; ?limit=&offset= or ?limit=&after=<youtube_id> pages, ?fields=a,b trims tracks"""
     try:
-        global PLAYLISTS
         decoded_name = urllib.parse.unquote(playlist_name)
         
-        if decoded_name not in PLAYLISTS:
+        try:
+            limit = request.args.get("limit", type=int)
+            offset = request.args.get("offset", 0, type=int)
+            if limit is not None:
+                limit = max(1, min(limit, PLAYLIST_PAGE_MAX))
+            page = PLAYLIST_STORE.get_page(decoded_name, offset=offset, limit=limit,
+                                           after=request.args.get("after"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if page is None:
             return jsonify({"error": "Playlist not found"}), 404
         
-        playlist = PLAYLISTS[decoded_name]
-        tracks = playlist["tracks"]
-        
-        # Update cover if playlist has tracks
-        if tracks and "cover" not in playlist:
-            playlist["cover"] = f"https://img.youtube.com/vi/{tracks[0]['youtube_id']}/hqdefault.jpg"
-            save_playlists(PLAYLISTS)
-        
-        return jsonify({
+        tracks = project_fields(page["tracks"], request.args.get("fields"))
+        result = {
             "name": decoded_name,
             "tracks": tracks,
-            "total": len(tracks),
-            "cover": playlist.get("cover")
-        })
+            "total": page["total"],
+            "cover": page["cover"]
+        }
+        if limit is not None:
+            next_offset = page["offset"] + len(tracks)
+            has_more = next_offset < page["total"]
+            result.update({
+                "offset": page["offset"],
+                "limit": limit,
+                "next_offset": next_offset if has_more else None,
+                "next_cursor": page["tracks"][-1]["youtube_id"] if has_more and tracks else None,
+            })
+        return jsonify(result)
     
     except Exception as e:
         logger.error(f"Get playlist error: {e}")
@@ -784,20 +936,12 @@ def add_to_playlist():
         if not playlist_name or not track:
             return jsonify({"error": "playlist_name and track are required"}), 400
         
-        global PLAYLISTS
-        if playlist_name not in PLAYLISTS:
+        # Duplicates are ignored by the store
+        playlist, added = PLAYLIST_STORE.add_track(playlist_name, track)
+        if playlist is None:
             return jsonify({"error": "Playlist not found"}), 404
         
-        # Avoid duplicates
-        existing_ids = {t["youtube_id"] for t in PLAYLISTS[playlist_name]["tracks"]}
-        if track["youtube_id"] not in existing_ids:
-            PLAYLISTS[playlist_name]["tracks"].append(track)
-            # Update cover if first song
-            if len(PLAYLISTS[playlist_name]["tracks"]) == 1:
-                PLAYLISTS[playlist_name]["cover"] = track["image"]
-            save_playlists(PLAYLISTS)
-        
-        return jsonify({"success": True, "playlist": PLAYLISTS[playlist_name]})
+        return jsonify({"success": True, "playlist": playlist})
     
     except Exception as e:
         logger.error(f"Add to playlist error: {e}")
@@ -816,23 +960,11 @@ def remove_from_playlist():
         if not playlist_name or not youtube_id:
             return jsonify({"error": "playlist_name and youtube_id are required"}), 400
         
-        global PLAYLISTS
-        if playlist_name not in PLAYLISTS:
+        removed = PLAYLIST_STORE.remove_track(playlist_name, youtube_id)
+        if removed is None:
             return jsonify({"error": "Playlist not found"}), 404
         
-        original_count = len(PLAYLISTS[playlist_name]["tracks"])
-        PLAYLISTS[playlist_name]["tracks"] = [
-            t for t in PLAYLISTS[playlist_name]["tracks"] 
-            if t["youtube_id"] != youtube_id
-        ]
-        
-        if len(PLAYLISTS[playlist_name]["tracks"]) < original_count:
-            # Update cover if needed
-            if PLAYLISTS[playlist_name]["tracks"]:
-                PLAYLISTS[playlist_name]["cover"] = PLAYLISTS[playlist_name]["tracks"][0]["image"]
-            else:
-                PLAYLISTS[playlist_name]["cover"] = None
-            save_playlists(PLAYLISTS)
+        if removed:
             return jsonify({"success": True, "removed": True})
         else:
             return jsonify({"success": True, "removed": False, "message": "Track not in playlist"})
@@ -842,18 +974,42 @@ def remove_from_playlist():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/playlist/batch", methods=["POST", "OPTIONS"])
+def batch_playlist():
+    """Apply an ordered list of add/remove/move operations atomically"""
+    if request.method == "OPTIONS":
+        return "", 200
+    try:
+        data = request.get_json()
+        operations = data.get("operations")
+        
+        if not isinstance(operations, list) or not operations:
+            return jsonify({"error": "operations must be a non-empty list"}), 400
+        if len(operations) > PLAYLIST_BATCH_MAX:
+            return jsonify({"error": f"At most {PLAYLIST_BATCH_MAX} operations per batch"}), 400
+        
+        try:
+            results = PLAYLIST_STORE.apply_batch(operations)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+        
+        return jsonify({"success": True, "results": results})
+    
+    except Exception as e:
+        logger.error(f"Playlist batch error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/playlist/<playlist_name>", methods=["DELETE"])
 def delete_playlist(playlist_name):
     try:
-        global PLAYLISTS
         decoded_name = urllib.parse.unquote(playlist_name)
         
-        if decoded_name not in PLAYLISTS:
+        if not PLAYLIST_STORE.delete(decoded_name):
             return jsonify({"error": "Playlist not found"}), 404
         
-        del PLAYLISTS[decoded_name]
-        save_playlists(PLAYLISTS)
-        
         return jsonify({"success": True, "message": "Playlist deleted"})
     
     except Exception as e:
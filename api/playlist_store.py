@@ -0,0 +1,832 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from track_list import TrackList, MIN_KEY_GAP
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_BACKEND = os.getenv("PLAYLIST_BACKEND", "sqlite")
+PLAYLIST_FILE = os.getenv("PLAYLIST_FILE", "hyde.json")
+PLAYLIST_DB = os.getenv("PLAYLIST_DB", "playlists.db")
+# JSON backend: journal writes wait for this much quiet (seconds), but never longer than the max delay
+FLUSH_DEBOUNCE = float(os.getenv("PLAYLIST_FLUSH_DEBOUNCE", "0.05"))
+FLUSH_MAX_DELAY = float(os.getenv("PLAYLIST_FLUSH_MAX_DELAY", "0.5"))
+# ...and the journal is folded into hyde.json once it passes this size
+JOURNAL_COMPACT_BYTES = int(os.getenv("PLAYLIST_JOURNAL_COMPACT_BYTES", str(1024 * 1024)))
+# Playlist names hash onto this many locks (JSON backend)
+LOCK_STRIPES = int(os.getenv("PLAYLIST_LOCK_STRIPES", "64"))
+
+DEFAULT_COVER = "https://img.youtube.com/vi/dQw4w9WgXcQ/hqdefault.jpg"  # default rickroll :)
+
+
+def thumbnail_for(youtube_id):
+    return f"https://img.youtube.com/vi/{youtube_id}/hqdefault.jpg"
+
+
+def new_playlist(name):
+    return {
+        "name": name,
+        "tracks": [],
+        "created_at": time.time(),
+        "cover": DEFAULT_COVER,
+    }
+
+
+# ========================
+# JSON BACKEND - hyde.json + journal
+# ========================
+
+def load_playlists(path=PLAYLIST_FILE):
+    """Load playlists from hyde.json"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+            if not content:
+                return {}
+            return json.loads(content)
+    except Exception as e:
+        logger.error(f"Error loading playlists: {e}")
+        return {}
+
+
+def write_atomic(path, text):
+    """Replace a file's contents via temp file + fsync + rename"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_playlists(playlists, path=PLAYLIST_FILE):
+    """Save playlists to hyde.json"""
+    write_atomic(path, json.dumps(playlists, indent=2, ensure_ascii=False))
+    logger.info(f"Playlists saved to {path}")
+
+
+def apply_mutation(playlists, record):
+    """Apply one journal record to the playlists dict; returns (result, changed).
+
+    Every op is safe to re-apply, so replaying records that a snapshot already
+    contains leaves the result unchanged.
+    """
+    op = record["op"]
+    if op == "batch":
+        # A /playlist/batch request: journaled as one record so it replays all-or-nothing
+        results = [apply_mutation(playlists, r) for r in record["records"]]
+        return results, any(changed for _, changed in results)
+    name = record["name"]
+    playlist = playlists.get(name)
+    if op == "create":
+        if playlist is not None:
+            return None, False
+        playlists[name] = dict(new_playlist(name), created_at=record.get("created_at"), tracks=TrackList())
+        return playlists[name], True
+    if op == "delete":
+        deleted = playlists.pop(name, None) is not None
+        return deleted, deleted
+    if op == "add":
+        if playlist is None:
+            return (None, False), False
+        track = record["track"]
+        if not playlist["tracks"].append(track):
+            return (playlist, False), False
+        # Update cover if first song
+        if len(playlist["tracks"]) == 1:
+            playlist["cover"] = track.get("image")
+        return (playlist, True), True
+    if op == "remove":
+        if playlist is None:
+            return None, False
+        if playlist["tracks"].remove(record["youtube_id"]) is None:
+            return False, False
+        playlist["cover"] = playlist["tracks"][0].get("image") if playlist["tracks"] else None
+        return True, True
+    if op == "move":
+        if playlist is None:
+            return None, False
+        tracks = playlist["tracks"]
+        current = tracks.index_of(record["youtube_id"])
+        if current is None or current == max(0, min(record["index"], len(tracks) - 1)):
+            return False, False
+        first_id = tracks[0]["youtube_id"]
+        tracks.move(record["youtube_id"], record["index"])
+        if tracks[0]["youtube_id"] != first_id:
+            playlist["cover"] = tracks[0].get("image")
+        return True, True
+    raise ValueError(f"Unknown playlist op: {op}")
+
+
+def replay_journal(playlists, journal_path):
+    """Apply every complete record in a journal file; returns the number applied"""
+    if not os.path.exists(journal_path):
+        return 0
+    applied = 0
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.endswith("\n"):
+                # Torn final write from a crash; the fsync batch it belonged to never completed
+                logger.warning(f"Ignoring partial record at {journal_path}:{line_number}")
+                break
+            try:
+                apply_mutation(playlists, json.loads(line))
+                applied += 1
+            except Exception as e:
+                logger.error(f"Skipping bad journal record at {journal_path}:{line_number}: {e}")
+    return applied
+
+
+def load_playlists_with_journal(path=PLAYLIST_FILE):
+    """hyde.json snapshot plus any journal records written since, tracks as TrackLists"""
+    playlists = load_playlists(path)
+    for playlist in playlists.values():
+        playlist["tracks"] = TrackList(playlist.get("tracks", []))
+    replay_journal(playlists, f"{path}.journal.old")
+    replay_journal(playlists, f"{path}.journal")
+    for playlist in playlists.values():
+        # Older files have playlists without a cover
+        if "cover" not in playlist:
+            playlist["cover"] = thumbnail_for(playlist["tracks"][0]["youtube_id"]) if playlist["tracks"] else None
+    return playlists
+
+
+def _copy_playlist(playlist):
+    """Shallow copy safe to serialize after the playlist lock is released"""
+    return dict(playlist, tracks=playlist["tracks"].to_list())
+
+
+def _summarize(name, playlist):
+    return {
+        "name": name,
+        "track_count": len(playlist["tracks"]),
+        "created_at": playlist.get("created_at"),
+        "cover": playlist.get("cover"),
+    }
+
+
+def _page_bounds(total, offset, limit):
+    offset = max(0, min(offset, total))
+    end = total if limit is None else min(total, offset + limit)
+    return offset, end
+
+
+BATCH_RESULT_KEYS = {"add": "added", "remove": "removed", "move": "moved"}
+
+
+def batch_record(index, operation):
+    """Validate one /playlist/batch operation and turn it into a mutation record"""
+    if not isinstance(operation, dict):
+        raise ValueError(f"operations[{index}]: expected an object")
+    op, name = operation.get("op"), operation.get("playlist_name")
+    if op not in BATCH_RESULT_KEYS:
+        raise ValueError(f"operations[{index}]: op must be add, remove or move")
+    if not name:
+        raise ValueError(f"operations[{index}]: playlist_name is required")
+    if op == "add":
+        track = operation.get("track")
+        if not isinstance(track, dict) or not track.get("youtube_id"):
+            raise ValueError(f"operations[{index}]: track with a youtube_id is required")
+        return {"op": "add", "name": name, "track": track}
+    youtube_id = operation.get("youtube_id")
+    if not youtube_id:
+        raise ValueError(f"operations[{index}]: youtube_id is required")
+    if op == "remove":
+        return {"op": "remove", "name": name, "youtube_id": youtube_id}
+    position = operation.get("index")
+    if not isinstance(position, int) or isinstance(position, bool) or position < 0:
+        raise ValueError(f"operations[{index}]: index must be a non-negative integer")
+    return {"op": "move", "name": name, "youtube_id": youtube_id, "index": position}
+
+
+def batch_result(record, changed):
+    youtube_id = record["track"]["youtube_id"] if record["op"] == "add" else record["youtube_id"]
+    return {
+        "op": record["op"],
+        "playlist_name": record["name"],
+        "youtube_id": youtube_id,
+        BATCH_RESULT_KEYS[record["op"]]: changed,
+    }
+
+
+class JsonPlaylistStore:
+    """Playlist repository over a hyde.json snapshot plus an append-only journal.
+
+    Playlist names hash onto a fixed set of ``lock_stripes`` locks, so
+    requests for different playlists rarely wait on each other and the lock
+    table never grows; create/delete also take a short registry lock. A
+    mutation only updates memory and queues a journal record. A background
+    flusher writes every queued record with one write + fsync, once mutations
+    have been quiet for ``debounce`` seconds or the oldest record has waited
+    ``max_delay`` seconds. Once the journal passes ``compact_bytes`` it is
+    folded into a new hyde.json (temp file + rename). Startup loads the
+    snapshot and replays the journal.
+    """
+
+    backend = "json"
+
+    def __init__(self, path=PLAYLIST_FILE, debounce=FLUSH_DEBOUNCE, max_delay=FLUSH_MAX_DELAY,
+                 compact_bytes=JOURNAL_COMPACT_BYTES, lock_stripes=LOCK_STRIPES):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.compact_bytes = compact_bytes
+        self._locks = [threading.Lock() for _ in range(max(lock_stripes, 1))]
+        self._registry_lock = threading.Lock()
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        self._first_queued = None
+        self._last_queued = None
+        self._flush_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._wake = threading.Event()
+        self.playlists = load_playlists_with_journal(path)
+        # /playlists summaries, replaced on every change to their playlist
+        self._summaries = {name: _summarize(name, p) for name, p in self.playlists.items()}
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self.journal_bytes = self._journal.tell()
+        self.mutations = 0
+        self.max_queue_depth = 0
+        self.flushes = 0
+        self.records_flushed = 0
+        self.last_flush_ms = None
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.compactions = 0
+        if (os.path.exists(f"{self.journal_path}.old") or self.journal_bytes >= self.compact_bytes
+                or self._journal_is_torn()):
+            self.compact()
+        threading.Thread(target=self._flush_loop, daemon=True, name="playlist-flush").start()
+        atexit.register(self.flush)
+
+    def _stripe(self, name):
+        return hash(name) % len(self._locks)
+
+    def _lock_for(self, name):
+        return self._locks[self._stripe(name)]
+
+    # -- journal --
+
+    def _journal_is_torn(self):
+        """True if the journal ends mid-record; appending after it would corrupt the next record"""
+        if not self.journal_bytes:
+            return False
+        with open(self.journal_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _apply(self, record):
+        """Apply a record in memory and queue it for the journal (caller holds the playlist lock)"""
+        name = record["name"]
+        if record["op"] in ("create", "delete"):
+            with self._registry_lock:
+                result, changed = apply_mutation(self.playlists, record)
+                if changed and record["op"] == "create":
+                    self._summaries[name] = _summarize(name, self.playlists[name])
+                elif changed:
+                    del self._summaries[name]
+        else:
+            result, changed = apply_mutation(self.playlists, record)
+            if changed:
+                self._summaries[name] = _summarize(name, self.playlists[name])
+        if changed:
+            self._enqueue(record)
+        return result
+
+    def _enqueue(self, record):
+        now = time.monotonic()
+        with self._queue_lock:
+            if not self._queue:
+                self._first_queued = now
+            self._last_queued = now
+            self._queue.append(record)
+            self.mutations += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._wake.set()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            # Debounce: wait for a quiet spell, but never past max_delay from the oldest record
+            while True:
+                with self._queue_lock:
+                    if not self._queue:
+                        break
+                    delay = min(self._last_queued + self.debounce,
+                                self._first_queued + self.max_delay) - time.monotonic()
+                if delay <= 0:
+                    break
+                time.sleep(delay)
+            try:
+                self.flush()
+                if self.journal_bytes >= self.compact_bytes:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Playlist flush failed: {e}")
+
+    def flush(self):
+        """Write and fsync every queued record in one batch"""
+        with self._flush_lock:
+            self._write_queued()
+
+    def _write_queued(self):
+        """(caller holds the flush lock)"""
+        with self._queue_lock:
+            records, self._queue = self._queue, []
+        if not records:
+            return
+        started = time.monotonic()
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        try:
+            self._journal.write(data)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        except Exception:
+            # Keep the records (in order) for the next attempt
+            with self._queue_lock:
+                self._queue[:0] = records
+            raise
+        elapsed_ms = (time.monotonic() - started) * 1000
+        self.journal_bytes += len(data.encode('utf-8'))
+        self.flushes += 1
+        self.records_flushed += len(records)
+        self.last_flush_ms = round(elapsed_ms, 2)
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.total_flush_ms += elapsed_ms
+
+    def compact(self):
+        """Fold the journal into a new hyde.json snapshot.
+
+        Queued records are flushed and the journal is rotated first; each
+        playlist is then copied under its own lock, so the snapshot holds at
+        least everything in the rotated journal. Records that land in both
+        the snapshot and the new journal are harmless because replay is
+        idempotent.
+        """
+        with self._compact_lock:
+            old_path = f"{self.journal_path}.old"
+            try:
+                with self._flush_lock:
+                    self._write_queued()
+                    self._journal.close()
+                    if not os.path.exists(old_path):
+                        os.replace(self.journal_path, old_path)
+                    else:
+                        # A previous compaction died before finishing; keep its records too
+                        with open(old_path, 'a', encoding='utf-8') as old, \
+                                open(self.journal_path, 'r', encoding='utf-8') as current:
+                            old.write(current.read())
+                        os.remove(self.journal_path)
+                    self._journal = open(self.journal_path, 'a', encoding='utf-8')
+                    self.journal_bytes = 0
+                with self._registry_lock:
+                    names = list(self.playlists)
+                snapshot = {}
+                for name in names:
+                    with self._lock_for(name):
+                        playlist = self.playlists.get(name)
+                        if playlist is not None:
+                            snapshot[name] = _copy_playlist(playlist)
+                write_atomic(self.path, json.dumps(snapshot, indent=2, ensure_ascii=False))
+                os.remove(old_path)
+                self.compactions += 1
+            except Exception as e:
+                logger.error(f"Playlist journal compaction failed: {e}")
+
+    # -- playlist operations --
+
+    def list(self):
+        """Playlist summaries (name, track_count, created_at, cover)"""
+        with self._registry_lock:
+            return list(self._summaries.values())
+
+    def get(self, name):
+        with self._lock_for(name):
+            playlist = self.playlists.get(name)
+            return _copy_playlist(playlist) if playlist is not None else None
+
+    def get_page(self, name, offset=0, limit=None, after=None):
+        """One page of a playlist's tracks, starting at ``offset`` or just after the ``after`` youtube_id.
+
+        Returns None if the playlist is missing; raises ValueError for an unknown cursor.
+        """
+        with self._lock_for(name):
+            playlist = self.playlists.get(name)
+            if playlist is None:
+                return None
+            tracks = playlist["tracks"]
+            if after is not None:
+                index = tracks.index_of(after)
+                if index is None:
+                    raise ValueError(f"Unknown cursor: {after}")
+                offset = index + 1
+            offset, end = _page_bounds(len(tracks), offset, limit)
+            return {
+                "name": name,
+                "tracks": tracks[offset:end],
+                "total": len(tracks),
+                "offset": offset,
+                "created_at": playlist.get("created_at"),
+                "cover": playlist.get("cover"),
+            }
+
+    def create(self, name):
+        """Create an empty playlist; None if the name is taken"""
+        with self._lock_for(name):
+            playlist = self._apply({"op": "create", "name": name, "created_at": time.time()})
+            return _copy_playlist(playlist) if playlist else None
+
+    def delete(self, name):
+        with self._lock_for(name):
+            return self._apply({"op": "delete", "name": name})
+
+    def add_track(self, name, track):
+        """Append a track unless it is already there; returns (playlist, added), playlist None if missing"""
+        with self._lock_for(name):
+            playlist, added = self._apply({"op": "add", "name": name, "track": track})
+            return (_copy_playlist(playlist) if playlist else None), added
+
+    def remove_track(self, name, youtube_id):
+        """Remove a track; returns None if the playlist is missing, else whether it was removed"""
+        with self._lock_for(name):
+            return self._apply({"op": "remove", "name": name, "youtube_id": youtube_id})
+
+    def apply_batch(self, operations):
+        """Apply add/remove/move operations in order, all or nothing; returns one result per operation.
+
+        Raises ValueError for a malformed operation and LookupError for a
+        missing playlist, before anything is applied. The changes go to the
+        journal as a single record, so they are flushed together.
+        """
+        records = [batch_record(i, operation) for i, operation in enumerate(operations)]
+        names = sorted({record["name"] for record in records})
+        # Each stripe once (names can share one), in a fixed order so overlapping batches can't deadlock
+        locks = [self._locks[i] for i in sorted({self._stripe(name) for name in names})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            for name in names:
+                if name not in self.playlists:
+                    raise LookupError(f"Playlist not found: {name}")
+            results, applied = [], []
+            for record in records:
+                _, changed = apply_mutation(self.playlists, record)
+                results.append(batch_result(record, changed))
+                if changed:
+                    applied.append(record)
+            for name in names:
+                self._summaries[name] = _summarize(name, self.playlists[name])
+            if applied:
+                self._enqueue({"op": "batch", "records": applied})
+            return results
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def stats(self):
+        with self._registry_lock:
+            playlists = len(self._summaries)
+            tracks = sum(summary["track_count"] for summary in self._summaries.values())
+        with self._queue_lock:
+            queue_depth = len(self._queue)
+        return {
+            "backend": self.backend,
+            "playlists": playlists,
+            "tracks": tracks,
+            "mutations": self.mutations,
+            "queue_depth": queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "flushes": self.flushes,
+            "records_flushed": self.records_flushed,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else None,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "journal_bytes": self.journal_bytes,
+            "compactions": self.compactions,
+        }
+
+
+# ========================
+# SQLITE BACKEND
+# ========================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at REAL,
+    cover TEXT,
+    track_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS playlist_tracks (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    youtube_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    track TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, youtube_id)
+);
+CREATE INDEX IF NOT EXISTS playlist_tracks_position ON playlist_tracks (playlist_id, position);
+CREATE INDEX IF NOT EXISTS playlist_tracks_youtube_id ON playlist_tracks (youtube_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqlitePlaylistStore:
+    """Playlists in SQLite (WAL): each mutation touches only its own rows.
+
+    Tracks are stored as JSON blobs keyed by (playlist, youtube_id), with an
+    explicit position so appends and removes never renumber the list. Each
+    playlist row carries its own track_count, kept in step by add/remove, so
+    summaries never count tracks.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path=PLAYLIST_DB):
+        self.path = path
+        self._local = threading.local()
+        self.writes = 0
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        """One connection per thread; WAL lets readers run alongside a writer"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self._local.db = db
+        return db
+
+    def _playlist_row(self, db, name):
+        return db.execute("SELECT id, name, created_at, cover, track_count FROM playlists WHERE name = ?",
+                          (name,)).fetchone()
+
+    def _tracks(self, db, playlist_id):
+        rows = db.execute("SELECT track FROM playlist_tracks WHERE playlist_id = ? ORDER BY position",
+                          (playlist_id,))
+        return [json.loads(row["track"]) for row in rows]
+
+    def _first_track(self, db, playlist_id):
+        row = db.execute("SELECT track FROM playlist_tracks WHERE playlist_id = ? ORDER BY position LIMIT 1",
+                         (playlist_id,)).fetchone()
+        return json.loads(row["track"]) if row else None
+
+    def list(self):
+        """Playlist summaries (name, track_count, created_at, cover)"""
+        db = self._connect()
+        rows = db.execute("SELECT name, created_at, cover, track_count FROM playlists ORDER BY id")
+        return [
+            {
+                "name": row["name"],
+                "track_count": row["track_count"],
+                "created_at": row["created_at"],
+                "cover": row["cover"],
+            }
+            for row in rows
+        ]
+
+    def get(self, name):
+        db = self._connect()
+        row = self._playlist_row(db, name)
+        if row is None:
+            return None
+        return {
+            "name": row["name"],
+            "tracks": self._tracks(db, row["id"]),
+            "created_at": row["created_at"],
+            "cover": row["cover"],
+        }
+
+    def get_page(self, name, offset=0, limit=None, after=None):
+        """One page of a playlist's tracks, starting at ``offset`` or just after the ``after`` youtube_id.
+
+        Returns None if the playlist is missing; raises ValueError for an unknown cursor.
+        """
+        db = self._connect()
+        row = self._playlist_row(db, name)
+        if row is None:
+            return None
+        if after is None:
+            offset, end = _page_bounds(row["track_count"], offset, limit)
+            rows = db.execute("SELECT track FROM playlist_tracks WHERE playlist_id = ? ORDER BY position LIMIT ? OFFSET ?",
+                              (row["id"], end - offset, offset))
+        else:
+            cursor = db.execute("SELECT position FROM playlist_tracks WHERE playlist_id = ? AND youtube_id = ?",
+                                (row["id"], after)).fetchone()
+            if cursor is None:
+                raise ValueError(f"Unknown cursor: {after}")
+            offset = db.execute("SELECT COUNT(*) FROM playlist_tracks WHERE playlist_id = ? AND position <= ?",
+                                (row["id"], cursor["position"])).fetchone()[0]
+            offset, end = _page_bounds(row["track_count"], offset, limit)
+            # Seek straight to the cursor on the position index
+            rows = db.execute("SELECT track FROM playlist_tracks WHERE playlist_id = ? AND position > ? "
+                              "ORDER BY position LIMIT ?", (row["id"], cursor["position"], end - offset))
+        return {
+            "name": row["name"],
+            "tracks": [json.loads(r["track"]) for r in rows],
+            "total": row["track_count"],
+            "offset": offset,
+            "created_at": row["created_at"],
+            "cover": row["cover"],
+        }
+
+    def create(self, name):
+        playlist = new_playlist(name)
+        try:
+            with self._connect() as db:
+                db.execute("INSERT INTO playlists (name, created_at, cover) VALUES (?, ?, ?)",
+                           (name, playlist["created_at"], playlist["cover"]))
+        except sqlite3.IntegrityError:
+            return None
+        self.writes += 1
+        return playlist
+
+    def delete(self, name):
+        with self._connect() as db:
+            deleted = db.execute("DELETE FROM playlists WHERE name = ?", (name,)).rowcount > 0
+        if deleted:
+            self.writes += 1
+        return deleted
+
+    def _add(self, db, name, track):
+        row = self._playlist_row(db, name)
+        added = db.execute("""
+            INSERT OR IGNORE INTO playlist_tracks (playlist_id, youtube_id, position, track)
+            SELECT ?, ?, COALESCE(MAX(position) + 1, 0), ? FROM playlist_tracks WHERE playlist_id = ?
+        """, (row["id"], track["youtube_id"], json.dumps(track, ensure_ascii=False), row["id"])).rowcount > 0
+        if added:
+            # Update cover if first song
+            cover = track.get("image") if row["track_count"] == 0 else row["cover"]
+            db.execute("UPDATE playlists SET track_count = track_count + 1, cover = ? WHERE id = ?",
+                       (cover, row["id"]))
+        return added
+
+    def _remove(self, db, name, youtube_id):
+        row = self._playlist_row(db, name)
+        removed = db.execute("DELETE FROM playlist_tracks WHERE playlist_id = ? AND youtube_id = ?",
+                             (row["id"], youtube_id)).rowcount > 0
+        if removed:
+            first = self._first_track(db, row["id"])
+            db.execute("UPDATE playlists SET track_count = track_count - 1, cover = ? WHERE id = ?",
+                       (first.get("image") if first else None, row["id"]))
+        return removed
+
+    def _move(self, db, name, youtube_id, index):
+        """Give the track a position between its new neighbours (midpoint, like TrackList)"""
+        row = self._playlist_row(db, name)
+        playlist_id = row["id"]
+        current = db.execute("SELECT position FROM playlist_tracks WHERE playlist_id = ? AND youtube_id = ?",
+                             (playlist_id, youtube_id)).fetchone()
+        if current is None:
+            return False
+        index = max(0, min(index, row["track_count"] - 1))
+        current_index = db.execute("SELECT COUNT(*) FROM playlist_tracks WHERE playlist_id = ? AND position < ?",
+                                   (playlist_id, current["position"])).fetchone()[0]
+        if current_index == index:
+            return False
+
+        def neighbours():
+            rows = db.execute("SELECT position FROM playlist_tracks WHERE playlist_id = ? AND youtube_id != ? "
+                              "ORDER BY position LIMIT 2 OFFSET ?", (playlist_id, youtube_id, max(index - 1, 0)))
+            return [r["position"] for r in rows]
+
+        if index == 0:
+            position = neighbours()[0] - 1
+        elif index == row["track_count"] - 1:
+            position = neighbours()[-1] + 1
+        else:
+            low, high = neighbours()
+            if high - low < MIN_KEY_GAP:
+                self._renumber(db, playlist_id)
+                low, high = neighbours()
+            position = (low + high) / 2
+        db.execute("UPDATE playlist_tracks SET position = ? WHERE playlist_id = ? AND youtube_id = ?",
+                   (position, playlist_id, youtube_id))
+        if 0 in (index, current_index):
+            first = self._first_track(db, playlist_id)
+            db.execute("UPDATE playlists SET cover = ? WHERE id = ?", (first.get("image"), playlist_id))
+        return True
+
+    def _renumber(self, db, playlist_id):
+        """Reset positions to 0, 1, 2... after many moves have crowded one gap"""
+        ids = [r["youtube_id"] for r in db.execute(
+            "SELECT youtube_id FROM playlist_tracks WHERE playlist_id = ? ORDER BY position", (playlist_id,))]
+        db.executemany("UPDATE playlist_tracks SET position = ? WHERE playlist_id = ? AND youtube_id = ?",
+                       [(i, playlist_id, youtube_id) for i, youtube_id in enumerate(ids)])
+
+    def add_track(self, name, track):
+        with self._connect() as db:
+            # Check and insert in one write transaction, so a concurrent delete can't land between them
+            db.execute("BEGIN IMMEDIATE")
+            if self._playlist_row(db, name) is None:
+                return None, False
+            added = self._add(db, name, track)
+        if added:
+            self.writes += 1
+        return self.get(name), added
+
+    def remove_track(self, name, youtube_id):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            if self._playlist_row(db, name) is None:
+                return None
+            removed = self._remove(db, name, youtube_id)
+        if removed:
+            self.writes += 1
+        return removed
+
+    def apply_batch(self, operations):
+        """Apply add/remove/move operations in order, all or nothing; returns one result per operation.
+
+        Raises ValueError for a malformed operation and LookupError for a
+        missing playlist. Everything runs in one transaction with one commit.
+        """
+        records = [batch_record(i, operation) for i, operation in enumerate(operations)]
+        handlers = {
+            "add": lambda db, r: self._add(db, r["name"], r["track"]),
+            "remove": lambda db, r: self._remove(db, r["name"], r["youtube_id"]),
+            "move": lambda db, r: self._move(db, r["name"], r["youtube_id"], r["index"]),
+        }
+        results = []
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            for name in sorted({record["name"] for record in records}):
+                if self._playlist_row(db, name) is None:
+                    raise LookupError(f"Playlist not found: {name}")
+            for record in records:
+                results.append(batch_result(record, handlers[record["op"]](db, record)))
+        self.writes += 1
+        return results
+
+    def stats(self):
+        db = self._connect()
+        return {
+            "backend": self.backend,
+            "playlists": db.execute("SELECT COUNT(*) FROM playlists").fetchone()[0],
+            "tracks": db.execute("SELECT COALESCE(SUM(track_count), 0) FROM playlists").fetchone()[0],
+            "writes": self.writes,
+        }
+
+
+def migrate_json_to_sqlite(store, json_path=PLAYLIST_FILE):
+    """Copy hyde.json into a SQLite store once; returns the number of playlists imported"""
+    db = store._connect()
+    if db.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone():
+        return 0
+    playlists = load_playlists_with_journal(json_path)
+    with db:
+        for name, data in playlists.items():
+            tracks = data["tracks"].to_list()
+            cover = data["cover"] if "cover" in data else (thumbnail_for(tracks[0]["youtube_id"]) if tracks else None)
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO playlists (name, created_at, cover, track_count) VALUES (?, ?, ?, ?)",
+                (name, data.get("created_at"), cover, len(tracks)),
+            )
+            if not cursor.rowcount:
+                continue
+            db.executemany(
+                "INSERT OR IGNORE INTO playlist_tracks (playlist_id, youtube_id, position, track) VALUES (?, ?, ?, ?)",
+                [(cursor.lastrowid, t["youtube_id"], position, json.dumps(t, ensure_ascii=False))
+                 for position, t in enumerate(tracks)],
+            )
+        db.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (os.path.abspath(json_path),))
+    if playlists:
+        logger.info(f"Migrated {len(playlists)} playlists from {json_path} to {store.path}")
+    return len(playlists)
+
+
+def open_playlist_store(backend=PLAYLIST_BACKEND):
+    """Build the configured store; a new SQLite store imports hyde.json on first start"""
+    if backend == "json":
+        return JsonPlaylistStore(PLAYLIST_FILE)
+    if backend == "sqlite":
+        store = SqlitePlaylistStore(PLAYLIST_DB)
+        migrate_json_to_sqlite(store, PLAYLIST_FILE)
+        return store
+    raise ValueError(f"Unknown PLAYLIST_BACKEND: {backend}")
+
+
+if __name__ == "__main__":
+    # python playlist_store.py [hyde.json] [playlists.db]
+    logging.basicConfig(level=logging.INFO)
+    json_path = sys.argv[1] if len(sys.argv) > 1 else PLAYLIST_FILE
+    db_path = sys.argv[2] if len(sys.argv) > 2 else PLAYLIST_DB
+    count = migrate_json_to_sqlite(SqlitePlaylistStore(db_path), json_path)
+    print(f"Imported {count} playlists from {json_path} into {db_path}")
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from cache import SingleFlight, normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class _Node:
+    __slots__ = ("children", "entry")
+
+    def __init__(self):
+        self.children = {}
+        self.entry = None  # (suggestions, expires_at, exhaustive)
+
+
+class SuggestionEngine:
+    """Autocomplete with an in-memory prefix trie in front of an upstream source.
+
+    Upstream completion lists are cached per normalized prefix in a trie, with
+    a TTL and LRU eviction past ``maxsize`` prefixes. A prefix that isn't
+    cached can often be answered from a cached shorter one. Filtering the
+    shorter prefix's list by the longer prefix is exact when that list was
+    exhaustive (upstream returned fewer than ``limit`` items). It is also good
+    enough when at least ``derive_min`` items survive the filter. Only the
+    remaining keystrokes call ``fetch(query)``.
+
+    ``record_query()`` counts searches users actually ran. The most popular
+    ones that match the prefix are blended ahead of the upstream suggestions.
+    """
+
+    def __init__(self, fetch, maxsize=20000, ttl=3600, limit=10, derive_min=5,
+                 popular_size=5000, popular_slots=3, popular_min_count=2, name="suggestions"):
+        self.fetch = fetch
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.limit = limit
+        self.derive_min = derive_min
+        self.popular_size = popular_size
+        self.popular_slots = popular_slots
+        self.popular_min_count = popular_min_count
+        self.name = name
+        self._root = _Node()
+        self._lru = OrderedDict()  # prefix -> node holding its entry
+        self._lock = threading.Lock()
+        self._flights = SingleFlight(name)
+        # Popular queries: counts plus a sorted key list so a prefix is a bisect range
+        self._popular = {}
+        self._popular_keys = []
+        self.hits = 0
+        self.derived = 0
+        self.misses = 0
+        self.upstream_errors = 0
+        self.evictions = 0
+
+    def suggest(self, query):
+        """Completions for what the user has typed so far, popular local searches first"""
+        prefix = normalize_query(query)
+        if not prefix:
+            return []
+        upstream = self._cached(prefix)
+        if upstream is None:
+            upstream = self._flights.do(prefix, lambda: self._load(prefix, query))
+        return self._blend(prefix, upstream)
+
+    def _cached(self, prefix):
+        """Upstream suggestions for prefix from the trie, exact or derived; None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            node, best = self._root, None
+            for depth, char in enumerate(prefix, 1):
+                node = node.children.get(char)
+                if node is None:
+                    break
+                if node.entry is not None and node.entry[1] > now:
+                    best = (depth, node)
+            if best is None:
+                self.misses += 1
+                return None
+            depth, node = best
+            suggestions, _, exhaustive = node.entry
+            self._lru.move_to_end(prefix[:depth])
+            if depth == len(prefix):
+                self.hits += 1
+                return suggestions
+            filtered = [s for s in suggestions if normalize_query(s).startswith(prefix)]
+            if exhaustive or len(filtered) >= self.derive_min:
+                self.derived += 1
+                return filtered
+            self.misses += 1
+            return None
+
+    def _load(self, prefix, query):
+        try:
+            suggestions = list(self.fetch(query))[:self.limit]
+        except Exception as e:
+            self.upstream_errors += 1
+            logger.error(f"{self.name} upstream failed for {prefix!r}: {e}")
+            return self._fallback(prefix)
+        self._store(prefix, suggestions)
+        return suggestions
+
+    def _fallback(self, prefix):
+        """Best effort when upstream is down: filter any cached shorter prefix, even an expired one"""
+        with self._lock:
+            node, suggestions = self._root, []
+            for char in prefix:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                if node.entry is not None:
+                    suggestions = node.entry[0]
+        return [s for s in suggestions if normalize_query(s).startswith(prefix)]
+
+    def _store(self, prefix, suggestions):
+        entry = (suggestions, time.monotonic() + self.ttl, len(suggestions) < self.limit)
+        with self._lock:
+            node = self._root
+            for char in prefix:
+                node = node.children.setdefault(char, _Node())
+            node.entry = entry
+            self._lru[prefix] = node
+            self._lru.move_to_end(prefix)
+            while len(self._lru) > self.maxsize:
+                old_prefix, old_node = self._lru.popitem(last=False)
+                old_node.entry = None
+                self._prune(old_prefix)
+                self.evictions += 1
+
+    def _prune(self, prefix):
+        """Drop trie nodes left with neither an entry nor children. Caller holds the lock."""
+        path = [self._root]
+        for char in prefix:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        for depth in range(len(prefix), 0, -1):
+            node = path[depth]
+            if node.entry is not None or node.children:
+                return
+            del path[depth - 1].children[prefix[depth - 1]]
+
+    def record_query(self, query):
+        """Count a search a user actually ran, making it a candidate for blending"""
+        key = normalize_query(query)
+        if not key:
+            return
+        with self._lock:
+            if key in self._popular:
+                self._popular[key] += 1
+                return
+            if len(self._popular) >= self.popular_size:
+                # Keep the more popular half so one-off queries don't crowd the table
+                keep = sorted(self._popular.items(), key=lambda item: item[1], reverse=True)
+                self._popular = dict(keep[:self.popular_size // 2])
+                self._popular_keys = sorted(self._popular)
+            self._popular[key] = 1
+            insort(self._popular_keys, key)
+
+    def popular(self, prefix, count):
+        """The most searched recorded queries starting with prefix"""
+        with self._lock:
+            keys = self._popular_keys
+            start = bisect_left(keys, prefix)
+            end = bisect_left(keys, prefix + "\uffff", start)
+            matches = [(self._popular[k], k) for k in keys[start:end]
+                       if self._popular[k] >= self.popular_min_count]
+        matches.sort(key=lambda item: (-item[0], item[1]))
+        return [k for _, k in matches[:count]]
+
+    def _blend(self, prefix, upstream):
+        blended, seen = [], set()
+        for suggestion in self.popular(prefix, self.popular_slots) + list(upstream):
+            key = normalize_query(suggestion)
+            if key not in seen:
+                seen.add(key)
+                blended.append(suggestion)
+        return blended[:self.limit]
+
+    def stats(self):
+        lookups = self.hits + self.derived + self.misses
+        return {
+            "size": len(self._lru),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "derived": self.derived,
+            "misses": self.misses,
+            "upstream_errors": self.upstream_errors,
+            "evictions": self.evictions,
+            "popular_queries": len(self._popular),
+            "local_rate": round((self.hits + self.derived) / lookups, 4) if lookups else 0.0,
+            "single_flight": self._flights.stats(),
+        }
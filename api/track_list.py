@@ -0,0 +1,113 @@
+from bisect import bisect_left
+
+# Renumber sort keys once midpoints get closer than this
+MIN_KEY_GAP = 1e-9
+
+
+class TrackList:
+    """Ordered playlist tracks with a youtube_id index.
+
+    Every track has a float sort key. ``_keys`` is the sorted list of keys,
+    so position i is simply ``_keys[i]``, and a track's position is a bisect
+    on its key. Appends take the next whole key, and moves take the midpoint
+    between their new neighbours. No operation walks the tracks in Python.
+    Removing from or inserting into the middle of ``_keys`` is one C-level
+    memmove of pointers, which costs microseconds even at 10k tracks.
+
+      contains / get ......... O(1)
+      append ................. O(1)
+      remove / index_of ...... O(log n) + memmove
+      move ................... O(log n) + memmove (occasional O(n) renumber)
+      at / slice ............. O(1) / O(k)
+    """
+
+    __slots__ = ("_keys", "_by_key", "_key_of")
+
+    def __init__(self, tracks=()):
+        self._keys = []
+        self._by_key = {}
+        self._key_of = {}
+        for track in tracks:
+            # Legacy files may hold duplicates or id-less entries; keep the first copy
+            youtube_id = track.get("youtube_id")
+            if youtube_id and youtube_id not in self._key_of:
+                self.append(track)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        by_key = self._by_key
+        return (by_key[key] for key in list(self._keys))
+
+    def __contains__(self, youtube_id):
+        return youtube_id in self._key_of
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._by_key[key] for key in self._keys[index]]
+        return self._by_key[self._keys[index]]
+
+    def get(self, youtube_id):
+        key = self._key_of.get(youtube_id)
+        return None if key is None else self._by_key[key]
+
+    def append(self, track):
+        """Add a track at the end; False if its youtube_id is already present"""
+        youtube_id = track["youtube_id"]
+        if youtube_id in self._key_of:
+            return False
+        key = self._keys[-1] + 1.0 if self._keys else 0.0
+        self._insert(key, track, len(self._keys))
+        return True
+
+    def index_of(self, youtube_id):
+        key = self._key_of.get(youtube_id)
+        return None if key is None else bisect_left(self._keys, key)
+
+    def remove(self, youtube_id):
+        """Drop a track; returns it, or None if it wasn't there"""
+        key = self._key_of.pop(youtube_id, None)
+        if key is None:
+            return None
+        del self._keys[bisect_left(self._keys, key)]
+        return self._by_key.pop(key)
+
+    def move(self, youtube_id, index):
+        """Move a track so it ends up at ``index`` (clamped to the list); False if absent"""
+        track = self.remove(youtube_id)
+        if track is None:
+            return False
+        index = max(0, min(index, len(self._keys)))
+        self._insert(self._key_between(index), track, index)
+        return True
+
+    def _key_between(self, index):
+        """A key that sorts between positions index-1 and index"""
+        keys = self._keys
+        if not keys:
+            return 0.0
+        if index == 0:
+            return keys[0] - 1.0
+        if index == len(keys):
+            return keys[-1] + 1.0
+        low, high = keys[index - 1], keys[index]
+        if high - low < MIN_KEY_GAP:
+            self._renumber()
+            low, high = keys[index - 1], keys[index]
+        return (low + high) / 2
+
+    def _insert(self, key, track, index):
+        self._keys.insert(index, key)
+        self._by_key[key] = track
+        self._key_of[track["youtube_id"]] = key
+
+    def _renumber(self):
+        """Reset keys to 0, 1, 2... after many moves have crowded one gap"""
+        tracks = [self._by_key[key] for key in self._keys]
+        self._keys[:] = [float(i) for i in range(len(tracks))]
+        self._by_key = dict(zip(self._keys, tracks))
+        self._key_of = {track["youtube_id"]: key for key, track in self._by_key.items()}
+
+    def to_list(self):
+        return [self._by_key[key] for key in self._keys]
@@ -0,0 +1,119 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+INITIAL_DATA_MARKERS = (
+    'var ytInitialData = ',
+    'window["ytInitialData"] = ',
+    "window['ytInitialData'] = ",
+    'ytInitialData = ',
+)
+
+_decoder = json.JSONDecoder()
+
+
+def extract_initial_data(html):
+    """Find the embedded ytInitialData blob and decode it in a single pass"""
+    for marker in INITIAL_DATA_MARKERS:
+        start = html.find(marker)
+        if start == -1:
+            continue
+        brace = html.find('{', start + len(marker))
+        if brace == -1:
+            continue
+        try:
+            data, _ = _decoder.raw_decode(html, brace)
+            return data
+        except ValueError as e:
+            logger.warning(f"ytInitialData decode failed at marker {marker!r}: {e}")
+    return None
+
+
+def iter_video_renderers(data):
+    """Yield every videoRenderer node in document order"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            renderer = node.get("videoRenderer")
+            if isinstance(renderer, dict):
+                yield renderer
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _text(field):
+    """Flatten a YouTube text object ({'simpleText': ...} or {'runs': [...]})"""
+    if not isinstance(field, dict):
+        return ""
+    if "simpleText" in field:
+        return field["simpleText"]
+    return "".join(run.get("text", "") for run in field.get("runs", []))
+
+
+def parse_video_renderer(renderer):
+    """Pull id, title, length, channel and thumbnail out of a videoRenderer"""
+    video_id = renderer.get("videoId")
+    if not video_id:
+        return None
+
+    owner = renderer.get("ownerText") or renderer.get("longBylineText") or renderer.get("shortBylineText")
+    channel_id = None
+    if isinstance(owner, dict) and owner.get("runs"):
+        endpoint = owner["runs"][0].get("navigationEndpoint", {})
+        channel_id = endpoint.get("browseEndpoint", {}).get("browseId")
+
+    thumbnails = renderer.get("thumbnail", {}).get("thumbnails", [])
+    return {
+        "video_id": video_id,
+        "title": _text(renderer.get("title")),
+        "length": _text(renderer.get("lengthText")),
+        "channel": _text(owner),
+        "channel_id": channel_id,
+        "thumbnail": thumbnails[-1]["url"] if thumbnails else None,
+    }
+
+
+def iter_search_page(html):
+    """Yield the unique videos on a YouTube results page, in page order, as each is parsed"""
+    data = extract_initial_data(html)
+    if data is None:
+        return
+
+    seen = set()
+    for renderer in iter_video_renderers(data):
+        video = parse_video_renderer(renderer)
+        if video and video["video_id"] not in seen:
+            seen.add(video["video_id"])
+            yield video
+
+
+def parse_search_page(html):
+    """Parse a YouTube results page into a list of unique videos, in page order"""
+    return list(iter_search_page(html))
+
+
+def parse_length(text, default=180):
+    """Convert 'M:SS' or 'H:MM:SS' into seconds"""
+    parts = text.split(':') if text else []
+    try:
+        if len(parts) == 2:
+            return int(parts[0]) * 60 + int(parts[1])
+        if len(parts) == 3:
+            return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+    except ValueError:
+        pass
+    return default
+
+
+def clean_channel_name(channel):
+    """Strip auto-generated channel decorations ('Artist - Topic', 'ArtistVEVO')"""
+    name = channel.strip()
+    if name.endswith(" - Topic"):
+        name = name[:-len(" - Topic")]
+    if name.endswith("VEVO") and len(name) > 4:
+        name = name[:-4]
+    return name.strip()
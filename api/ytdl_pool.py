@@ -0,0 +1,150 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("YTDL_POOL_SIZE", "4"))
+POOL_MAX_USES = int(os.getenv("YTDL_POOL_MAX_USES", "100"))
+POOL_MAX_AGE = int(os.getenv("YTDL_POOL_MAX_AGE", "3600"))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("YTDL_POOL_ACQUIRE_TIMEOUT", "30"))
+
+
+class _Pooled:
+    __slots__ = ("ydl", "uses", "created_at")
+
+    def __init__(self, ydl):
+        self.ydl = ydl
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class YoutubeDLPool:
+    """Bounded pool of reusable YoutubeDL instances for one option profile.
+
+    Instances keep their extractors, cookie jar and HTTP opener between
+    requests. Each checkout gets an instance to itself, because YoutubeDL is
+    not thread-safe. Instances are recycled after ``max_uses`` checkouts or
+    ``max_age`` seconds, or when a request fails with an unexpected error.
+    """
+
+    def __init__(self, opts, size=POOL_SIZE, max_uses=POOL_MAX_USES, max_age=POOL_MAX_AGE,
+                 acquire_timeout=POOL_ACQUIRE_TIMEOUT, name="ytdl"):
+        self.opts = dict(opts)
+        self.size = size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.acquire_timeout = acquire_timeout
+        self.name = name
+        self._idle = []
+        self._total = 0
+        self._cond = threading.Condition()
+        self.created = 0
+        self.recycled = 0
+        self.checkouts = 0
+        self.waits = 0
+
+    def _create(self):
+        ydl = yt_dlp.YoutubeDL(dict(self.opts))
+        self.created += 1
+        return _Pooled(ydl)
+
+    def _healthy(self, pooled):
+        return (pooled.uses < self.max_uses
+                and time.monotonic() - pooled.created_at < self.max_age)
+
+    def _destroy(self, pooled):
+        self.recycled += 1
+        try:
+            pooled.ydl.close()
+        except Exception as e:
+            logger.warning(f"{self.name} pool: error closing YoutubeDL: {e}")
+
+    def warm(self, count=None):
+        """Pre-create idle instances so the first requests skip construction."""
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            with self._cond:
+                if self._total >= count:
+                    return
+                self._total += 1
+            pooled = self._create()
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def warm_in_background(self, count=None):
+        threading.Thread(target=self.warm, args=(count,), daemon=True,
+                         name=f"{self.name}-pool-warm").start()
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            self.checkouts += 1
+            while True:
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if self._healthy(pooled):
+                        return pooled
+                    self._total -= 1
+                    self._destroy(pooled)
+                if self._total < self.size:
+                    self._total += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{self.name} pool: no YoutubeDL instance free after {self.acquire_timeout}s")
+                self.waits += 1
+                self._cond.wait(remaining)
+        try:
+            return self._create()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, pooled, healthy):
+        pooled.uses += 1
+        keep = healthy and self._healthy(pooled)
+        with self._cond:
+            if keep:
+                self._idle.append(pooled)
+            else:
+                self._total -= 1
+            self._cond.notify()
+        if not keep:
+            self._destroy(pooled)
+
+    @contextmanager
+    def instance(self):
+        """Check out a YoutubeDL: ``with pool.instance() as ydl: ydl.extract_info(...)``"""
+        pooled = self._acquire()
+        healthy = True
+        try:
+            yield pooled.ydl
+        except yt_dlp.utils.DownloadError:
+            # The video/query failed, the instance itself is fine
+            raise
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self._release(pooled, healthy)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "total": self._total,
+                "idle": len(self._idle),
+                "in_use": self._total - len(self._idle),
+                "created": self.created,
+                "recycled": self.recycled,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+            }